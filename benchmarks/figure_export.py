@@ -0,0 +1,162 @@
+"""
+Figure export benchmark of the DXT Explorer plot pages.
+
+Builds an operation-like figure (a scattergl trace with start times, ranks,
+durations as error bars, and optionally per-row hover strings) and times its
+export through fig.write_html, with each of plotly's JSON engines, against
+explorer.figure.write_html with each of its JSON engines and the sidecar mode.
+
+Usage:
+    python benchmarks/figure_export.py [--points N] [--customdata] [--repeat N]
+"""
+
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import plotly.io as pio
+import plotly.graph_objects as go
+
+from explorer import figure
+
+
+def build_figure(points, customdata):
+    """Operation-like figure with a number of points."""
+    generator = np.random.default_rng(0)
+
+    start = np.sort(generator.uniform(0, 100, points)).round(4)
+    duration = generator.exponential(0.01, points).round(4)
+    rank = generator.integers(0, 1024, points)
+    size = generator.integers(1, 1 << 20, points)
+
+    trace = go.Scattergl(
+        x=start,
+        y=rank,
+        mode="markers",
+        marker=dict(size=1, color="#3c93c2"),
+        error_x=dict(type="data", array=duration, symmetric=False, width=0),
+    )
+
+    if customdata:
+        trace.customdata = np.char.add("Size: ", size.astype(str))
+        trace.hovertemplate = "%{customdata}"
+
+    return go.Figure(trace, layout=dict(height=1200, width=1800))
+
+
+def write_plotly(engine):
+    """Export through fig.write_html with a plotly JSON engine."""
+    def write(fig, output):
+        default_engine = pio.json.config.default_engine
+        pio.json.config.default_engine = engine
+
+        try:
+            fig.write_html(output, include_plotlyjs=figure.PLOTLYJS)
+        finally:
+            pio.json.config.default_engine = default_engine
+
+    return write
+
+
+def write_figure(engine=None, sidecar=False):
+    """Export through explorer.figure.write_html."""
+    def write(fig, output):
+        figure.write_html(fig, output, sidecar=sidecar, engine=engine)
+
+    return write
+
+
+def measure(write, fig, repeat):
+    """
+    Best wall time of an export over a number of runs.
+
+    Returns:
+        tuple with the time in seconds and the bytes written
+    """
+    best = None
+
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "figure.html")
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+            write(fig, output)
+            elapsed = time.perf_counter() - start
+
+            best = elapsed if best is None else min(best, elapsed)
+
+        size = sum(
+            os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+        )
+
+    return best, size
+
+
+def main():
+    PARSER = argparse.ArgumentParser(description="DXT Explorer figure export benchmark")
+
+    PARSER.add_argument(
+        "--points",
+        type=int,
+        default=10000000,
+        help="Number of points of the figure (default: 10000000)",
+    )
+
+    PARSER.add_argument(
+        "--customdata",
+        default=False,
+        action="store_true",
+        help="Add a hover string to each point, as the operation plot does",
+    )
+
+    PARSER.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Number of runs of each export, the best one is reported (default: 1)",
+    )
+
+    ARGS = PARSER.parse_args()
+
+    fig = build_figure(ARGS.points, ARGS.customdata)
+
+    exports = [
+        ("fig.write_html (json)", write_plotly("json")),
+    ]
+
+    try:
+        import orjson  # noqa: F401
+
+        exports.append(("fig.write_html (orjson)", write_plotly("orjson")))
+    except ImportError:
+        pass
+
+    for engine in figure.ENGINES:
+        if engine == "orjson" and len(exports) < 2:
+            continue
+
+        exports.append(("figure.write_html ({})".format(engine), write_figure(engine)))
+
+    exports.append(("figure.write_html (sidecar)", write_figure(sidecar=True)))
+
+    print("{} points{}".format(ARGS.points, " with hover strings" if ARGS.customdata else ""))
+
+    baseline = None
+
+    for name, write in exports:
+        elapsed, size = measure(write, fig, ARGS.repeat)
+
+        if baseline is None:
+            baseline = elapsed
+
+        print(
+            "{:<32} {:>8.2f} seconds {:>6.1f}x {:>10.1f} MB".format(
+                name, elapsed, baseline / elapsed, size / 1e6
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Import time benchmark of the DXT Explorer command line.
+
+The lightweight entry points (--version, --help) should not pay for darshan,
+pandas, pyarrow or pyranges. This benchmark measures the import of the
+command line modules with `python -X importtime`, checks that no heavy module
+is loaded, and times the lightweight commands against a budget.
+
+Usage:
+    python benchmarks/import_time.py [--budget SECONDS] [--repeat N]
+"""
+
+import sys
+import time
+import argparse
+import subprocess
+
+
+MODULES = ["explorer.dxt", "explorer.batch"]
+
+HEAVY_MODULES = ["darshan", "pandas", "numpy", "pyarrow", "pyranges", "pkg_resources"]
+
+COMMANDS = [
+    ["-m", "explorer.dxt", "--version"],
+    ["-m", "explorer.dxt", "--help"],
+    ["-m", "explorer.batch", "--version"],
+]
+
+
+def import_time(module):
+    """
+    Measure the import of a module in a fresh interpreter.
+
+    Returns:
+        tuple with the cumulative import time of the module in seconds, the
+        set of imported top-level modules and the slowest imports
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import {}".format(module)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    cumulative = None
+    imported = set()
+    imports = []
+
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        fields = line[len("import time:"):].split("|")
+
+        try:
+            self_time = int(fields[0])
+            total_time = int(fields[1])
+        except ValueError:
+            # Header line
+            continue
+
+        name = fields[2].strip()
+
+        imported.add(name.split(".")[0])
+        imports.append((self_time, name))
+
+        if name == module:
+            cumulative = total_time / 1e6
+
+    return cumulative, imported, sorted(imports, reverse=True)[:5]
+
+
+def command_time(command, repeat):
+    """Best wall time of a command over a number of runs."""
+    best = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable] + command,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        elapsed = time.perf_counter() - start
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def main():
+    PARSER = argparse.ArgumentParser(description="DXT Explorer import time benchmark")
+
+    PARSER.add_argument(
+        "--budget",
+        type=float,
+        default=0.5,
+        help="Maximum wall time in seconds of each lightweight command (default: 0.5)",
+    )
+
+    PARSER.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of runs of each command, the best one is reported (default: 5)",
+    )
+
+    ARGS = PARSER.parse_args()
+
+    failed = False
+
+    for module in MODULES:
+        cumulative, imported, slowest = import_time(module)
+
+        heavy = sorted(imported.intersection(HEAVY_MODULES))
+
+        print("import {}: {:.4f} seconds".format(module, cumulative))
+
+        for self_time, name in slowest:
+            print("    {:>10.4f}  {}".format(self_time / 1e6, name))
+
+        if heavy:
+            print("    FAIL: heavy modules imported: {}".format(", ".join(heavy)))
+            failed = True
+
+    # Interpreter startup alone, to put the budget in context
+    baseline = command_time(["-c", "pass"], ARGS.repeat)
+
+    print("python startup: {:.4f} seconds".format(baseline))
+
+    for command in COMMANDS:
+        elapsed = command_time(command, ARGS.repeat)
+
+        status = "ok"
+        if elapsed > ARGS.budget:
+            status = "FAIL: over the {:.2f} seconds budget".format(ARGS.budget)
+            failed = True
+
+        print("python {}: {:.4f} seconds {}".format(" ".join(command), elapsed, status))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,487 @@
+"""
+Scaling benchmark of the DXT Explorer pipeline stages.
+
+Every stage runs on synthetic traces of increasing size: the Lustre layout
+mapping, the conversion of the DXT records with their OSTs, the dataset
+writing, the I/O phase merging, each insight detector, each plot script and
+the HTML writing of each plot. The time and the peak memory of each stage are
+recorded at each size, and compared against a stored baseline. A stage whose time grows faster than the trace, as measured by the
+slope of the time against the number of operations in a log-log scale, is
+flagged as super-linear. The script exits with an error when a stage fails.
+
+Usage:
+    python benchmarks/pipeline.py [--axis ops|ranks|files] [--sizes 1 2 4 8]
+                                  [--baseline FILE] [--save] [--check]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+import pyarrow.feather as feather
+
+from explorer import api
+from explorer import dxt
+from explorer import dataset
+from explorer import insights
+from explorer import metrics
+from explorer import synthetic
+
+
+# Workload at size 1, the axis being measured is multiplied by each size
+BASE = {"ranks": 16, "ops_per_rank": 2000, "files": 1}
+
+AXES = {"ops": "ops_per_rank", "ranks": "ranks", "files": "files"}
+
+DETECTORS = {
+    "insight rank zero workload": lambda diagnosis, phases: diagnosis.rank_zero_workload(),
+    "insight unbalanced workloads": lambda diagnosis, phases: diagnosis.unbalanced_workloads(),
+    "insight collective metadata": lambda diagnosis, phases: diagnosis.collective_metadata(),
+    "insight stragglers": lambda diagnosis, phases: diagnosis.stragglers(phases),
+    "insight ost hotspots": lambda diagnosis, phases: diagnosis.ost_hotspots(diagnosis.ost_load()),
+    "insight access patterns": lambda diagnosis, phases: diagnosis.access_patterns(),
+}
+
+PLOTS = {
+    "operation": "-f {dataset}.dxt -i {dataset}.io_phases -0 True -1 True -2 True -4 True",
+    "transfer": "-f {dataset}.dxt",
+    "spatiality": "-f {dataset}.dxt",
+    "io_phase": "-f {dataset}.io_phases",
+    "ost_usage_operation": "-f {dataset}.dxt",
+    "ost_usage_transfer": "-f {dataset}.dxt",
+    "ost_usage_heatmap": "-f {dataset}.dxt",
+}
+
+# Times shorter than this are too noisy to compare with the baseline
+MINIMUM_TIME = 0.05
+
+# Only the sizes where a stage takes longer than this are used to fit its
+# slope, sub-second times vary too much from run to run
+MINIMUM_SLOPE_TIME = 0.3
+
+
+def get_rss():
+    """Resident memory in bytes of this process, None if unknown."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    return None
+
+
+class Measure(metrics.PeakRSS):
+    """Time and peak memory of a block of code run in this process."""
+
+    def __enter__(self):
+        super().__enter__()
+        self.rss = get_rss()
+        self.start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *exception):
+        self.time = time.perf_counter() - self.start
+        super().__exit__(*exception)
+        self.memory = None
+
+        if self.reset and self.peak is not None and self.rss is not None:
+            self.memory = max(self.peak - self.rss, 0)
+
+
+class Pipeline:
+    """Runs the stages of the explorer on the files of a synthetic workload."""
+
+    def __init__(self, workload, directory):
+        self.workload = workload
+        self.directory = directory
+        self.results = {}
+        self.errors = {}
+
+        self.explorer = dxt.Explorer(
+            dxt.build_parser().parse_args(
+                ["synthetic.darshan", "--prefix", directory]
+            )
+        )
+        self.explorer.window = dataset.Window()
+        self.explorer.prefix = directory
+        self.explorer.logger.setLevel(logging.WARNING)
+
+    def record(self, stage, seconds, memory):
+        """Accumulate the time and keep the peak memory of a stage."""
+        result = self.results.setdefault(stage, {"time": 0.0, "memory": None})
+
+        result["time"] += seconds
+
+        if memory is not None:
+            result["memory"] = max(result["memory"] or 0, memory)
+
+    def run(self, plots=True):
+        """Run every stage on every file, returns the measurements by stage."""
+        report = synthetic.Report(self.workload)
+
+        # Packed beforehand, the log buffers already hold the packed segments
+        records = list(report.iter_records())
+
+        with Measure() as measure:
+            layouts = api.get_lustre_layouts(report)
+
+        self.record("lustre mapping", measure.time, measure.memory)
+
+        with Measure() as measure:
+            tables = api.build_tables(records, layouts=layouts)
+
+        self.record("conversion", measure.time, measure.memory)
+
+        for file_index in range(self.workload.files):
+            file_id = self.workload.file_id(file_index)
+            name = dataset.dataset_name(
+                os.path.join(self.directory, "synthetic.darshan"), file_id
+            )
+
+            with Measure() as measure:
+                api.write_dataset(tables.pop(file_id), name)
+
+            self.record("dataset", measure.time, measure.memory)
+
+            with Measure() as measure:
+                self.explorer.compute_io_phases(name + ".dxt", name + ".io_phases")
+
+            self.record("phase merging", measure.time, measure.memory)
+
+            self.detectors(name)
+
+            if plots:
+                self.plots(name, file_id)
+
+        return self.results
+
+    def detectors(self, name):
+        """Run each insight detector on the dataset, as the operation plot does."""
+        df = dataset.read(name + ".dxt")
+        df["duration"] = (df["end"] - df["start"]).round(4)
+
+        phases = feather.read_feather(name + ".io_phases")
+
+        for stage, detector in DETECTORS.items():
+            diagnosis = insights.insights(df.copy())
+            diagnosis.logger.setLevel(logging.WARNING)
+
+            with Measure() as measure:
+                detector(diagnosis, phases)
+
+            self.record(stage, measure.time, measure.memory)
+
+    def plots(self, name, file_id):
+        """Run each plot script, its stages are reported through the run metrics."""
+        for plot, arguments in PLOTS.items():
+            children = os.path.join(self.directory, "{}.metrics.jsonl".format(plot))
+            output = os.path.join(self.directory, "{}-{}.html".format(file_id, plot))
+
+            if os.path.exists(children):
+                os.remove(children)
+
+            command = [sys.executable, dxt.get_script("plots/{}.py".format(plot))]
+            command += arguments.format(dataset=name).split()
+            command += ["-o", output, "-x", "synthetic"]
+
+            environment = dict(os.environ)
+            environment[metrics.ENVIRONMENT] = children
+
+            start = time.perf_counter()
+
+            process = subprocess.run(
+                command,
+                env=environment,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True,
+            )
+
+            elapsed = time.perf_counter() - start
+
+            if not os.path.exists(output):
+                lines = process.stderr.strip().splitlines()
+
+                self.errors["plot {}".format(plot)] = "error {}: {}".format(
+                    process.returncode, lines[-1] if lines else ""
+                )
+                continue
+
+            stages = []
+            if os.path.exists(children):
+                with open(children) as f:
+                    stages = [json.loads(line) for line in f if line.strip()]
+
+            # The synthetic traces have no Darshan log for Drishti to analyze
+            for stage in stages:
+                if stage["stage"] == "drishti":
+                    elapsed -= stage["wall_time"]
+
+            peak = max([stage["peak_rss"] or 0 for stage in stages] or [0]) or None
+
+            self.record("plot {}".format(plot), elapsed, peak)
+
+            for stage in stages:
+                if stage["stage"] == "render":
+                    self.record(
+                        "html {}".format(plot), stage["wall_time"], stage["peak_rss"]
+                    )
+
+
+def run(axis, sizes, repeat, seed, plots):
+    """
+    Measure every stage at each size of an axis.
+
+    Returns:
+        dictionary with the number of operations of each size and, for each
+        stage, the best time and the peak memory at each size
+    """
+    ops = []
+    stages = {}
+    errors = {}
+
+    for size in sizes:
+        parameters = dict(BASE)
+        parameters[AXES[axis]] *= size
+
+        workload = synthetic.Workload(
+            phases=4, stragglers=0.05, seed=seed, **parameters
+        )
+
+        ops.append(workload.total_ops)
+
+        best = {}
+
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as directory:
+                pipeline = Pipeline(workload, directory)
+                results = pipeline.run(plots)
+
+            errors.update(pipeline.errors)
+
+            for stage, result in results.items():
+                if stage not in best or result["time"] < best[stage]["time"]:
+                    best[stage] = result
+
+        for stage, result in best.items():
+            stages.setdefault(stage, {"time": [], "memory": []})
+            stages[stage]["time"].append(round(result["time"], 6))
+            stages[stage]["memory"].append(result["memory"])
+
+        print(
+            "{} x{}: {} operations".format(axis, size, workload.total_ops),
+            file=sys.stderr,
+        )
+
+    # A stage that failed at some size has no complete curve
+    for stage in errors:
+        stages.pop(stage, None)
+
+    return {
+        "axis": axis,
+        "sizes": sizes,
+        "ops": ops,
+        "stages": stages,
+        "errors": errors,
+    }
+
+
+def scaling_slope(ops, times):
+    """
+    Slope of the time against the number of operations in a log-log scale.
+
+    Returns:
+        the slope fitted on the sizes slower than MINIMUM_SLOPE_TIME, or None
+        with fewer than two of them
+    """
+    ops = np.asarray(ops, dtype=float)
+    times = np.asarray(times, dtype=float)
+
+    fitted = times >= MINIMUM_SLOPE_TIME
+
+    if np.count_nonzero(fitted) < 2:
+        return None
+
+    return float(np.polyfit(np.log(ops[fitted]), np.log(times[fitted]), 1)[0])
+
+
+def compare(current, baseline):
+    """
+    Compare the times with the baseline measured at the same sizes.
+
+    Returns:
+        dictionary of stage as key and the worst ratio to the baseline as value
+    """
+    ratios = {}
+
+    if baseline is None or baseline.get("ops") != current["ops"]:
+        return ratios
+
+    for stage, result in current["stages"].items():
+        if stage not in baseline["stages"]:
+            continue
+
+        # Times too short to compare are left out
+        pairs = [
+            (now, then)
+            for now, then in zip(result["time"], baseline["stages"][stage]["time"])
+            if then >= MINIMUM_TIME / 10
+        ]
+
+        if pairs:
+            ratios[stage] = max(now / then for now, then in pairs)
+
+    return ratios
+
+
+def main():
+    PARSER = argparse.ArgumentParser(description="DXT Explorer pipeline benchmark")
+
+    PARSER.add_argument(
+        "--axis",
+        choices=list(AXES),
+        default="ops",
+        help="Dimension of the workload that grows (default: ops)",
+    )
+
+    PARSER.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8],
+        help="Multipliers of the base workload (default: 1 2 4 8)",
+    )
+
+    PARSER.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Number of runs at each size, the best one is reported (default: 1)",
+    )
+
+    PARSER.add_argument("--seed", type=int, default=0, help="Seed of the synthetic traces")
+
+    PARSER.add_argument(
+        "--no-plots",
+        default=True,
+        action="store_false",
+        dest="plots",
+        help="Skip the plot scripts",
+    )
+
+    PARSER.add_argument(
+        "--baseline",
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json"),
+        help="Baseline to compare with (default: benchmarks/baseline.json)",
+    )
+
+    PARSER.add_argument(
+        "--save",
+        default=False,
+        action="store_true",
+        help="Store the results as the new baseline",
+    )
+
+    PARSER.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.5,
+        help="Slowdown against the baseline flagged as a regression (default: 1.5)",
+    )
+
+    PARSER.add_argument(
+        "--max_slope",
+        type=float,
+        default=1.3,
+        help="Log-log slope of time against operations flagged as super-linear (default: 1.3)",
+    )
+
+    PARSER.add_argument(
+        "--check",
+        default=False,
+        action="store_true",
+        help="Exit with an error if any stage is flagged, failed stages always exit with an error",
+    )
+
+    PARSER.add_argument("-o", "--output", default=None, help="Save the results as JSON")
+
+    ARGS = PARSER.parse_args()
+
+    current = run(ARGS.axis, sorted(ARGS.sizes), ARGS.repeat, ARGS.seed, ARGS.plots)
+
+    baselines = {}
+    if os.path.exists(ARGS.baseline):
+        with open(ARGS.baseline) as f:
+            baselines = json.load(f)
+
+    ratios = compare(current, baselines.get(ARGS.axis))
+
+    failed = False
+
+    print(
+        "{:<32} {:>12} {:>12} {:>8} {:>10}  {}".format(
+            "STAGE", "TIME (s)", "MEMORY (MB)", "SLOPE", "BASELINE", "STATUS"
+        )
+    )
+
+    for stage, result in sorted(current["stages"].items()):
+        flags = []
+
+        slope = scaling_slope(current["ops"], result["time"])
+
+        if slope is not None and slope > ARGS.max_slope:
+            flags.append("super-linear")
+
+        ratio = ratios.get(stage)
+        if ratio is not None and ratio > ARGS.tolerance:
+            flags.append("regression")
+
+        memory = result["memory"][-1]
+
+        print(
+            "{:<32} {:>12.4f} {:>12} {:>8} {:>10}  {}".format(
+                stage,
+                result["time"][-1],
+                "-" if memory is None else "{:.1f}".format(memory / 1024 ** 2),
+                "-" if slope is None else "{:.2f}".format(slope),
+                "-" if ratio is None else "{:.2f}x".format(ratio),
+                ", ".join(flags) if flags else "ok",
+            )
+        )
+
+        result["slope"] = slope
+        result["flags"] = flags
+
+        failed = failed or bool(flags)
+
+    for stage, error in sorted(current["errors"].items()):
+        print("{:<32} {}".format(stage, error))
+
+    if ARGS.output:
+        with open(ARGS.output, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if ARGS.save:
+        baselines[ARGS.axis] = current
+
+        with open(ARGS.baseline, "w") as f:
+            json.dump(baselines, f, indent=2)
+
+        print("baseline saved: {}".format(ARGS.baseline))
+
+    # A stage that fails is always an error, the flags only with --check
+    sys.exit(1 if current["errors"] or (failed and ARGS.check) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,801 @@
+"""
+Library API of DXT Explorer.
+
+The functions in this module parse the DXT traces of a Darshan log into
+tables and analyze them in memory, so notebooks and services can reuse the
+parsed data without running the command line or reading the files it writes.
+The command line is a thin layer over them: it saves the tables built here as
+the datasets read by the plot scripts.
+
+Traces too large to fit in memory can be streamed instead, in fixed-size
+record batches with the same columns, see iter_batches.
+
+    from explorer import api
+
+    table = api.load_dxt("app.darshan", files=["/scratch/output.h5"])
+    phases = api.io_phases(table)
+    diagnosis = api.diagnose(table, phases)
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from explorer import dataset
+from explorer import insights
+from explorer import summary
+
+
+SCHEMA = pa.schema(
+    [
+        ("file_id", pa.uint64()),
+        ("api", pa.string()),
+        ("rank", pa.int64()),
+        ("operation", pa.string()),
+        ("segment", pa.int64()),
+        ("offset", pa.int64()),
+        ("size", pa.int64()),
+        ("size_bin", pa.uint8()),
+        ("start", pa.float64()),
+        ("end", pa.float64()),
+        ("osts", pa.list_(pa.int64())),
+    ]
+)
+
+# Operations of each batch streamed by iter_batches
+BATCH_SIZE = 65536
+
+# Buffers of a batch, the text columns are kept as codes into APIS and OPERATIONS
+BATCH_COLUMNS = {
+    "file_id": np.uint64,
+    "api": np.uint8,
+    "rank": np.int64,
+    "operation": np.uint8,
+    "segment": np.int64,
+    "offset": np.int64,
+    "size": np.int64,
+    "size_bin": np.uint8,
+    "start": np.float64,
+    "end": np.float64,
+}
+
+APIS = ["POSIX", "MPIIO"]
+
+OPERATIONS = ["write", "read"]
+
+APIS_ARRAY = pa.array(APIS)
+
+OPERATIONS_ARRAY = pa.array(OPERATIONS)
+
+IO_PHASES_COLUMNS = [
+    "index",
+    "api",
+    "operation",
+    "start",
+    "end",
+    "duration",
+    "fastest_rank",
+    "fastest_rank_start",
+    "fastest_rank_end",
+    "fastest_rank_duration",
+    "slowest_rank",
+    "slowest_rank_start",
+    "slowest_rank_end",
+    "slowest_rank_duration",
+    "threshold",
+]
+
+
+def get_schema(size_bins=None):
+    """
+    Schema of the parsed datasets, recording the edges of their size bins.
+
+    Arguments:
+        size_bins: edges of the request size bins, see dataset.get_size_bins
+    """
+    if size_bins is None:
+        size_bins = dataset.get_size_bins()
+
+    return SCHEMA.with_metadata(dataset.get_size_bins_metadata(size_bins))
+
+
+def to_frame(table):
+    """Convert an Arrow table into a dataframe, dataframes are returned as is."""
+    if isinstance(table, pa.Table):
+        return table.to_pandas()
+
+    return table
+
+
+def get_lustre_layouts(report):
+    """
+    Read the Lustre stripe layout of each file of a report.
+
+    Arguments:
+        report: DarshanReport, the Lustre records are loaded if needed
+
+    Returns:
+        dictionary of file id as key and (stripe size, stripe count, OST ids
+        in stripe order) as value
+    """
+    if "LUSTRE" not in report.modules:
+        return {}
+
+    if "LUSTRE" not in report.records:
+        report.mod_read_all_lustre_records("LUSTRE")
+
+    counters = report.counters["LUSTRE"]["counters"]
+
+    layouts = {}
+
+    for record in report.records["LUSTRE"]:
+        if record["id"] in layouts:
+            continue
+
+        try:
+            # Logs with composite layouts describe each component, the first
+            # one holds the beginning of the file
+            component = record["components"][0]
+
+            values = dict(zip(counters, component["counters"]))
+            stripe_size = values["LUSTRE_COMP_STRIPE_SIZE"]
+            stripe_count = values["LUSTRE_COMP_STRIPE_COUNT"]
+            ost_ids = component["ost_ids"]
+        except KeyError:
+            values = dict(zip(counters, record["counters"]))
+            stripe_size = values["LUSTRE_STRIPE_SIZE"]
+            stripe_count = values["LUSTRE_STRIPE_WIDTH"]
+            ost_ids = record["ost_ids"]
+
+        ost_ids = np.asarray(ost_ids, dtype=np.int64)[: max(stripe_count, 0)]
+
+        if stripe_size <= 0 or len(ost_ids) == 0:
+            continue
+
+        layouts[record["id"]] = (int(stripe_size), len(ost_ids), ost_ids)
+
+    return layouts
+
+
+def stripe_osts(offset, size, stripe_size, ost_ids):
+    """
+    Find the OSTs touched by each operation on a striped file.
+
+    Each operation touches the OST of its first stripe and of every following
+    stripe up to its last byte, at most once per OST.
+
+    Arguments:
+        offset: numpy array with the offset of each operation
+        size: numpy array with the size of each operation
+        stripe_size: Lustre stripe size in bytes
+        ost_ids: OSTs of the file in stripe order
+
+    Returns:
+        Arrow list array with the OST ids of each operation
+    """
+    stripes = len(ost_ids)
+
+    first = offset // stripe_size
+    counts = np.minimum((offset + size) // stripe_size - first + 1, stripes)
+
+    ends = np.cumsum(counts)
+    step = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - counts, counts)
+
+    return pa.ListArray.from_arrays(
+        pa.array(np.concatenate(([0], ends)).astype(np.int32)),
+        pa.array(ost_ids[(np.repeat(first, counts) + step) % stripes]),
+    )
+
+
+def build_table(file_id, records, window=None, layout=None):
+    """
+    Convert the DXT records of a file into a table.
+
+    Arguments:
+        file_id: id of the file
+        records: list of (api, rank, segments, write count) with the write
+            segments of each record followed by its read segments
+        window: time limits of the operations to keep
+        layout: Lustre layout of the file, see get_lustre_layouts
+
+    Returns:
+        Arrow table with the schema of the parsed datasets, in record order
+    """
+    counts = np.array([len(segments) for _, _, segments, _ in records], dtype=np.int64)
+
+    segments = np.concatenate(
+        [segments for _, _, segments, _ in records]
+        or [np.zeros(0, dtype=summary.SEGMENT)]
+    )
+
+    # Position of each segment inside its record
+    position = np.arange(len(segments)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    write_count = np.repeat([writes for _, _, _, writes in records], counts).astype(
+        np.int64
+    )
+    is_write = position < write_count
+
+    start = segments["start_time"].round(4)
+    end = segments["end_time"].round(4)
+
+    size_bins = dataset.get_size_bins()
+
+    columns = {
+        "file_id": np.full(len(segments), file_id, dtype=np.uint64),
+        "api": np.repeat([api for api, _, _, _ in records], counts).astype(str),
+        "rank": np.repeat([rank for _, rank, _, _ in records], counts).astype(np.int64),
+        "operation": np.where(is_write, "write", "read"),
+        "segment": np.where(is_write, position, position - write_count),
+        "offset": segments["offset"],
+        "size": segments["length"],
+        "size_bin": dataset.size_bins(segments["length"], size_bins),
+        "start": start,
+        "end": end,
+    }
+
+    if window is not None and window.has_time():
+        mask = window.time_mask(start, end)
+
+        columns = {name: values[mask] for name, values in columns.items()}
+
+    if layout is None:
+        columns["osts"] = pa.nulls(len(columns["start"]), SCHEMA.field("osts").type)
+    else:
+        stripe_size, stripe_count, ost_ids = layout
+
+        columns["osts"] = stripe_osts(
+            columns["offset"], columns["size"], stripe_size, ost_ids
+        )
+
+    return pa.table(columns, schema=get_schema(size_bins))
+
+
+def build_tables(records, file_ids=None, window=None, layouts=None):
+    """
+    Convert DXT records into a table for each file.
+
+    Arguments:
+        records: iterable of (api, file id, rank, write segments, read
+            segments), as returned by summary.iter_records
+        file_ids: ids of the files to convert, all of them if None
+        window: time and rank limits of the operations to keep
+        layouts: Lustre layout of each file id, see get_lustre_layouts
+
+    Returns:
+        dictionary of file id as key and Arrow table as value
+    """
+    if file_ids is not None:
+        file_ids = set(file_ids)
+
+    layouts = layouts or {}
+
+    parts = {}
+
+    for api, file_id, rank, writes, reads in records:
+        if file_ids is not None and file_id not in file_ids:
+            continue
+
+        if window is not None and not window.contains_rank(rank):
+            continue
+
+        # Copy the segments, the views are only valid until the next record
+        parts.setdefault(file_id, []).append(
+            (api, rank, np.concatenate([writes, reads]), len(writes))
+        )
+
+    return {
+        file_id: build_table(file_id, parts[file_id], window, layouts.get(file_id))
+        for file_id in parts
+    }
+
+
+def read_tables(filename, file_ids=None, window=None, layouts=None):
+    """
+    Parse the DXT segments of the selected files in a single pass over a log.
+
+    The segments are read straight from the buffers of the Darshan library,
+    without decoding them into Python objects.
+
+    Arguments:
+        filename: path to the .darshan file
+        file_ids: ids of the files to parse, all of them if None
+        window: time and rank limits of the operations to keep
+        layouts: Lustre layout of each file id, see get_lustre_layouts
+
+    Returns:
+        dictionary of file id as key and Arrow table as value
+    """
+    return build_tables(summary.iter_records(filename), file_ids, window, layouts)
+
+
+def sort_table(table):
+    """Sort a table by start time, keeping the order of simultaneous operations."""
+    if table.num_rows == 0:
+        return table
+
+    return table.take(pc.sort_indices(table, sort_keys=[("start", "ascending")]))
+
+
+def get_file_ids(path, files):
+    """Ids of the files given by name or id, None selects every file."""
+    if files is None:
+        return None
+
+    names = summary.get_file_names(path)
+    ids = {name: file_id for file_id, name in names.items()}
+
+    return [ids.get(file, file) for file in files]
+
+
+def read_lustre_layouts(path):
+    """Read the Lustre stripe layout of each file of a log, see get_lustre_layouts."""
+    import darshan
+
+    return get_lustre_layouts(darshan.DarshanReport(path, read_all=False))
+
+
+def load_dxt(path, files=None, window=None, osts=True, as_pandas=False):
+    """
+    Parse the DXT trace of a Darshan log.
+
+    Arguments:
+        path: path to the .darshan file
+        files: ids or names of the files to load, all of them if None
+        window: dataset.Window with the time and rank limits to keep
+        osts: attach the Lustre OSTs touched by each operation
+        as_pandas: return a dataframe instead of an Arrow table
+
+    Returns:
+        table with one row per DXT segment, sorted by start time, with the
+        columns of the datasets converted by dxt-explorer
+    """
+    file_ids = get_file_ids(path, files)
+
+    layouts = None
+    if osts:
+        layouts = read_lustre_layouts(path)
+
+    tables = read_tables(path, file_ids, window, layouts)
+
+    if tables:
+        table = sort_table(pa.concat_tables(list(tables.values())))
+    else:
+        table = get_schema().empty_table()
+
+    if as_pandas:
+        return table.to_pandas()
+
+    return table
+
+
+class BatchBuffer:
+    """Reusable buffers holding the operations of a record batch."""
+
+    def __init__(self, size, layouts=None):
+        """
+        Allocate the buffers.
+
+        Arguments:
+            size: number of operations of each batch
+            layouts: Lustre layout of each file id, no OSTs are attached if None
+        """
+        self.size = size
+        self.layouts = layouts
+        self.rows = 0
+
+        self.size_bins = dataset.get_size_bins()
+        self.schema = get_schema(self.size_bins)
+
+        # Files of consecutive rows, as (file id, first row, last row)
+        self.runs = []
+
+        self.columns = {
+            name: np.empty(size, dtype=dtype) for name, dtype in BATCH_COLUMNS.items()
+        }
+
+    def is_full(self):
+        """Check if the buffers have no room left."""
+        return self.rows == self.size
+
+    def append(self, file_id, api, rank, operation, segment, offset, size, start, end):
+        """
+        Copy operations of a record into the buffers, as many as fit.
+
+        Returns:
+            number of operations copied
+        """
+        count = min(self.size - self.rows, len(offset))
+        rows = slice(self.rows, self.rows + count)
+
+        columns = self.columns
+        columns["file_id"][rows] = file_id
+        columns["api"][rows] = APIS.index(api)
+        columns["rank"][rows] = rank
+        columns["operation"][rows] = OPERATIONS.index(operation)
+        columns["segment"][rows] = segment[:count]
+        columns["offset"][rows] = offset[:count]
+        columns["size"][rows] = size[:count]
+        columns["size_bin"][rows] = dataset.size_bins(size[:count], self.size_bins)
+        columns["start"][rows] = start[:count]
+        columns["end"][rows] = end[:count]
+
+        if self.runs and self.runs[-1][0] == file_id:
+            self.runs[-1][2] = self.rows + count
+        else:
+            self.runs.append([file_id, self.rows, self.rows + count])
+
+        self.rows += count
+
+        return count
+
+    def osts(self):
+        """OSTs touched by each buffered operation."""
+        offset = self.columns["offset"]
+        size = self.columns["size"]
+
+        arrays = []
+
+        for file_id, first, last in self.runs:
+            layout = self.layouts.get(file_id)
+
+            if layout is None:
+                arrays.append(pa.nulls(last - first, SCHEMA.field("osts").type))
+            else:
+                stripe_size, stripe_count, ost_ids = layout
+
+                arrays.append(
+                    stripe_osts(offset[first:last], size[first:last], stripe_size, ost_ids)
+                )
+
+        if not arrays:
+            return pa.nulls(0, SCHEMA.field("osts").type)
+
+        return pa.concat_arrays(arrays)
+
+    def flush(self):
+        """
+        Wrap the buffered operations into a record batch and empty the buffers.
+
+        The numeric columns of the batch share the memory of the buffers.
+        """
+        columns = {
+            name: values[: self.rows] for name, values in self.columns.items()
+        }
+
+        arrays = {
+            "file_id": pa.array(columns["file_id"], type=pa.uint64()),
+            "api": APIS_ARRAY.take(pa.array(columns["api"])),
+            "rank": pa.array(columns["rank"]),
+            "operation": OPERATIONS_ARRAY.take(pa.array(columns["operation"])),
+            "segment": pa.array(columns["segment"]),
+            "offset": pa.array(columns["offset"]),
+            "size": pa.array(columns["size"]),
+            "size_bin": pa.array(columns["size_bin"]),
+            "start": pa.array(columns["start"]),
+            "end": pa.array(columns["end"]),
+        }
+
+        if self.layouts is None:
+            arrays["osts"] = pa.nulls(self.rows, SCHEMA.field("osts").type)
+        else:
+            arrays["osts"] = self.osts()
+
+        batch = pa.RecordBatch.from_arrays(
+            [arrays[name] for name in SCHEMA.names], schema=self.schema
+        )
+
+        self.rows = 0
+        self.runs = []
+
+        return batch
+
+
+def iter_batches(
+    path, files=None, window=None, batch_size=BATCH_SIZE, osts=False, reuse=True
+):
+    """
+    Stream the DXT operations of a Darshan log in fixed-size record batches.
+
+    The log is read one record at a time, so the memory used does not depend
+    on the size of the trace. Batches have the schema of the datasets
+    converted by dxt-explorer, with the operations in log order: the write
+    segments of a record followed by its read segments. Only the last batch
+    may hold fewer than batch_size operations.
+
+    With reuse, every batch is backed by the same buffers, so it is only valid
+    until the next one is requested. Reduce each batch as it comes, or pass
+    reuse=False to keep them.
+
+    Arguments:
+        path: path to the .darshan file
+        files: ids or names of the files to stream, all of them if None
+        window: dataset.Window with the time and rank limits to keep
+        batch_size: number of operations of each batch
+        osts: attach the Lustre OSTs touched by each operation
+        reuse: fill the same buffers for every batch
+
+    Returns:
+        generator of Arrow record batches
+    """
+    file_ids = get_file_ids(path, files)
+
+    if file_ids is not None:
+        file_ids = set(file_ids)
+
+    layouts = None
+    if osts:
+        layouts = read_lustre_layouts(path)
+
+    buffer = BatchBuffer(batch_size, layouts)
+
+    for api, file_id, rank, writes, reads in summary.iter_records(path):
+        if file_ids is not None and file_id not in file_ids:
+            continue
+
+        if window is not None and not window.contains_rank(rank):
+            continue
+
+        for operation, segments in [("write", writes), ("read", reads)]:
+            segment = np.arange(len(segments))
+
+            start = segments["start_time"].round(4)
+            end = segments["end_time"].round(4)
+
+            offset = segments["offset"]
+            size = segments["length"]
+
+            if window is not None and window.has_time():
+                mask = window.time_mask(start, end)
+
+                segment = segment[mask]
+                offset = offset[mask]
+                size = size[mask]
+                start = start[mask]
+                end = end[mask]
+
+            while len(segment):
+                count = buffer.append(
+                    file_id, api, rank, operation, segment, offset, size, start, end
+                )
+
+                segment = segment[count:]
+                offset = offset[count:]
+                size = size[count:]
+                start = start[count:]
+                end = end[count:]
+
+                if buffer.is_full():
+                    yield buffer.flush()
+
+                    if not reuse:
+                        buffer = BatchBuffer(batch_size, layouts)
+
+    if buffer.rows:
+        yield buffer.flush()
+
+
+def merge_overlapping_io_phases(overlapping_df, df, module):
+    """
+    Merge the busy intervals of an API separated by short idle times into I/O phases.
+
+    Arguments:
+        overlapping_df: merged intervals of the operations, sorted by start
+        df: operations of the API, sorted by start
+        module: name of the API
+
+    Returns:
+        dataframe with one row per I/O phase, with its fastest and slowest ranks
+    """
+    io_phases_df = pd.DataFrame(columns=IO_PHASES_COLUMNS)
+
+    overlapping_df_end = overlapping_df[["End"]].to_numpy()
+    overlapping_df_start = overlapping_df[["Start"]].to_numpy()
+    interval_duration = 0
+
+    for i in range(len(overlapping_df_end) - 1):
+        interval_start = overlapping_df_end[i]
+        interval_end = overlapping_df_start[i + 1]
+        interval_duration = interval_duration + (interval_end - interval_start)
+
+    threshold = 0.0
+    if len(overlapping_df_end) > 1:
+        threshold = float(interval_duration / (len(overlapping_df_end) - 1))
+
+    merged_df = pd.DataFrame(columns=["Start", "End"])
+
+    # A single busy interval is a single phase
+    if len(overlapping_df_end) == 1:
+        merged_df.loc[0] = [float(overlapping_df_start[0]), float(overlapping_df_end[0])]
+
+    if len(overlapping_df_end) != 0:
+        prev_value = overlapping_df_end[0]
+        prev_index = 0
+
+        for i in range(1, len(overlapping_df_end)):
+            if overlapping_df_start[i] - prev_value <= threshold:
+                prev_value = overlapping_df_end[i]
+            if (
+                overlapping_df_start[i] - prev_value > threshold
+                or i == len(overlapping_df_end) - 1
+            ):
+                merged_df.loc[len(merged_df.index)] = [
+                    float(overlapping_df_start[prev_index]),
+                    float(prev_value),
+                ]
+                prev_index = i
+                prev_value = overlapping_df_end[i]
+
+    if not merged_df.empty:
+        for i in range(len(merged_df)):
+            start = merged_df["Start"].iat[i]
+            end = merged_df["End"].iat[i]
+
+            df_temp = df[df["start"] >= start]
+            df_temp = df_temp[df_temp["end"] <= end]
+            df_temp["duration"] = df_temp["end"] - df_temp["start"]
+
+            min = df_temp.loc[df_temp["end"] == df_temp["end"].min()]
+            fastest_rank = min["rank"].tolist()
+            fastest_rank_start = min["start"].tolist()
+            fastest_rank_end = min["end"].tolist()
+            fastest_rank_duration = min["duration"].tolist()
+            if fastest_rank:
+                fastest_rank = fastest_rank[0]
+                fastest_rank_duration = fastest_rank_duration[0]
+                fastest_rank_start = fastest_rank_start[0]
+                fastest_rank_end = fastest_rank_end[0]
+
+            max = df_temp.loc[df_temp["end"] == df_temp["end"].max()]
+            slowest_rank = max["rank"].tolist()
+            slowest_rank_start = max["start"].tolist()
+            slowest_rank_end = max["end"].tolist()
+            slowest_rank_duration = max["duration"].tolist()
+            if slowest_rank:
+                slowest_rank = slowest_rank[0]
+                slowest_rank_duration = slowest_rank_duration[0]
+                slowest_rank_start = slowest_rank_start[0]
+                slowest_rank_end = slowest_rank_end[0]
+
+            operation = ""
+            if df_temp["operation"].eq("read").any():
+                if df_temp["operation"].eq("write").any():
+                    operation = "read&write"
+                else:
+                    operation = "read"
+            elif df_temp["operation"].eq("write").any():
+                operation = "write"
+
+            start = df_temp["start"].min()
+            end = df_temp["end"].max()
+            duration = end - start
+            io_phases_df.loc[len(io_phases_df.index)] = [
+                0,
+                module,
+                operation,
+                start,
+                end,
+                duration,
+                fastest_rank,
+                fastest_rank_start,
+                fastest_rank_end,
+                fastest_rank_duration,
+                slowest_rank,
+                slowest_rank_start,
+                slowest_rank_end,
+                slowest_rank_duration,
+                threshold,
+            ]
+
+    io_phases_df.dropna(inplace=True)
+    return io_phases_df
+
+
+def io_phases(table):
+    """
+    Detect the I/O phases of a DXT trace.
+
+    Arguments:
+        table: Arrow table or dataframe returned by load_dxt
+
+    Returns:
+        dataframe with one row per I/O phase of each API
+    """
+    import pyranges as pr
+
+    df = to_frame(table)
+
+    if df.empty:
+        return pd.DataFrame()
+
+    df_selected = df[["api", "start", "end"]].copy()
+    df_selected["start"] = df_selected["start"] * 10000
+    df_selected["end"] = df_selected["end"] * 10000
+    df_selected.columns = ["Chromosome", "Start", "End"]
+
+    gr = pr.PyRanges(df_selected)
+    overlapping = gr.merge()
+    overlapping = overlapping.as_df()
+
+    overlapping["Start"] = overlapping["Start"] / 10000
+    overlapping["End"] = overlapping["End"] / 10000
+
+    frames = []
+
+    for module in ["POSIX", "MPIIO"]:
+        df_module = df[df["api"] == module]
+        df_module = df_module.sort_values("start")
+
+        overlapping_module = overlapping[overlapping["Chromosome"] == module]
+
+        frames.append(
+            merge_overlapping_io_phases(overlapping_module, df_module, module)
+        )
+
+    return pd.concat(frames)
+
+
+def diagnose(table, phases=None):
+    """
+    Run the bottleneck detectors on a DXT trace.
+
+    Arguments:
+        table: Arrow table or dataframe returned by load_dxt
+        phases: I/O phases returned by io_phases, detected if None
+
+    Returns:
+        dictionary with the messages of the rank zero workload detector, the
+        ranks with unbalanced workloads, the operations of collective metadata
+        candidates, the fastest and slowest ranks of each I/O phase of each
+        API, and the access patterns of each API and of each of its ranks
+    """
+    df = to_frame(table).copy()
+    df["duration"] = (df["end"] - df["start"]).round(4)
+
+    if phases is None:
+        phases = io_phases(df)
+
+    diagnosis = insights.insights(df)
+
+    stragglers = {"POSIX": pd.DataFrame(), "MPIIO": pd.DataFrame()}
+    if not phases.empty:
+        stragglers["POSIX"], stragglers["MPIIO"] = diagnosis.stragglers(phases)
+
+    rank_access_patterns, access_patterns = diagnosis.access_patterns()
+
+    return {
+        "rank_zero_workload": diagnosis.rank_zero_workload(),
+        "unbalanced_workloads": diagnosis.unbalanced_workloads(),
+        "collective_metadata": diagnosis.collective_metadata(),
+        "stragglers": stragglers,
+        "access_patterns": access_patterns,
+        "rank_access_patterns": rank_access_patterns,
+    }
+
+
+def write_dataset(table, name, csv=False):
+    """
+    Save a table as the dataset read by the plot scripts.
+
+    Arguments:
+        table: Arrow table of a single file, as built by read_tables
+        name: name of the dataset without extension
+        csv: also save the operations as CSV
+
+    Returns:
+        number of operations saved
+    """
+    table = dataset.write(table, name + ".dxt")
+
+    total_logs = table.num_rows
+    runtime = pc.max(table["end"]).as_py() if total_logs else 0
+
+    if csv:
+        table.to_pandas().to_csv(name + ".dxt.csv", mode="a", index=False, header=True)
+
+    pd.DataFrame({"total_logs": [total_logs], "runtime": [runtime]}).to_csv(
+        name + ".summary.dxt.csv", mode="w", index=False, header=True
+    )
+
+    return total_logs
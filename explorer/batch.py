@@ -0,0 +1,572 @@
+"""
+Batch processing of Darshan logs.
+
+Every log found in the given paths is explored by a pool of worker processes,
+each one running the same pipeline as dxt-explorer into its own output
+directory. A failure is recorded and the remaining logs are still processed.
+At the end, an index page links the reports of all the logs.
+"""
+
+import os
+import sys
+import json
+import time
+import shlex
+import shutil
+import signal
+import logging
+import argparse
+import collections
+import datetime
+import concurrent.futures
+
+from explorer import dxt
+from explorer import version as dxt_version
+
+
+def find_logs(paths):
+    """
+    Collect the .darshan files from a list of files and directories.
+
+    Arguments:
+        paths: files or directories, directories are searched recursively
+
+    Returns:
+        sorted list of paths to .darshan files
+    """
+    logs = set()
+
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                for name in files:
+                    if name.endswith(".darshan"):
+                        logs.add(os.path.join(root, name))
+        elif path.endswith(".darshan") and os.path.exists(path):
+            logs.add(path)
+
+    return sorted(logs)
+
+
+def get_log_prefixes(logs, prefix, used=None):
+    """
+    Name a distinct output directory for each log.
+
+    Arguments:
+        logs: paths to the .darshan files
+        prefix: output directory of the batch
+        used: names of the subdirectories already taken by other logs
+
+    Returns:
+        dictionary of log as key and output directory as value
+    """
+    prefixes = {}
+    used = set() if used is None else set(used)
+
+    for log in logs:
+        name = os.path.basename(log)[: -len(".darshan")]
+
+        candidate = name
+        count = 1
+        while candidate in used:
+            count += 1
+            candidate = "{}-{}".format(name, count)
+
+        used.add(candidate)
+        prefixes[log] = os.path.join(prefix, candidate)
+
+    return prefixes
+
+
+def process_log(log, prefix, options):
+    """
+    Explore a single log, called inside a worker process.
+
+    Arguments:
+        log: path to the .darshan file
+        prefix: output directory of the log
+        options: dxt-explorer command line options to apply
+
+    Returns:
+        dictionary with the status of the log
+    """
+    start = time.time()
+
+    os.makedirs(prefix, exist_ok=True)
+
+    logger = logging.getLogger("DXT Explorer")
+    handlers = list(logger.handlers)
+
+    status = "ok"
+    message = ""
+
+    try:
+        # The workers have no terminal, large traces are split without asking
+        args = dxt.build_parser().parse_args(
+            options + ["--yes", "--prefix", prefix, log]
+        )
+
+        explorer = dxt.Explorer(args)
+
+        # Keep the messages of each log next to its report
+        log_file = logging.FileHandler(os.path.join(prefix, "dxt-explorer.log"))
+        log_file.setFormatter(
+            logging.Formatter("%(asctime)s %(module)s - %(levelname)s - %(message)s")
+        )
+        logger.handlers = [log_file]
+
+        explorer.run()
+    except SystemExit as e:
+        # The explorer exits when there is nothing to explore or a plot fails
+        if e.code:
+            status = "error"
+            message = "exited with code {}".format(e.code)
+        elif not os.path.exists(os.path.join(prefix, "index.html")):
+            status = "skipped"
+            message = "no DXT trace data to explore"
+    except Exception as e:
+        status = "error"
+        message = "{}: {}".format(type(e).__name__, e)
+    finally:
+        for handler in logger.handlers:
+            handler.close()
+
+        logger.handlers = handlers
+
+    return {
+        "log": log,
+        "prefix": prefix,
+        "status": status,
+        "message": message,
+        "runtime": round(time.time() - start, 4),
+    }
+
+
+class Batch:
+    def __init__(self, args, options):
+        """Initialize the batch of logs."""
+        self.args = args
+        self.options = options
+
+        self.configure_log()
+
+        self.ROOT = os.path.abspath(os.path.dirname(__file__))
+
+    def configure_log(self):
+        """Configure the logging system."""
+        self.logger = logging.getLogger("DXT Explorer Batch")
+        self.logger.setLevel(logging.INFO)
+
+        # Defines the format of the logger
+        formatter = logging.Formatter(
+            "%(asctime)s %(module)s - %(levelname)s - %(message)s"
+        )
+
+        console = logging.StreamHandler()
+
+        console.setFormatter(formatter)
+
+        self.logger.addHandler(console)
+
+    def run(self):
+        self.batch_start_time = time.time()
+
+        self.prefix = os.path.abspath(self.args.prefix if self.args.prefix else os.getcwd())
+
+        if self.args.watch:
+            os.makedirs(self.prefix, exist_ok=True)
+
+            self.watch()
+
+            return
+
+        logs = find_logs(self.args.paths)
+
+        if not logs:
+            self.logger.error("No .darshan files found")
+
+            sys.exit(os.EX_NOINPUT)
+
+        self.logger.info(
+            "processing {} logs with {} workers".format(len(logs), self.args.jobs)
+        )
+
+        results = self.process(logs, get_log_prefixes(logs, self.prefix))
+
+        self.generate_index(results)
+
+        if any(result["status"] == "error" for result in results):
+            sys.exit(os.EX_SOFTWARE)
+
+    def process(self, logs, prefixes):
+        """Explore the logs in parallel, returning the results in the order of the logs."""
+        results = {}
+
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.args.jobs
+        ) as executor:
+            futures = {
+                executor.submit(process_log, log, prefixes[log], self.options): log
+                for log in logs
+            }
+
+            for future in concurrent.futures.as_completed(futures):
+                log = futures[future]
+
+                results[log] = self.get_result(future, log, prefixes[log])
+
+        return [results[log] for log in logs]
+
+    def get_result(self, future, log, prefix):
+        """Collect and report the result of a finished log."""
+        try:
+            result = future.result()
+        except Exception as e:
+            # The worker itself died (e.g., a crash inside the Darshan library)
+            result = {
+                "log": log,
+                "prefix": prefix,
+                "status": "error",
+                "message": "{}: {}".format(type(e).__name__, e),
+                "runtime": None,
+            }
+
+        if result["status"] == "error":
+            self.logger.error("{}: {}".format(log, result["message"]))
+        elif result["status"] == "skipped":
+            self.logger.warning("{}: {}".format(log, result["message"]))
+        else:
+            self.logger.info("SUCCESS: {} ({} seconds)".format(log, result["runtime"]))
+
+        return result
+
+    def read_ledger(self):
+        """Load the logs processed by previous runs of the watcher."""
+        ledger_file = os.path.join(self.prefix, "ledger.json")
+
+        if not os.path.exists(ledger_file):
+            return {}
+
+        with open(ledger_file) as f:
+            return json.load(f)
+
+    def write_json(self, name, data):
+        """Atomically replace a JSON file in the output directory."""
+        output_file = os.path.join(self.prefix, name)
+
+        with open(output_file + ".tmp", "w") as f:
+            json.dump(data, f, indent=2)
+
+        os.replace(output_file + ".tmp", output_file)
+
+    def scan(self, ledger, seen, queued):
+        """
+        Look for new logs in the watched paths.
+
+        A log is only queued once its size and modification time did not
+        change between two scans, so logs still being written are left alone.
+
+        Returns:
+            list of the logs ready to be explored
+        """
+        ready = []
+        current = {}
+
+        for log in find_logs(self.args.paths):
+            if log in queued:
+                continue
+
+            try:
+                stat = os.stat(log)
+            except OSError:
+                continue
+
+            size, mtime = stat.st_size, stat.st_mtime
+
+            # Explored by a previous run and not modified since
+            entry = ledger.get(log)
+            if entry is not None and (entry["size"], entry["mtime"]) == (size, mtime):
+                continue
+
+            current[log] = (size, mtime)
+
+            if seen.get(log) == (size, mtime):
+                ready.append(log)
+
+        seen.clear()
+        seen.update(current)
+
+        return ready
+
+    def watch(self):
+        """Explore the logs that show up in the watched paths until interrupted."""
+        ledger = self.read_ledger()
+
+        self.logger.info(
+            "watching {} with {} workers ({} logs already processed)".format(
+                ", ".join(self.args.paths), self.args.jobs, len(ledger)
+            )
+        )
+
+        # Stop gracefully on SIGTERM as well, keeping the ledger consistent
+        def terminate(signum, frame):
+            raise KeyboardInterrupt()
+
+        signal.signal(signal.SIGTERM, terminate)
+
+        status = {
+            "started": str(datetime.datetime.now()),
+            "updated": None,
+            "queued": 0,
+            "running": 0,
+            "processed": 0,
+            "errors": 0,
+            "skipped": 0,
+            "throughput": 0.0,
+            "average_runtime": None,
+        }
+
+        seen = {}
+        queue = collections.deque()
+        running = {}
+        prefixes = {}
+
+        busy_time = 0.0
+
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.args.jobs)
+
+        try:
+            while True:
+                ready = self.scan(ledger, seen, set(queue) | set(running.values()))
+
+                if ready:
+                    used = [
+                        os.path.basename(entry["prefix"]) for entry in ledger.values()
+                    ] + [os.path.basename(prefix) for prefix in prefixes.values()]
+
+                    prefixes.update(get_log_prefixes(ready, self.prefix, used))
+                    queue.extend(ready)
+
+                    self.logger.info("queued {} new logs".format(len(ready)))
+
+                while queue and len(running) < self.args.jobs:
+                    log = queue.popleft()
+
+                    future = executor.submit(
+                        process_log, log, prefixes[log], self.options
+                    )
+                    running[future] = log
+
+                if running:
+                    done, _ = concurrent.futures.wait(
+                        running,
+                        timeout=self.args.interval,
+                        return_when=concurrent.futures.FIRST_COMPLETED,
+                    )
+                else:
+                    done = []
+                    time.sleep(self.args.interval)
+
+                for future in done:
+                    log = running.pop(future)
+                    prefix = prefixes.pop(log)
+
+                    result = self.get_result(future, log, prefix)
+
+                    stat = os.stat(log) if os.path.exists(log) else None
+
+                    result["size"] = stat.st_size if stat else None
+                    result["mtime"] = stat.st_mtime if stat else None
+                    result["finished"] = str(datetime.datetime.now())
+
+                    ledger[log] = result
+
+                    status["processed"] += 1
+
+                    if result["status"] == "error":
+                        status["errors"] += 1
+                    elif result["status"] == "skipped":
+                        status["skipped"] += 1
+
+                    if result["runtime"] is not None:
+                        busy_time += result["runtime"]
+
+                if done:
+                    self.write_json("ledger.json", ledger)
+
+                    self.generate_index([ledger[log] for log in sorted(ledger)])
+
+                uptime = time.time() - self.batch_start_time
+
+                status["updated"] = str(datetime.datetime.now())
+                status["queued"] = len(queue)
+                status["running"] = len(running)
+                status["throughput"] = round(status["processed"] / uptime * 60, 4)
+
+                if status["processed"]:
+                    status["average_runtime"] = round(
+                        busy_time / status["processed"], 4
+                    )
+
+                self.write_json("status.json", status)
+        except KeyboardInterrupt:
+            self.logger.info(
+                "stopping, {} queued logs will be processed on the next run".format(
+                    len(queue) + len(running)
+                )
+            )
+        finally:
+            for future in running:
+                future.cancel()
+
+            executor.shutdown(wait=False)
+
+            self.write_json("ledger.json", ledger)
+
+    def generate_index(self, results):
+        """Generate the index file with the reports of all logs."""
+        output_file = os.path.join(self.prefix, "batch.json")
+
+        with open(output_file, "w") as f:
+            json.dump(results, f, indent=2)
+
+        file = open(os.path.join(self.ROOT, "plots/index.html"), mode="r")
+        template = file.read()
+        file.close()
+
+        file_index = ""
+
+        for result in results:
+            if result["status"] == "ok":
+                link = """
+                    <li>
+                        <a href="{}" target="_blank">REPORT</a>
+                    </li>
+                """.format(
+                    os.path.join(
+                        os.path.relpath(result["prefix"], self.prefix), "index.html"
+                    )
+                )
+            else:
+                link = """
+                    <li>
+                        {}: {}
+                    </li>
+                """.format(
+                    result["status"].upper(), result["message"]
+                )
+
+            file_index += """
+                <li>
+                    {}<br/>
+                    <ul class='buttons'>
+                        {}
+                    </ul>
+                </li>
+            """.format(
+                result["log"], link
+            )
+
+        processed = sum(1 for result in results if result["status"] == "ok")
+
+        self.batch_end_time = time.time()
+
+        template = template.replace(
+            "DXT_DARSHAN_FILE", "{} of {} logs".format(processed, len(results))
+        )
+        template = template.replace("DXT_EXPLORER_FILES", file_index)
+        template = template.replace("DXT_EXPLORER_SUMMARY", "")
+        template = template.replace("DXT_EXPLORER_VERSION", dxt_version.__version__)
+        template = template.replace("DXT_EXPLORER_DATE", str(datetime.datetime.now()))
+        template = template.replace(
+            "DXT_EXPLORER_RUNTIME",
+            "{:03f}".format(self.batch_end_time - self.batch_start_time),
+        )
+
+        output_file = os.path.join(self.prefix, "index.html")
+
+        shutil.copyfile(
+            os.path.join(self.ROOT, "plots/dxt-explorer.png"),
+            os.path.join(self.prefix, "dxt-explorer.png"),
+        )
+
+        file = open(output_file, mode="w")
+        file.write(template)
+        file.close()
+
+        self.logger.info("SUCCESS: {}".format(output_file))
+
+
+def main():
+    PARSER = argparse.ArgumentParser(description="DXT Explorer Batch: ")
+
+    PARSER.add_argument(
+        "paths", nargs="+", help="Input .darshan files or directories with .darshan files"
+    )
+
+    PARSER.add_argument(
+        "-p",
+        "--prefix",
+        default=None,
+        help="Output directory, each log is explored into its own subdirectory",
+    )
+
+    PARSER.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        dest="jobs",
+        help="Number of logs explored in parallel (default: number of CPUs)",
+    )
+
+    PARSER.add_argument(
+        "-w",
+        "--watch",
+        default=False,
+        action="store_true",
+        dest="watch",
+        help="Keep watching the paths and explore new logs as they show up",
+    )
+
+    PARSER.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=30,
+        dest="interval",
+        help="Seconds between two scans of the watched paths (default: 30)",
+    )
+
+    PARSER.add_argument(
+        "-x",
+        "--options",
+        default="",
+        dest="options",
+        help="dxt-explorer options applied to every log (e.g., --options=\"-t -s --start 1\")",
+    )
+
+    PARSER.add_argument(
+        "-v",
+        "--version",
+        action="version",
+        version="%(prog)s "
+        + dxt_version.__version__
+        + " ("
+        + dxt_version.__release_date__
+        + ")",
+    )
+
+    ARGS = PARSER.parse_args()
+
+    OPTIONS = shlex.split(ARGS.options)
+
+    # Reject invalid options before starting to process the logs
+    dxt.build_parser().parse_args(OPTIONS + ["batch.darshan"])
+
+    BATCH = Batch(ARGS, OPTIONS)
+    BATCH.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,715 @@
+"""
+Parsed DXT datasets and the queries used to slice them.
+
+Each traced file is converted once into a Feather table with one row per DXT
+segment. The helpers in this module are shared by the explorer and by every
+plot script, so that the time and rank limits requested on the command line
+are applied the same way everywhere: while ingesting the Darshan records and
+again when a plot loads a dataset.
+
+Datasets are stored sorted by start time, next to a sparse index holding the
+first start time and the latest end time of each block of rows. A time window
+query only memory-maps the blocks that may hold operations inside the window.
+A second index lists the rows of each rank, so rank ranges and per-rank
+aggregations do not scan the whole table either.
+"""
+
+import os
+import re
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+
+BLOCK_SIZE = 4096
+
+# Same request size buckets used by the Darshan POSIX and MPI-IO counters, the
+# size_bin column of a dataset holds the bucket of each operation
+SIZE_BINS = np.array(
+    [
+        100,
+        1024,
+        10 * 1024,
+        100 * 1024,
+        1024 ** 2,
+        4 * 1024 ** 2,
+        10 * 1024 ** 2,
+        100 * 1024 ** 2,
+        1024 ** 3,
+    ]
+)
+
+# Schema metadata of a dataset holding the edges of its size bins
+SIZE_BINS_METADATA = b"dxt_explorer_size_bins"
+
+UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+class Window:
+    """Time and rank limits of a query over a DXT dataset."""
+
+    def __init__(self, start=None, end=None, start_rank=None, end_rank=None):
+        """Initialize the window, None means the dimension is not limited."""
+        self.start = None if start is None else float(start)
+        self.end = None if end is None else float(end)
+        self.start_rank = None if start_rank is None else int(start_rank)
+        self.end_rank = None if end_rank is None else int(end_rank)
+
+    @classmethod
+    def from_args(cls, args):
+        """Create a window from the dxt-explorer command line arguments."""
+        return cls(args.start, args.end, args.start_rank, args.end_rank)
+
+    @classmethod
+    def from_options(cls, options):
+        """Create a window from the options of a plot script."""
+        return cls(
+            options.get("start"),
+            options.get("end"),
+            options.get("from"),
+            options.get("to"),
+        )
+
+    def __repr__(self):
+        return "Window(start={}, end={}, from={}, to={})".format(
+            self.start, self.end, self.start_rank, self.end_rank
+        )
+
+    def is_empty(self):
+        """Check if the window does not limit the dataset at all."""
+        return (
+            self.start is None
+            and self.end is None
+            and self.start_rank is None
+            and self.end_rank is None
+        )
+
+    def has_time(self):
+        """Check if the window limits the runtime."""
+        return self.start is not None or self.end is not None
+
+    def has_ranks(self):
+        """Check if the window limits the ranks."""
+        return self.start_rank is not None or self.end_rank is not None
+
+    def contains_rank(self, rank):
+        """Check if a rank is inside the window."""
+        if self.start_rank is not None and rank < self.start_rank:
+            return False
+
+        if self.end_rank is not None and rank > self.end_rank:
+            return False
+
+        return True
+
+    def suffix(self):
+        """Name used to cache the datasets generated for this window."""
+        if self.is_empty():
+            return ""
+
+        limits = [self.start, self.end, self.start_rank, self.end_rank]
+
+        return ".window-{}".format(
+            "-".join("x" if limit is None else str(limit) for limit in limits)
+        )
+
+    def to_options(self):
+        """Convert the window into the command line options of the plot scripts."""
+        limits = ""
+
+        if self.start is not None:
+            limits += " -s {} ".format(self.start)
+
+        if self.end is not None:
+            limits += " -e {} ".format(self.end)
+
+        if self.start_rank is not None:
+            limits += " -n {} ".format(self.start_rank)
+
+        if self.end_rank is not None:
+            limits += " -m {} ".format(self.end_rank)
+
+        return limits
+
+    def mask(self, df, clip=False):
+        """
+        Select the rows of a dataframe that are inside the window.
+
+        Arguments:
+            df: dataframe with start, end and rank columns
+            clip: keep the operations that overlap the window boundaries
+
+        Returns:
+            boolean Series aligned with the dataframe
+        """
+        mask = pd.Series(True, index=df.index)
+
+        if clip:
+            if self.start is not None:
+                mask &= df["end"] > self.start
+
+            if self.end is not None:
+                mask &= df["start"] < self.end
+        else:
+            if self.start is not None:
+                mask &= df["start"] >= self.start
+
+            if self.end is not None:
+                mask &= df["end"] <= self.end
+
+        if self.start_rank is not None:
+            mask &= df["rank"] >= self.start_rank
+
+        if self.end_rank is not None:
+            mask &= df["rank"] <= self.end_rank
+
+        return mask
+
+    def time_mask(self, start, end):
+        """
+        Select the operations fully inside the time limits.
+
+        Arguments:
+            start: numpy array with the start time of each operation
+            end: numpy array with the end time of each operation
+
+        Returns:
+            boolean numpy array aligned with the operations
+        """
+        mask = np.ones(len(start), dtype=bool)
+
+        if self.start is not None:
+            mask &= start >= self.start
+
+        if self.end is not None:
+            mask &= end <= self.end
+
+        return mask
+
+    def apply(self, df, clip=False, truncate=True):
+        """
+        Slice a dataframe to the window.
+
+        By default only operations fully inside the time window are kept. When
+        clip is set, the operations crossing the window boundaries are kept as
+        well, with their start and end truncated to the window unless truncate
+        is disabled.
+        """
+        if self.is_empty() or df.empty:
+            return df
+
+        df = df[self.mask(df, clip)]
+
+        if clip and truncate and self.has_time():
+            df = df.copy()
+
+            if self.start is not None:
+                df["start"] = df["start"].clip(lower=round(self.start, 4))
+
+            if self.end is not None:
+                df["end"] = df["end"].clip(upper=round(self.end, 4))
+
+        return df
+
+
+class TimeIndex:
+    """Sparse index over the blocks of a dataset sorted by start time."""
+
+    def __init__(self, rows, first_start, max_end, total_rows):
+        """
+        Initialize the index.
+
+        Arguments:
+            rows: first row of each block
+            first_start: start time of the first operation of each block
+            max_end: latest end time of the operations of each block
+            total_rows: number of rows in the dataset
+        """
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.first_start = np.asarray(first_start, dtype=np.float64)
+        self.max_end = np.asarray(max_end, dtype=np.float64)
+        self.total_rows = int(total_rows)
+
+        # Latest end time seen up to each block, it never decreases, so the
+        # first block that may hold an operation crossing a given time can be
+        # found with a binary search
+        self.running_max_end = np.maximum.accumulate(self.max_end)
+
+    @classmethod
+    def build(cls, df, block_size=BLOCK_SIZE):
+        """Build the index of a dataframe or Arrow table already sorted by start time."""
+        start = df["start"].to_numpy()
+
+        rows = np.arange(0, len(start), block_size, dtype=np.int64)
+
+        first_start = start[rows]
+        max_end = np.maximum.reduceat(df["end"].to_numpy(), rows)
+
+        return cls(rows, first_start, max_end, len(start))
+
+    @staticmethod
+    def index_file(file):
+        """Name of the index file of a dataset."""
+        return "{}.time_index".format(file)
+
+    @classmethod
+    def read(cls, file):
+        """Load the index of a dataset, None if the dataset has no index."""
+        index_file = cls.index_file(file)
+
+        if not os.path.exists(index_file):
+            return None
+
+        table = feather.read_table(index_file)
+        total_rows = int(table.schema.metadata[b"total_rows"])
+
+        return cls(
+            table.column("row").to_numpy(),
+            table.column("start").to_numpy(),
+            table.column("end").to_numpy(),
+            total_rows,
+        )
+
+    def write(self, file):
+        """Save the index next to a dataset."""
+        table = pa.table(
+            {"row": self.rows, "start": self.first_start, "end": self.max_end}
+        )
+        table = table.replace_schema_metadata(
+            {"total_rows": str(self.total_rows)}
+        )
+
+        feather.write_feather(
+            table, self.index_file(file), compression="uncompressed"
+        )
+
+    def lookup(self, window, clip=False):
+        """
+        Find the rows that may hold operations inside a time window.
+
+        Arguments:
+            window: Window to look up
+            clip: also find the operations crossing the window boundaries
+
+        Returns:
+            list of (first row, number of rows) ranges
+        """
+        blocks = len(self.rows)
+
+        if blocks == 0:
+            return []
+
+        first_block = 0
+        last_block = blocks
+
+        if window.start is not None:
+            if clip:
+                first_block = int(
+                    np.searchsorted(self.running_max_end, window.start, side="right")
+                )
+            else:
+                first_block = max(
+                    int(np.searchsorted(self.first_start, window.start, side="left"))
+                    - 1,
+                    0,
+                )
+
+        if window.end is not None:
+            side = "left" if clip else "right"
+            last_block = int(np.searchsorted(self.first_start, window.end, side=side))
+
+        if first_block >= last_block:
+            return []
+
+        selected = np.arange(first_block, last_block)
+
+        if window.start is not None:
+            # Skip the blocks where every operation ended before the window
+            selected = selected[self.max_end[selected] >= window.start]
+
+        if selected.size == 0:
+            return []
+
+        # Merge consecutive blocks into contiguous row ranges
+        breaks = np.flatnonzero(np.diff(selected) > 1)
+        range_first = selected[np.concatenate(([0], breaks + 1))]
+        range_last = selected[np.concatenate((breaks, [selected.size - 1]))]
+
+        bounds = np.append(self.rows, self.total_rows)
+
+        return [
+            (int(bounds[first]), int(bounds[last + 1] - bounds[first]))
+            for first, last in zip(range_first, range_last)
+        ]
+
+
+class RankIndex:
+    """Rows of a dataset grouped by rank."""
+
+    def __init__(self, ranks, offsets, rows):
+        """
+        Initialize the index.
+
+        Arguments:
+            ranks: sorted ranks present in the dataset
+            offsets: position in rows where the rows of each rank start, with
+                a last entry holding the total number of rows
+            rows: row ids of the dataset grouped by rank, in table order
+                within each rank
+        """
+        self.ranks = np.asarray(ranks, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.rows = np.asarray(rows, dtype=np.int64)
+
+    @classmethod
+    def build(cls, df):
+        """Build the index of a dataframe or Arrow table."""
+        ranks = df["rank"].to_numpy()
+
+        rows = np.argsort(ranks, kind="stable")
+        ranks, counts = np.unique(ranks[rows], return_counts=True)
+
+        offsets = np.zeros(len(ranks) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        return cls(ranks, offsets, rows)
+
+    @staticmethod
+    def index_file(file):
+        """Name of the index file of a dataset."""
+        return "{}.rank_index".format(file)
+
+    @classmethod
+    def read(cls, file):
+        """Load the index of a dataset, None if the dataset has no index."""
+        index_file = cls.index_file(file)
+
+        if not os.path.exists(index_file):
+            return None
+
+        table = feather.read_table(index_file)
+        metadata = table.schema.metadata
+
+        return cls(
+            np.frombuffer(metadata[b"ranks"], dtype=np.int64),
+            np.frombuffer(metadata[b"offsets"], dtype=np.int64),
+            table.column("row").to_numpy(),
+        )
+
+    def write(self, file):
+        """Save the index next to a dataset."""
+        table = pa.table({"row": self.rows})
+        table = table.replace_schema_metadata(
+            {"ranks": self.ranks.tobytes(), "offsets": self.offsets.tobytes()}
+        )
+
+        feather.write_feather(
+            table, self.index_file(file), compression="uncompressed"
+        )
+
+    def __len__(self):
+        return len(self.ranks)
+
+    def span(self, start_rank=None, end_rank=None):
+        """Positions in rows holding the ranks between start_rank and end_rank."""
+        first = 0
+        last = len(self.ranks)
+
+        if start_rank is not None:
+            first = int(np.searchsorted(self.ranks, start_rank, side="left"))
+
+        if end_rank is not None:
+            last = int(np.searchsorted(self.ranks, end_rank, side="right"))
+
+        if first >= last:
+            return 0, 0
+
+        return int(self.offsets[first]), int(self.offsets[last])
+
+    def lookup(self, start_rank=None, end_rank=None):
+        """Sorted row ids of the ranks between start_rank and end_rank."""
+        first, last = self.span(start_rank, end_rank)
+
+        return np.sort(self.rows[first:last])
+
+    def rank_rows(self, rank):
+        """Row ids of a single rank."""
+        return self.rows[slice(*self.span(rank, rank))]
+
+    def aggregate(self, values):
+        """
+        Sum a column per rank.
+
+        Arguments:
+            values: NumPy array aligned with the rows of the dataset
+
+        Returns:
+            NumPy array with one total for each rank in ranks
+        """
+        if len(self.ranks) == 0:
+            return np.zeros(0, dtype=np.asarray(values).dtype)
+
+        return np.add.reduceat(np.asarray(values)[self.rows], self.offsets[:-1])
+
+    def count(self, mask):
+        """Count the rows of each rank selected by a boolean mask."""
+        return self.aggregate(np.asarray(mask, dtype=np.int64))
+
+
+def dataset_name(file, file_id, window=None):
+    """Name of the parsed dataset of a traced file, without extension."""
+    name = "{}.{}".format(file, file_id)
+
+    if window is not None:
+        name += window.suffix()
+
+    return name
+
+
+def rows_in_ranges(rows, ranges):
+    """Keep the sorted row ids that fall inside a list of (first row, length) ranges."""
+    if not ranges:
+        return rows[:0]
+
+    first = np.array([offset for offset, length in ranges], dtype=np.int64)
+    last = first + np.array([length for offset, length in ranges], dtype=np.int64)
+
+    position = np.searchsorted(first, rows, side="right") - 1
+
+    inside = position >= 0
+    inside[inside] = rows[inside] < last[position[inside]]
+
+    return rows[inside]
+
+
+def parse_size(text):
+    """Convert a size such as 4M or 65536 into bytes."""
+    match = re.fullmatch(r"\s*(\d+)\s*([KMG]?)B?\s*", str(text), re.IGNORECASE)
+
+    if match is None or int(match.group(1)) <= 0:
+        raise ValueError("invalid size {}".format(text))
+
+    return int(match.group(1)) * UNITS[match.group(2).upper()]
+
+
+def format_size(size):
+    """Convert a size in bytes into the largest unit that divides it."""
+    for unit in ["G", "M", "K"]:
+        if size % UNITS[unit] == 0:
+            return "{}{}".format(size // UNITS[unit], unit)
+
+    return str(size)
+
+
+def get_size_bins():
+    """
+    Edges of the request size bins, from DXT_EXPLORER_SIZE_BINS or the Darshan buckets.
+
+    The variable holds the increasing upper limits of the bins, separated by
+    commas (e.g. 4K,64K,1M,16M), the last bin holds the larger requests.
+    """
+    edges = os.environ.get("DXT_EXPLORER_SIZE_BINS")
+
+    if not edges:
+        return SIZE_BINS
+
+    edges = np.array([parse_size(edge) for edge in edges.split(",")], dtype=np.int64)
+
+    if np.any(np.diff(edges) <= 0) or len(edges) >= np.iinfo(np.uint8).max:
+        raise ValueError(
+            "size bins must be increasing and fewer than 255: {}".format(
+                os.environ["DXT_EXPLORER_SIZE_BINS"]
+            )
+        )
+
+    return edges
+
+
+def get_size_labels(edges):
+    """Labels of the request size bins with the given edges."""
+    limits = ["0"] + [format_size(int(edge)) for edge in edges]
+
+    return [
+        "{}-{}".format(lower, upper) for lower, upper in zip(limits[:-1], limits[1:])
+    ] + ["{}+".format(limits[-1])]
+
+
+def get_size_bins_metadata(edges):
+    """Schema metadata recording the edges of the size bins of a dataset."""
+    return {SIZE_BINS_METADATA: json.dumps([int(edge) for edge in edges])}
+
+
+def size_bins(size, edges):
+    """
+    Find the request size bin of each operation.
+
+    A request falls in the first bin whose edge is not below its size.
+
+    Returns:
+        numpy array with the bin of each operation
+    """
+    return np.digitize(size, edges, right=True).astype(np.uint8)
+
+
+def read_size_bins(file):
+    """
+    Read the edges of the size bins of a dataset.
+
+    Returns:
+        numpy array with the edges, None for datasets without a size_bin column
+    """
+    schema = feather.read_table(file, columns=[], memory_map=True).schema
+
+    metadata = schema.metadata or {}
+
+    if SIZE_BINS_METADATA not in metadata:
+        return None
+
+    return np.array(json.loads(metadata[SIZE_BINS_METADATA]), dtype=np.int64)
+
+
+def label_size_bins(file, df):
+    """
+    Label the request size bin of each operation loaded from a dataset.
+
+    Datasets converted before the size_bin column was stored are binned here.
+
+    Returns:
+        tuple with the label of each operation and the labels of all the bins, in order
+    """
+    edges = read_size_bins(file)
+
+    if edges is None or "size_bin" not in df.columns:
+        edges = get_size_bins()
+        df["size_bin"] = size_bins(df["size"].to_numpy(), edges)
+
+    labels = get_size_labels(edges)
+
+    return np.array(labels, dtype=object)[df["size_bin"].to_numpy()], labels
+
+
+def write(df, file, block_size=BLOCK_SIZE):
+    """
+    Save a parsed DXT dataset sorted by start time with its time and rank indexes.
+
+    Arguments:
+        df: dataframe or Arrow table with the operations
+        file: name of the dataset
+
+    Returns:
+        the sorted dataframe or table
+    """
+    if isinstance(df, pa.Table):
+        empty = df.num_rows == 0
+
+        if not empty:
+            df = df.take(pc.sort_indices(df, sort_keys=[("start", "ascending")]))
+    else:
+        empty = df.empty
+
+        if not empty:
+            df = df.sort_values("start", kind="stable", ignore_index=True)
+
+    data = df
+
+    if isinstance(df, pd.DataFrame) and "size_bin" in df.columns:
+        # Dataframes drop the schema metadata, the edges are kept by read, and
+        # new dataframes are binned with the current ones
+        data = pa.Table.from_pandas(df, preserve_index=False)
+
+        metadata = dict(data.schema.metadata or {})
+        metadata.update(get_size_bins_metadata(df.attrs.get("size_bins", get_size_bins())))
+
+        data = data.replace_schema_metadata(metadata)
+
+    feather.write_feather(data, file, compression="uncompressed")
+
+    if not empty:
+        TimeIndex.build(df, block_size).write(file)
+        RankIndex.build(df).write(file)
+
+    return df
+
+
+def estimate_rows(file, window):
+    """
+    Bound the number of rows inside a window using only the indexes of a dataset.
+
+    Returns:
+        upper bound of the number of operations inside the window, clipped at
+        its boundaries, or None if the dataset has no index
+    """
+    time_index = TimeIndex.read(file)
+
+    if time_index is None:
+        return None
+
+    bounds = [time_index.total_rows]
+
+    if window.has_time():
+        bounds.append(sum(length for _, length in time_index.lookup(window, clip=True)))
+
+    if window.has_ranks():
+        rank_index = RankIndex.read(file)
+
+        if rank_index is not None:
+            first, last = rank_index.span(window.start_rank, window.end_rank)
+
+            bounds.append(last - first)
+
+    return min(bounds)
+
+
+def read(file, window=None, clip=False, truncate=True):
+    """
+    Load a parsed DXT dataset, keeping only the rows inside the window.
+
+    See Window.apply for the meaning of clip and truncate.
+    """
+    time_index = None
+    rank_index = None
+
+    if window is not None and window.has_time():
+        time_index = TimeIndex.read(file)
+
+    if window is not None and window.has_ranks():
+        rank_index = RankIndex.read(file)
+
+    if time_index is None and rank_index is None:
+        df = feather.read_feather(file)
+    else:
+        table = feather.read_table(file, memory_map=True)
+
+        ranges = None
+        if time_index is not None:
+            ranges = time_index.lookup(window, clip)
+
+        if rank_index is not None:
+            rows = rank_index.lookup(window.start_rank, window.end_rank)
+
+            if ranges is not None:
+                rows = rows_in_ranges(rows, ranges)
+
+            table = table.take(pa.array(rows))
+        elif ranges:
+            table = pa.concat_tables(
+                [table.slice(offset, length) for offset, length in ranges]
+            )
+        else:
+            table = table.slice(0, 0)
+
+        df = table.to_pandas()
+
+    size_bins = read_size_bins(file)
+
+    if size_bins is not None:
+        # Kept with the dataframe, so write records the edges of its size_bin column
+        df.attrs["size_bins"] = size_bins.tolist()
+
+    if window is not None:
+        df = window.apply(df, clip, truncate)
+
+    return df
@@ -20,24 +20,38 @@ so.
 """
 
 import os
+import re
 import sys
+import json
 import time
 import shlex
+import shutil
 import logging
-import darshan
 import argparse
+import fnmatch
 import datetime
 import subprocess
 import webbrowser
-import pandas as pd
-import pkg_resources
-import pyranges as pr
 import logging.handlers
-import pyarrow.feather as feather
 # import darshan.backend.cffi_backend as darshanll
 
+from explorer import metrics
+from explorer import profiling
 from explorer import version as dxt_version
-from packaging import version
+
+# The heavy modules (darshan, pandas, pyarrow, pyranges) are only imported by
+# the stages that need them, so the command line starts fast
+
+
+def get_script(path):
+    """Find a file installed with the explorer package, such as a plot script."""
+    try:
+        from importlib.resources import files
+    except ImportError:
+        # Python 3.8
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+
+    return str(files("explorer").joinpath(path))
 
 
 class Explorer:
@@ -47,6 +61,10 @@ class Explorer:
         self.configure_log()
 
         self.generated_files = {}
+        self.served_files = {}
+        self.file_ids = None
+
+        self.metrics = metrics.Metrics()
 
         self.ROOT = os.path.abspath(os.path.dirname(__file__))
 
@@ -71,15 +89,30 @@ class Explorer:
         self.logger.addHandler(console)
 
     def run(self):
+        import darshan
+        from explorer import dataset
+
         self.explorer_start_time = time.time()
 
         self.is_darshan_file(self.args.darshan)
 
+        self.window = dataset.Window.from_args(self.args)
+
         if not self.args.prefix:
             self.prefix = os.getcwd()
         else:
             self.prefix = self.args.prefix
 
+        self.metrics.collect_children(
+            os.path.join(self.prefix, ".run_metrics.children.jsonl")
+        )
+
+        if self.args.profile:
+            self.metrics.profiler = profiling.Profiler(
+                os.path.join(self.prefix, "profile")
+            )
+            self.metrics.profiler.enable()
+
         # log = darshanll.log_open(self.args.darshan)
         # information = darshanll.log_get_job(log)
 
@@ -89,8 +122,16 @@ class Explorer:
         # filename = self.check_log_version(
         #     self.args.darshan, log_version, library_version
         # )
-        report = darshan.DarshanReport(filename, read_all=True)
-        if "DXT_POSIX" not in report.records and "DXT_MPIIO" not in report.records:
+        if self.args.summary:
+            self.generate_summary(filename)
+            return
+
+        with self.metrics.stage("load report"):
+            # The DXT segments are parsed straight from the log by the
+            # conversion, the report only provides the names and counters
+            report = darshan.DarshanReport(filename, read_all=False)
+            report.read_name_records()
+        if "DXT_POSIX" not in report.modules and "DXT_MPIIO" not in report.modules:
             self.logger.info("No DXT trace data found in file: {}".format(filename))
             exit()
 
@@ -115,7 +156,54 @@ class Explorer:
         if self.args.ost_usage_transfer:
             self.generate_ost_usage_transfer_plot(filename, report)
 
-        self.generate_index(filename, report)
+        if self.args.ost_usage_heatmap:
+            self.generate_ost_usage_heatmap_plot(filename, report)
+
+        summary_html = ""
+
+        if self.args.stripe:
+            summary_html = self.generate_stripe_report(filename, report)
+
+        self.generate_index(filename, report, summary_html)
+
+        if self.args.serve:
+            self.serve()
+
+    def get_plot_options(self):
+        """Command line options shared by the plot scripts."""
+        options = self.window.to_options()
+
+        if self.args.sidecar:
+            options += " --sidecar "
+
+        return options
+
+    def write_assets(self):
+        """
+        Write the plotly.js bundle and the logo shared by every page next to the index.
+
+        The pages reference them instead of embedding a copy each, so they also
+        work on machines without internet access.
+        """
+        shutil.copyfile(
+            get_script("plots/dxt-explorer.png"),
+            os.path.join(self.prefix, "dxt-explorer.png"),
+        )
+
+        # The summary page has no plots
+        if not self.generated_files:
+            return
+
+        from plotly.offline import get_plotlyjs
+
+        plotlyjs = get_plotlyjs()
+
+        output_file = os.path.join(self.prefix, "plotly.min.js")
+
+        # The bundle only changes with the plotly version
+        if not os.path.exists(output_file) or os.path.getsize(output_file) != len(plotlyjs.encode()):
+            with open(output_file, "w") as f:
+                f.write(plotlyjs)
 
     def get_directory(self):
         """Determine the install path to find the execution scripts."""
@@ -142,20 +230,32 @@ class Explorer:
 
     def list_files(self, report, display=True):
         """Create a dictionary of file id as key and file name as value."""
-        total = 0
-        file_ids = report.log["name_records"]
-        for key, value in dict(file_ids).items():
-            if value == "<STDOUT>":
-                del file_ids[key]
-            if value == "<STDERR>":
-                del file_ids[key]
+        if self.file_ids is None:
+            file_ids = dict(report.log["name_records"])
+            for key, value in report.log["name_records"].items():
+                if value == "<STDOUT>":
+                    del file_ids[key]
+                if value == "<STDERR>":
+                    del file_ids[key]
 
-        for file_id, file_name in file_ids.items():
-            total += 1
-            if display:
+            self.file_ids = self.select_files(report, file_ids)
+
+        file_ids = self.file_ids
+
+        if display:
+            for file_id, file_name in file_ids.items():
                 self.logger.info("FILE: {} (ID {})".format(file_name, file_id))
 
-        if total == 0:
+        if len(file_ids) == 0:
+            if self.is_selecting_files():
+                self.logger.critical(
+                    "No traced file in {} matches the file selection".format(
+                        self.args.darshan
+                    )
+                )
+
+                exit()
+
             self.logger.critical("No DXT records found in {}".format(self.args.darshan))
             self.logger.critical(
                 "To enable Darshan DXT, set this before your application runs:"
@@ -166,482 +266,424 @@ class Explorer:
 
         return file_ids
 
-    def get_id_to_record_mapping(self, report, mod):
+    def is_selecting_files(self):
+        """Check if any file selection option was provided."""
+        return bool(
+            self.args.file_id
+            or self.args.file_match
+            or self.args.file_regex
+            or self.args.top
+            or self.args.min_ops > 1
+        )
+
+    def get_file_counters(self, report):
         """
-        Get mapping of id to records for a given module.
+        Summarize each traced file from the per-record counters of the log.
+
+        The DXT records already carry their operation counts and the POSIX
+        and MPI-IO modules the bytes and time of every file, so no trace
+        segment has to be decoded to rank the files. The modules that were
+        not read into the report yet are read on demand.
 
         Arguments:
-            report (DarshanReport): the the record belongs to
-            mod (String): name of module
+            report (DarshanReport): the report the records belong to
 
         Returns:
-            Dictionary with lists of records by their id
+            Dictionary of file id as key and a dictionary with the number of
+            traced operations, bytes moved and I/O time as value
         """
+        from explorer import summary
+
+        counters = {}
+
+        # Only the headers of the DXT records are read, from the log the
+        # report already opened, the segments are left to the conversion
+        for api, record, buf in summary.iter_headers(report.log):
+            file_counters = counters.setdefault(
+                record.base_rec.id, {"ops": 0, "bytes": 0, "time": 0.0}
+            )
+            file_counters["ops"] += record.read_count + record.write_count
+
+        for mod, prefix in [("POSIX", "POSIX"), ("MPI-IO", "MPIIO")]:
+            if mod not in report.modules:
+                continue
 
-        if mod not in report.records:
-            return []
+            if mod not in report.records:
+                report.mod_read_all_records(mod)
 
-        recs_by_id = {}
-        for i, rec in enumerate(report.records[mod]):
-            if rec["id"] not in recs_by_id:
-                recs_by_id[rec["id"]] = []
+            records = report.records[mod].to_df()
 
-            if mod in ["LUSTRE"]:
-                recs_by_id[rec["id"]] = [rec]
-            else:
-                recs_by_id[rec["id"]].append(rec)
+            file_bytes = (
+                records["counters"][prefix + "_BYTES_READ"]
+                + records["counters"][prefix + "_BYTES_WRITTEN"]
+            )
+            file_time = (
+                records["fcounters"][prefix + "_F_READ_TIME"]
+                + records["fcounters"][prefix + "_F_WRITE_TIME"]
+            )
+
+            module_bytes = {}
+            for file_id, value in zip(records["counters"]["id"].tolist(), file_bytes.tolist()):
+                module_bytes[file_id] = module_bytes.get(file_id, 0) + value
+
+            module_time = {}
+            for file_id, value in zip(records["fcounters"]["id"].tolist(), file_time.tolist()):
+                module_time[file_id] = module_time.get(file_id, 0.0) + value
+
+            # MPI-IO requests are also seen by POSIX, keep the largest of both
+            for file_id, file_counters in counters.items():
+                file_counters["bytes"] = max(
+                    file_counters["bytes"], module_bytes.get(file_id, 0)
+                )
+                file_counters["time"] = max(
+                    file_counters["time"], module_time.get(file_id, 0.0)
+                )
+
+        return counters
+
+    def matches_file(self, file_id, file_name):
+        """Check if a file matches the file id and path selection options."""
+        if self.args.file_id and str(file_id) not in self.args.file_id:
+            return False
 
-        return recs_by_id
+        if self.args.file_match and not any(
+            fnmatch.fnmatch(file_name, pattern) for pattern in self.args.file_match
+        ):
+            return False
 
-    def dxt_record_attach_osts_inplace(self, report, record, lustre_records_by_id):
+        if self.args.file_regex and not any(
+            re.search(pattern, file_name) for pattern in self.args.file_regex
+        ):
+            return False
+
+        return True
+
+    def rank_files(self, file_ids, counters):
         """
-        For a given DXT record, attach targeted Lustre OSTs.
+        Apply the minimum number of operations and the top-N selection.
 
         Arguments:
-            report: DarshanReport the the record belongs to
-            record: DarshanRecord to update
-            lustre_records_by_id: mapping to use (recreating the mapping is potentially expensive for larger logs)
+            file_ids: list of candidate file ids
+            counters: dictionary of file id as key and a dictionary with the
+                number of operations, bytes moved and I/O time as value
 
         Returns:
-            reference to updated record
+            List of the selected file ids
         """
+        selected = [
+            file_id
+            for file_id in file_ids
+            if counters[file_id]["ops"] >= self.args.min_ops
+        ]
 
-        rec = record
+        if self.args.top:
+            ranking = sorted(
+                selected,
+                key=lambda file_id: counters[file_id][self.args.top_by],
+                reverse=True,
+            )
 
-        if rec["id"] not in lustre_records_by_id:
-            raise Exception(
-                self.logger.info(
-                    "No matching lustre records found. (This is not necessarily an error, just that the file may not reside on a Lustre system.)"
+            selected = ranking[: self.args.top]
+
+        for file_id in selected:
+            self.logger.debug(
+                "selected file {}: {} operations, {} bytes, {:.4f} seconds".format(
+                    file_id,
+                    counters[file_id]["ops"],
+                    counters[file_id]["bytes"],
+                    counters[file_id]["time"],
                 )
             )
 
-        lrec = lustre_records_by_id[rec["id"]][0]
-        lcounters = dict(zip(report.counters["LUSTRE"]["counters"], lrec["counters"]))
+        return selected
 
-        osts = list(lrec["ost_ids"])
+    def select_files(self, report, file_ids):
+        """
+        Select the traced files to convert and plot.
 
-        stripe_size = lcounters["LUSTRE_STRIPE_SIZE"]
-        stripe_count = lcounters["LUSTRE_STRIPE_WIDTH"]
+        Files without DXT operations are always dropped. The files are then
+        filtered by id, path and minimum number of operations, and, if asked,
+        only the top-N files by bytes moved or I/O time are kept.
 
-        for op in ["read_segments", "write_segments"]:
-            segs = rec[op]
+        Arguments:
+            report (DarshanReport): the report the records belong to
+            file_ids: dictionary of file id as key and file name as value
 
-            for access in segs:
-                access["osts"] = []
+        Returns:
+            Dictionary of the selected file ids and their names
+        """
+        counters = self.get_file_counters(report)
 
-                offset = access["offset"]
-                length = access["length"]
+        candidates = [
+            file_id
+            for file_id, file_name in file_ids.items()
+            if file_id in counters and self.matches_file(file_id, file_name)
+        ]
 
-                cur_offset = offset
-                ost_idx = int(offset / stripe_size) % stripe_count
+        selected = {
+            file_id: file_ids[file_id]
+            for file_id in self.rank_files(candidates, counters)
+        }
 
-                add_count = 0
-                while cur_offset <= (offset + length):
-                    ost_id = osts[ost_idx]
-                    access["osts"].append(ost_id)
+        if len(selected) < len(file_ids):
+            self.logger.info(
+                "selected {} of {} files".format(len(selected), len(file_ids))
+            )
 
-                    cur_offset = (int(cur_offset / stripe_size) + 1) * stripe_size
+        return selected
 
-                    if ost_idx == (stripe_count - 1):
-                        ost_idx = 0
-                    else:
-                        ost_idx += 1
+    def generate_summary(self, file):
+        """
+        Generate a summary of the DXT traces without converting the segments.
 
-                    add_count += 1
-                    if add_count >= stripe_count:
-                        break
-        return rec
+        The per-file and per-rank totals are saved into summary.json and shown
+        as tables in the index page.
+        """
+        from explorer import summary
 
-    def create_dataframe(
-        self, file_id, subset_dataset_file, df_posix=None, df_mpiio=None
-    ):
-        """Create a dataframe from parsed records."""
-
-        column_names = [
-            "file_id",
-            "api",
-            "rank",
-            "operation",
-            "segment",
-            "offset",
-            "size",
-            "start",
-            "end",
-            "osts",
-        ]
-        total_logs = 0
-        runtime = 0
-
-        df = []
-
-        if not df_posix.empty:
-            df_posix_temp = df_posix.loc[df_posix["id"] == file_id]
-            for index, row in df_posix_temp.iterrows():
-                write_segments = row["write_segments"]
-                write_segments["operation"] = "write"
-                read_segments = row["read_segments"]
-                read_segments["operation"] = "read"
-
-                temp_result = pd.concat([write_segments, read_segments])
-                temp_result["file_id"] = file_id
-                temp_result["rank"] = row["rank"]
-                temp_result["api"] = "POSIX"
-
-                temp_result = temp_result.rename(
-                    columns={"length": "size", "start_time": "start", "end_time": "end"}
-                )
+        self.logger.info("summarizing DXT traces")
 
-                total_logs = total_logs + len(temp_result)
-                runtime = max(runtime, temp_result["end"].max())
+        names = summary.get_file_names(file)
 
-                temp_result["start"] = temp_result["start"].round(decimals=4)
-                temp_result["end"] = temp_result["end"].round(decimals=4)
+        with self.metrics.stage("summary") as stage:
+            result = summary.summarize(
+                file,
+                self.window,
+                lambda file_id: self.matches_file(file_id, names.get(file_id, "")),
+            )
 
-                temp_result.index.name = "segment"
-                temp_result.reset_index(inplace=True)
-                temp_result = temp_result.reindex(columns=column_names)
+            stage["rows"] = sum(
+                totals["read"]["ops"] + totals["write"]["ops"]
+                for totals in result.files.values()
+            )
 
-                df.append(temp_result)
+        if not result.files:
+            self.logger.critical("No DXT records found in {}".format(file))
+            self.logger.critical(
+                "To enable Darshan DXT, set this before your application runs:"
+            )
+            self.logger.critical("$ export DXT_ENABLE_IO_TRACE=1")
 
-        if not df_mpiio.empty:
-            df_mpiio_temp = df_mpiio.loc[df_mpiio["id"] == file_id]
-            for index, row in df_mpiio_temp.iterrows():
-                write_segments = row["write_segments"]
-                write_segments["operation"] = "write"
-                read_segments = row["read_segments"]
-                read_segments["operation"] = "read"
+            exit()
 
-                temp_result = pd.concat([write_segments, read_segments])
-                temp_result["file_id"] = file_id
-                temp_result["rank"] = row["rank"]
-                temp_result["api"] = "MPIIO"
+        counters = {
+            file_id: {
+                "ops": totals["read"]["ops"] + totals["write"]["ops"],
+                "bytes": totals["read"]["bytes"] + totals["write"]["bytes"],
+                "time": totals["busy_time"],
+            }
+            for file_id, totals in result.files.items()
+        }
 
-                temp_result = temp_result.rename(
-                    columns={"length": "size", "start_time": "start", "end_time": "end"}
-                )
+        file_ids = self.rank_files(list(result.files), counters)
 
-                total_logs = total_logs + len(temp_result)
-                runtime = max(runtime, temp_result["end"].max())
+        if not file_ids:
+            self.logger.critical(
+                "No traced file in {} matches the file selection".format(file)
+            )
 
-                temp_result["start"] = temp_result["start"].round(decimals=4)
-                temp_result["end"] = temp_result["end"].round(decimals=4)
+            exit()
 
-                temp_result.index.name = "segment"
-                temp_result.reset_index(inplace=True)
-                temp_result = temp_result.reindex(columns=column_names)
+        report = result.report(names, file_ids)
 
-                df.append(temp_result)
+        job = summary.get_job(file)
 
-        result = pd.DataFrame()
-        if df:
-            result = pd.concat(df, axis=0, ignore_index=True)
+        report["darshan"] = file
+        report["nprocs"] = job["nprocs"]
+        report["runtime"] = job["run_time"]
 
-        feather.write_feather(
-            result, subset_dataset_file + ".dxt", compression="uncompressed"
-        )
+        output_file = os.path.join(self.prefix, "summary.json")
 
-        if self.args.csv:
-            result.to_csv(
-                subset_dataset_file + ".dxt.csv", mode="a", index=False, header=True
-            )
-        column_names = ["total_logs", "runtime"]
-        result = pd.DataFrame(columns=column_names)
+        with open(output_file, "w") as f:
+            json.dump(report, f, indent=2)
 
-        row = [total_logs, runtime]
-        result.loc[len(result.index)] = row
-        result.to_csv(
-            subset_dataset_file + ".summary.dxt.csv", mode="w", index=False, header=True
-        )
+        self.logger.info("SUCCESS: {}".format(output_file))
 
-    def subset_dataset(self, file, file_ids, report):
-        """Subset the dataset based on file id and save to a csv file."""
-        self.logger.info("generating dataframes")
-        lustre_records_by_id = self.get_id_to_record_mapping(report, "LUSTRE")
+        self.generate_index(file, None, summary.to_html(report))
 
-        if lustre_records_by_id:
+    def generate_stripe_report(self, file, report):
+        """
+        Replay the operations of each file under other Lustre stripe layouts.
 
-            def graceful_wrapper(r, rec, lustre_records_by_id):
-                try:
-                    self.dxt_record_attach_osts_inplace(
-                        report, rec, lustre_records_by_id
-                    )
-                except Exception:
-                    pass
+        The results are saved into stripe.json and shown as tables in the index page.
 
-            list(
-                map(
-                    lambda rec: graceful_wrapper(report, rec, lustre_records_by_id),
-                    report.records["DXT_POSIX"],
-                )
+        Returns:
+            HTML with a table of the layouts of each file
+        """
+        from explorer import api
+        from explorer import stripe
+        from explorer import dataset
+
+        file_ids = self.list_files(report, False)
+
+        if not file_ids:
+            return ""
+
+        self.subset_dataset(file, file_ids, report)
+
+        layouts = api.get_lustre_layouts(report)
+
+        reports = []
+
+        for file_id, file_name in file_ids.items():
+            df = dataset.read(
+                dataset.dataset_name(file, file_id, self.window) + ".dxt", self.window
             )
-            list(
-                map(
-                    lambda rec: graceful_wrapper(report, rec, lustre_records_by_id),
-                    report.records["DXT_MPIIO"],
+
+            if df.empty:
+                continue
+
+            self.logger.info("simulating stripe layouts for: {}".format(file_name))
+
+            with self.metrics.stage("stripe layouts", file_id) as stage:
+                result = stripe.sweep(
+                    df,
+                    self.args.stripe_sizes,
+                    self.args.stripe_counts,
+                    layouts.get(file_id),
+                )
+
+                stage["rows"] = result["operations"] * len(result["layouts"])
+
+            recommended = result["recommended"]
+
+            self.logger.info(
+                "STRIPE: {} (stripe size {}, stripe count {}, peak concurrency {})".format(
+                    "current layout recommended"
+                    if recommended["current"]
+                    else "recommended layout",
+                    dataset.format_size(recommended["stripe_size"]),
+                    recommended["stripe_count"],
+                    recommended["peak_concurrency"],
                 )
             )
 
-        df_posix = []
-        if "DXT_POSIX" in report.records:
-            df_posix = report.records["DXT_POSIX"].to_df()
+            result["file_id"] = str(file_id)
+            result["name"] = file_name
 
-        df_mpiio = []
-        if "DXT_MPIIO" in report.records:
-            df_mpiio = report.records["DXT_MPIIO"].to_df()
+            reports.append(result)
 
-        df_posix = pd.DataFrame(df_posix)
-        df_mpiio = pd.DataFrame(df_mpiio)
+        output_file = os.path.join(self.prefix, "stripe.json")
+
+        with open(output_file, "w") as f:
+            json.dump(reports, f, indent=2)
+
+        self.logger.info("SUCCESS: {}".format(output_file))
+
+        return stripe.to_html(reports)
+
+    def subset_dataset(self, file, file_ids, report):
+        """Subset the dataset based on file id and save to a csv file."""
+        import numpy as np
+
+        from explorer import api
+        from explorer import dataset
+
+        missing_file_ids = []
 
         for file_id in file_ids:
-            subset_dataset_file = "{}.{}".format(file, file_id)
+            subset_dataset_file = dataset.dataset_name(file, file_id, self.window)
 
             if os.path.exists(subset_dataset_file + ".dxt"):
-                self.logger.debug("using existing parsed Darshan file")
-                continue
+                if np.array_equal(dataset.read_size_bins(subset_dataset_file + ".dxt"), dataset.get_size_bins()):
+                    self.logger.debug("using existing parsed Darshan file")
+                    continue
 
-            self.create_dataframe(file_id, subset_dataset_file, df_posix, df_mpiio)
-
-    def merge_overlapping_io_phases(self, overlapping_df, df, module):
-        io_phases_df = pd.DataFrame(
-            columns=[
-                "index",
-                "api",
-                "operation",
-                "start",
-                "end",
-                "duration",
-                "fastest_rank",
-                "fastest_rank_start",
-                "fastest_rank_end",
-                "fastest_rank_duration",
-                "slowest_rank",
-                "slowest_rank_start",
-                "slowest_rank_end",
-                "slowest_rank_duration",
-                "threshold",
-            ]
-        )
+                # Converted before the size bins were stored or with other edges
+                self.logger.debug("converting again parsed Darshan file with other size bins")
 
-        overlapping_df_end = overlapping_df[["End"]].to_numpy()
-        overlapping_df_start = overlapping_df[["Start"]].to_numpy()
-        interval_duration = 0
-
-        for i in range(len(overlapping_df_end) - 1):
-            interval_start = overlapping_df_end[i]
-            interval_end = overlapping_df_start[i + 1]
-            interval_duration = interval_duration + (interval_end - interval_start)
-
-        threshold = float(interval_duration / (len(overlapping_df_end) - 1))
-        merged_df = pd.DataFrame(columns=["Start", "End"])
-
-        if len(overlapping_df_end) != 0:
-            prev_value = overlapping_df_end[0]
-            prev_index = 0
-
-            for i in range(1, len(overlapping_df_end)):
-                if overlapping_df_start[i] - prev_value <= threshold:
-                    prev_value = overlapping_df_end[i]
-                if (
-                    overlapping_df_start[i] - prev_value > threshold
-                    or i == len(overlapping_df_end) - 1
-                ):
-                    merged_df.loc[len(merged_df.index)] = [
-                        float(overlapping_df_start[prev_index]),
-                        float(prev_value),
-                    ]
-                    prev_index = i
-                    prev_value = overlapping_df_end[i]
-
-        if not merged_df.empty:
-            for i in range(len(merged_df)):
-                start = merged_df["Start"].iat[i]
-                end = merged_df["End"].iat[i]
-
-                df_temp = df[df["start"] >= start]
-                df_temp = df_temp[df_temp["end"] <= end]
-                df_temp["duration"] = df_temp["end"] - df_temp["start"]
-
-                min = df_temp.loc[df_temp["end"] == df_temp["end"].min()]
-                fastest_rank = min["rank"].tolist()
-                fastest_rank_start = min["start"].tolist()
-                fastest_rank_end = min["end"].tolist()
-                fastest_rank_duration = min["duration"].tolist()
-                if fastest_rank:
-                    fastest_rank = fastest_rank[0]
-                    fastest_rank_duration = fastest_rank_duration[0]
-                    fastest_rank_start = fastest_rank_start[0]
-                    fastest_rank_end = fastest_rank_end[0]
-
-                max = df_temp.loc[df_temp["end"] == df_temp["end"].max()]
-                slowest_rank = max["rank"].tolist()
-                slowest_rank_start = max["start"].tolist()
-                slowest_rank_end = max["end"].tolist()
-                slowest_rank_duration = max["duration"].tolist()
-                if slowest_rank:
-                    slowest_rank = slowest_rank[0]
-                    slowest_rank_duration = slowest_rank_duration[0]
-                    slowest_rank_start = slowest_rank_start[0]
-                    slowest_rank_end = slowest_rank_end[0]
-
-                operation = ""
-                if df_temp["operation"].eq("read").any():
-                    if df_temp["operation"].eq("write").any():
-                        operation = "read&write"
-                    else:
-                        operation = "read"
-                elif df_temp["operation"].eq("write").any():
-                    operation = "write"
-
-                start = df_temp["start"].min()
-                end = df_temp["end"].max()
-                duration = end - start
-                io_phases_df.loc[len(io_phases_df.index)] = [
-                    0,
-                    module,
-                    operation,
-                    start,
-                    end,
-                    duration,
-                    fastest_rank,
-                    fastest_rank_start,
-                    fastest_rank_end,
-                    fastest_rank_duration,
-                    slowest_rank,
-                    slowest_rank_start,
-                    slowest_rank_end,
-                    slowest_rank_duration,
-                    threshold,
-                ]
-
-        io_phases_df.dropna(inplace=True)
-        return io_phases_df
+            missing_file_ids.append(file_id)
 
-    def calculate_io_phases(
-        self, file, file_ids, file_id=None, snapshot=None, snapshot_flag=False
-    ):
-        if snapshot_flag:
-            subset_dataset_file = "{}.{}.{}-{}.{}".format(
-                file, file_id, "snapshot", snapshot, "dxt"
+        if not missing_file_ids:
+            return
+
+        self.logger.info("generating dataframes")
+
+        if self.window.has_ranks():
+            self.logger.info(
+                "converting only the ranks inside the window: {}".format(self.window)
             )
-            file_name = subset_dataset_file.split(".dxt")[0]
-            phases_file = "{}.{}".format(file_name, "io_phases")
 
-            if not os.path.exists(phases_file):
-                self.logger.info("generating I/O phases dataframe")
-                df = feather.read_feather(subset_dataset_file)
-                if not df.empty:
-                    df_selected = df[["api", "start", "end"]].copy()
-                    df_selected["start"] = df_selected["start"] * 10000
-                    df_selected["end"] = df_selected["end"] * 10000
-                    df_selected.columns = ["Chromosome", "Start", "End"]
-
-                    gr = pr.PyRanges(df_selected)
-                    overlapping = gr.merge()
-                    overlapping = overlapping.as_df()
-
-                    overlapping["Start"] = overlapping["Start"] / 10000
-                    overlapping["End"] = overlapping["End"] / 10000
-
-                    df_posix = df[df["api"] == "POSIX"]
-                    df_posix = df_posix.sort_values("start")
-
-                    overlapping_POSIX = overlapping[
-                        overlapping["Chromosome"] == "POSIX"
-                    ]
-
-                    io_phases_df_posix = self.merge_overlapping_io_phases(
-                        overlapping_POSIX, df_posix, "POSIX"
-                    )
+        with self.metrics.stage("lustre mapping") as stage:
+            layouts = api.get_lustre_layouts(report)
 
-                    df_mpiio = df[df["api"] == "MPIIO"]
-                    df_mpiio = df_mpiio.sort_values("start")
+            stage["rows"] = len(layouts)
 
-                    overlapping_MPIIO = overlapping[
-                        overlapping["Chromosome"] == "MPIIO"
-                    ]
+        with self.metrics.stage("conversion") as stage:
+            tables = api.read_tables(file, missing_file_ids, self.window, layouts)
 
-                    io_phases_df_mpiio = self.merge_overlapping_io_phases(
-                        overlapping_MPIIO, df_mpiio, "MPIIO"
-                    )
+            stage["rows"] = sum(table.num_rows for table in tables.values())
 
-                    frames = [io_phases_df_posix, io_phases_df_mpiio]
-                    result = pd.concat(frames)
-                    feather.write_feather(result, phases_file)
-                else:
-                    result = pd.DataFrame()
-                    feather.write_feather(result, phases_file)
-        else:
-            for file_id in file_ids:
-                if snapshot_flag:
-                    subset_dataset_file = "{}.{}.{}-{}.{}".format(
-                        file, file_id, "snapshot", snapshot, "dxt"
-                    )
-                else:
-                    subset_dataset_file = "{}.{}.{}".format(file, file_id, "dxt")
-
-                file_name = subset_dataset_file.split(".dxt")[0]
-                phases_file = "{}.{}".format(file_name, "io_phases")
-                if not os.path.exists(phases_file):
-                    self.logger.info("generating I/O phases dataframe")
-                    df = feather.read_feather(subset_dataset_file)
-                    if not df.empty:
-                        df_selected = df[["api", "start", "end"]].copy()
-                        df_selected["start"] = df_selected["start"] * 10000
-                        df_selected["end"] = df_selected["end"] * 10000
-                        df_selected.columns = ["Chromosome", "Start", "End"]
-
-                        gr = pr.PyRanges(df_selected)
-                        overlapping = gr.merge()
-                        overlapping = overlapping.as_df()
-
-                        overlapping["Start"] = overlapping["Start"] / 10000
-                        overlapping["End"] = overlapping["End"] / 10000
-
-                        df_posix = df[df["api"] == "POSIX"]
-                        df_posix = df_posix.sort_values("start")
-
-                        overlapping_POSIX = overlapping[
-                            overlapping["Chromosome"] == "POSIX"
-                        ]
-
-                        io_phases_df_posix = self.merge_overlapping_io_phases(
-                            overlapping_POSIX, df_posix, "POSIX"
-                        )
+        for file_id in missing_file_ids:
+            subset_dataset_file = dataset.dataset_name(file, file_id, self.window)
 
-                        df_mpiio = df[df["api"] == "MPIIO"]
-                        df_mpiio = df_mpiio.sort_values("start")
+            table = tables.get(file_id, api.get_schema().empty_table())
 
-                        overlapping_MPIIO = overlapping[
-                            overlapping["Chromosome"] == "MPIIO"
-                        ]
+            with self.metrics.stage("dataset", file_id) as stage:
+                stage["rows"] = api.write_dataset(
+                    table, subset_dataset_file, self.args.csv
+                )
 
-                        io_phases_df_mpiio = self.merge_overlapping_io_phases(
-                            overlapping_MPIIO, df_mpiio, "MPIIO"
-                        )
+    def compute_io_phases(self, subset_dataset_file, phases_file):
+        """
+        Merge the overlapping operations of a dataset into I/O phases.
 
-                        frames = [io_phases_df_posix, io_phases_df_mpiio]
-                        result = pd.concat(frames)
-                        feather.write_feather(result, phases_file)
-                    else:
-                        result = pd.DataFrame()
-                        feather.write_feather(result, phases_file)
+        Arguments:
+            subset_dataset_file: path of the .dxt dataset
+            phases_file: path where the I/O phases are saved
 
-    def generate_plot(self, file, report):
-        """Generate an interactive operation plot."""
-        limits = ""
-        insights = ""
+        Returns:
+            number of operations in the dataset
+        """
+        import pyarrow.feather as feather
+        from explorer import api
 
-        if self.args.start:
-            limits += " -s {} ".format(self.args.start)
+        self.logger.info("generating I/O phases dataframe")
+        df = feather.read_feather(subset_dataset_file)
 
-        if self.args.end:
-            limits += " -e {} ".format(self.args.end)
+        feather.write_feather(api.io_phases(df), phases_file)
 
-        if self.args.start_rank:
-            limits += " -n {} ".format(self.args.start_rank)
+        return len(df)
 
-        if self.args.end_rank:
-            limits += " -m {} ".format(self.args.end_rank)
+    def calculate_io_phases(
+        self, file, file_ids, file_id=None, snapshot=None, snapshot_flag=False
+    ):
+        from explorer import dataset
+
+        if snapshot_flag:
+            subset_dataset_files = {
+                file_id: "{}.{}-{}.{}".format(
+                    dataset.dataset_name(file, file_id, self.window),
+                    "snapshot",
+                    snapshot,
+                    "dxt",
+                )
+            }
+        else:
+            subset_dataset_files = {
+                file_id: "{}.{}".format(
+                    dataset.dataset_name(file, file_id, self.window), "dxt"
+                )
+                for file_id in file_ids
+            }
+
+        for file_id, subset_dataset_file in subset_dataset_files.items():
+            file_name = subset_dataset_file.split(".dxt")[0]
+            phases_file = "{}.{}".format(file_name, "io_phases")
+
+            if not os.path.exists(phases_file):
+                with self.metrics.stage("io phases", file_id) as stage:
+                    stage["rows"] = self.compute_io_phases(
+                        subset_dataset_file, phases_file
+                    )
+
+    def generate_plot(self, file, report):
+        """Generate an interactive operation plot."""
+        import pandas as pd
+        from explorer import dataset
+
+        limits = self.get_plot_options()
+        insights = ""
 
         if self.args.rank_zero_workload:
             insights += " -0 {} ".format(self.args.rank_zero_workload)
@@ -649,6 +691,9 @@ class Explorer:
         if self.args.unbalanced_workload:
             insights += " -1 {} ".format(self.args.unbalanced_workload)
 
+        if self.args.access_patterns:
+            insights += " -4 {} ".format(self.args.access_patterns)
+
         file_ids = self.list_files(report)
 
         if len(file_ids) == 0:
@@ -661,12 +706,19 @@ class Explorer:
                 self.calculate_io_phases(file, file_ids)
 
             for file_id, file_name in file_ids.items():
-                csv_file = "{}.{}.summary.dxt.csv".format(file, file_id)
+                subset_dataset_file = dataset.dataset_name(file, file_id, self.window)
+
+                csv_file = "{}.summary.dxt.csv".format(subset_dataset_file)
                 df = pd.read_csv(csv_file, sep=",")
 
                 total_logs = df["total_logs"].iloc[0]
                 runtime = df["runtime"].iloc[0]
 
+                if self.args.serve:
+                    # The server sends only the operations of the visible window
+                    self.generate_served_plot(file_id, file_name, subset_dataset_file)
+                    continue
+
                 threshold = 20000000
 
                 if total_logs > threshold:
@@ -676,9 +728,6 @@ class Explorer:
                         )
                     )
 
-                    csv_file = "{}.{}.dxt".format(file, file_id)
-                    df = pd.read_csv(csv_file, sep=",")
-
                     start = 0
                     increment_amount = total_logs / threshold
                     increment_amount = runtime / increment_amount
@@ -686,9 +735,13 @@ class Explorer:
                     snapshot = 1
 
                     while end < runtime:
-                        val = input(
-                            "Do you want to generate plots for the next interval? Enter Y to continue, N to quit.\n"
-                        )
+                        if self.args.yes or not sys.stdin.isatty():
+                            # Nobody to ask in batch mode or when piped, every interval is generated
+                            val = "Y"
+                        else:
+                            val = input(
+                                "Do you want to generate plots for the next interval? Enter Y to continue, N to quit.\n"
+                            )
 
                         if val == "Y" or val == "y":
                             self.logger.info(
@@ -696,30 +749,18 @@ class Explorer:
                                     round(start, 4), round(end, 4)
                                 )
                             )
-                            snapshot_file = "{}.{}.{}-{}.{}".format(
-                                file, file_id, "snapshot", snapshot, "dxt"
+                            snapshot_name = "{}.{}-{}".format(
+                                subset_dataset_file, "snapshot", snapshot
                             )
+                            snapshot_file = "{}.dxt".format(snapshot_name)
 
                             if not os.path.exists(snapshot_file):
-                                rows_before_start = df[
-                                    (df["start"] < start) & (df["end"] > start)
-                                ].copy()
-                                if not rows_before_start.empty:
-                                    rows_before_start.loc[:, "start"] = round(start, 4)
-
-                                rows_after_end = df[
-                                    (df["start"] < end) & (df["end"] > end)
-                                ].copy()
-
-                                if not rows_after_end.empty:
-                                    rows_after_end.loc[:, "end"] = round(end, 4)
-
-                                rows = df[df["start"] >= start]
-                                rows = rows[rows["end"] <= end]
-                                frames = [rows_before_start, rows_after_end, rows]
-
-                                df_snap = pd.concat(frames)
-                                df_snap.to_csv(snapshot_file)
+                                df_snap = dataset.read(
+                                    "{}.dxt".format(subset_dataset_file),
+                                    dataset.Window(start, end),
+                                    clip=True,
+                                )
+                                dataset.write(df_snap, snapshot_file)
 
                             if self.args.stragglers:
                                 self.calculate_io_phases(
@@ -730,18 +771,12 @@ class Explorer:
                                 self.prefix, file_id, "snapshot", snapshot, "operation"
                             )
                             path = "plots/operation.py"
-                            script = pkg_resources.resource_filename(__name__, path)
+                            script = get_script(path)
 
-                            command = "python3 {} -f {}.{}.{}-{}.dxt -i {}.{}.{}-{}.io_phases {} {} -o {} -x {} -t {} -r {}".format(
+                            command = "python3 {} -f {}.dxt -i {}.io_phases {} {} -o {} -x {} -t {} -r {}".format(
                                 script,
-                                file,
-                                file_id,
-                                "snapshot",
-                                snapshot,
-                                file,
-                                file_id,
-                                "snapshot",
-                                snapshot,
+                                snapshot_name,
+                                snapshot_name,
                                 limits,
                                 insights,
                                 output_file,
@@ -757,11 +792,21 @@ class Explorer:
                                 )
                             )
                             self.logger.debug(command)
-                            s = subprocess.run(args)
+                            with self.metrics.stage("plot operation", file_id) as stage:
+                                stage["rows"] = int(total_logs)
+
+                                s = subprocess.run(args)
 
                             if s.returncode == 0:
                                 if os.path.exists(output_file):
                                     self.logger.info("SUCCESS: {}".format(output_file))
+
+                                    # Listed in the index, which also writes the
+                                    # plotly.js bundle the page points to
+                                    if file_id not in self.generated_files:
+                                        self.generated_files[file_id] = []
+
+                                    self.generated_files[file_id].append(output_file)
                                 else:
                                     self.logger.warning(
                                         "no data to generate interactive plots"
@@ -792,14 +837,12 @@ class Explorer:
                         self.prefix, file_id, "operation"
                     )
                     path = "plots/operation.py"
-                    script = pkg_resources.resource_filename(__name__, path)
+                    script = get_script(path)
 
-                    command = "python3 {} -f {}.{}.dxt -i {}.{}.io_phases{} {} -o {} -x {}".format(
+                    command = "python3 {} -f {}.dxt -i {}.io_phases{} {} -o {} -x {}".format(
                         script,
-                        file,
-                        file_id,
-                        file,
-                        file_id,
+                        subset_dataset_file,
+                        subset_dataset_file,
                         limits,
                         insights,
                         output_file,
@@ -812,7 +855,10 @@ class Explorer:
                     )
                     self.logger.debug(command)
 
-                    s = subprocess.run(args)
+                    with self.metrics.stage("plot operation", file_id) as stage:
+                        stage["rows"] = int(total_logs)
+
+                        s = subprocess.run(args)
 
                     if s.returncode == 0:
                         if os.path.exists(output_file):
@@ -835,21 +881,47 @@ class Explorer:
 
                         sys.exit(os.EX_SOFTWARE)
 
-    def generate_transfer_plot(self, file, report):
-        """Generate an interactive transfer plot."""
-        limits = ""
+    def generate_served_plot(self, file_id, file_name, subset_dataset_file):
+        """Generate the operation page that queries the local web server."""
+        with open(get_script("plots/serve.html")) as f:
+            template = f.read()
 
-        if self.args.start:
-            limits += " -s {} ".format(self.args.start)
+        template = template.replace('"DXT_EXPLORER_FILE_ID"', json.dumps(str(file_id)))
+        template = template.replace('"DXT_EXPLORER_FILE_NAME"', json.dumps(file_name))
 
-        if self.args.end:
-            limits += " -e {} ".format(self.args.end)
+        output_file = "{}/{}-{}.html".format(self.prefix, file_id, "operation")
 
-        if self.args.start_rank:
-            limits += " -n {} ".format(self.args.start_rank)
+        with open(output_file, "w") as f:
+            f.write(template)
 
-        if self.args.end_rank:
-            limits += " -m {} ".format(self.args.end_rank)
+        self.logger.info("SUCCESS: {}".format(output_file))
+
+        from explorer import tiles
+
+        # Only rendered when the dataset changed since the tiles were cached
+        with self.metrics.stage("tiles", file_id):
+            tiles.Pyramid.from_dataset(subset_dataset_file + ".dxt").prerender()
+
+        self.served_files[file_id] = (file_name, subset_dataset_file + ".dxt")
+
+        if file_id not in self.generated_files:
+            self.generated_files[file_id] = []
+
+        self.generated_files[file_id].append(output_file)
+
+    def serve(self):
+        """Serve the plots and the window queries of the operation pages."""
+        from explorer import server
+
+        service = server.Service(self.prefix, self.served_files, self.args.cache)
+
+        server.serve(service, port=self.args.port, browser=self.args.browser)
+
+    def generate_transfer_plot(self, file, report):
+        """Generate an interactive transfer plot."""
+        from explorer import dataset
+
+        limits = self.get_plot_options()
 
         file_ids = self.list_files(report)
 
@@ -864,10 +936,14 @@ class Explorer:
                 output_file = "{}/{}-{}.html".format(self.prefix, file_id, "transfer")
 
                 path = "plots/transfer.py"
-                script = pkg_resources.resource_filename(__name__, path)
-
-                command = "python3 {} -f {}.{}.dxt {} -o {} -x {}".format(
-                    script, file, file_id, limits, output_file, file_name
+                script = get_script(path)
+
+                command = "python3 {} -f {}.dxt {} -o {} -x {}".format(
+                    script,
+                    dataset.dataset_name(file, file_id, self.window),
+                    limits,
+                    output_file,
+                    file_name,
                 )
 
                 args = shlex.split(command)
@@ -877,7 +953,8 @@ class Explorer:
                 )
                 self.logger.debug(command)
 
-                s = subprocess.run(args)
+                with self.metrics.stage("plot transfer", file_id):
+                    s = subprocess.run(args)
 
                 if s.returncode == 0:
                     self.logger.info("SUCCESS: {}".format(output_file))
@@ -901,6 +978,10 @@ class Explorer:
 
     def generate_spatiality_plot(self, file, report):
         """Generate an interactive spatiality plot."""
+        from explorer import dataset
+
+        limits = self.get_plot_options()
+
         file_ids = self.list_files(report)
         if len(file_ids) == 0:
             self.logger.info("No data to generate plots")
@@ -912,10 +993,14 @@ class Explorer:
                 output_file = "{}/{}-{}.html".format(self.prefix, file_id, "spatiality")
 
                 path = "plots/spatiality.py"
-                script = pkg_resources.resource_filename(__name__, path)
-
-                command = "python3 {} -f {}.{}.dxt -o {} -x {}".format(
-                    script, file, file_id, output_file, file_name
+                script = get_script(path)
+
+                command = "python3 {} -f {}.dxt {} -o {} -x {}".format(
+                    script,
+                    dataset.dataset_name(file, file_id, self.window),
+                    limits,
+                    output_file,
+                    file_name,
                 )
 
                 args = shlex.split(command)
@@ -923,7 +1008,8 @@ class Explorer:
                     "generating interactive spatiality for: {}".format(file_name)
                 )
 
-                s = subprocess.run(args)
+                with self.metrics.stage("plot spatiality", file_id):
+                    s = subprocess.run(args)
 
                 if s.returncode == 0:
                     if os.path.exists(output_file):
@@ -948,6 +1034,10 @@ class Explorer:
 
     def generate_phase_plot(self, file, report):
         """Generate an interactive I/O phase plot."""
+        from explorer import dataset
+
+        limits = self.get_plot_options()
+
         file_ids = self.list_files(report)
 
         if len(file_ids) == 0:
@@ -959,10 +1049,14 @@ class Explorer:
             for file_id, file_name in file_ids.items():
                 output_file = "{}/{}-{}.html".format(self.prefix, file_id, "io_phase")
                 path = "plots/io_phase.py"
-                script = pkg_resources.resource_filename(__name__, path)
-
-                command = "python3 {} -f {}.{}.io_phases -o {} -x {}".format(
-                    script, file, file_id, output_file, file_name
+                script = get_script(path)
+
+                command = "python3 {} -f {}.io_phases {} -o {} -x {}".format(
+                    script,
+                    dataset.dataset_name(file, file_id, self.window),
+                    limits,
+                    output_file,
+                    file_name,
                 )
 
                 args = shlex.split(command)
@@ -970,7 +1064,8 @@ class Explorer:
                     "generating interactive I/O phase plot for: {}".format(file_name)
                 )
 
-                s = subprocess.run(args)
+                with self.metrics.stage("plot io phases", file_id):
+                    s = subprocess.run(args)
 
                 if s.returncode == 0:
                     if os.path.exists(output_file):
@@ -995,6 +1090,10 @@ class Explorer:
 
     def generate_ost_usage_operation_plot(self, file, report):
         """Generate an interactive OST usage operation plot."""
+        from explorer import dataset
+
+        limits = self.get_plot_options()
+
         file_ids = self.list_files(report)
 
         if len(file_ids) == 0:
@@ -1007,10 +1106,14 @@ class Explorer:
                     self.prefix, file_id, "ost_usage_operation"
                 )
                 path = "plots/ost_usage_operation.py"
-                script = pkg_resources.resource_filename(__name__, path)
-
-                command = "python3 {} -f {}.{}.dxt -o {} -x {}".format(
-                    script, file, file_id, output_file, file_name
+                script = get_script(path)
+
+                command = "python3 {} -f {}.dxt {} -o {} -x {}".format(
+                    script,
+                    dataset.dataset_name(file, file_id, self.window),
+                    limits,
+                    output_file,
+                    file_name,
                 )
 
                 args = shlex.split(command)
@@ -1020,7 +1123,8 @@ class Explorer:
                     )
                 )
 
-                s = subprocess.run(args)
+                with self.metrics.stage("plot ost usage operation", file_id):
+                    s = subprocess.run(args)
 
                 if s.returncode == 0:
                     if os.path.exists(output_file):
@@ -1045,6 +1149,10 @@ class Explorer:
 
     def generate_ost_usage_transfer_plot(self, file, report):
         """Generate an interactive OST usage data transfer plot."""
+        from explorer import dataset
+
+        limits = self.get_plot_options()
+
         file_ids = self.list_files(report)
 
         if len(file_ids) == 0:
@@ -1057,10 +1165,14 @@ class Explorer:
                     self.prefix, file_id, "ost_usage_transfer"
                 )
                 path = "plots/ost_usage_transfer.py"
-                script = pkg_resources.resource_filename(__name__, path)
-
-                command = "python3 {} -f {}.{}.dxt -o {} -x {}".format(
-                    script, file, file_id, output_file, file_name
+                script = get_script(path)
+
+                command = "python3 {} -f {}.dxt {} -o {} -x {}".format(
+                    script,
+                    dataset.dataset_name(file, file_id, self.window),
+                    limits,
+                    output_file,
+                    file_name,
                 )
 
                 args = shlex.split(command)
@@ -1070,7 +1182,67 @@ class Explorer:
                     )
                 )
 
-                s = subprocess.run(args)
+                with self.metrics.stage("plot ost usage transfer", file_id):
+                    s = subprocess.run(args)
+
+                if s.returncode == 0:
+                    if os.path.exists(output_file):
+                        self.logger.info("SUCCESS: {}".format(output_file))
+                    else:
+                        self.logger.warning("no data to generate interactive plots")
+
+                    if self.args.browser:
+                        webbrowser.open("file://{}".format(output_file), new=2)
+
+                    if file_id not in self.generated_files:
+                        self.generated_files[file_id] = []
+
+                    self.generated_files[file_id].append(output_file)
+                else:
+                    self.logger.error(
+                        "failed to generate the interactive plots (error %s)",
+                        s.returncode,
+                    )
+
+                    sys.exit(os.EX_SOFTWARE)
+
+    def generate_ost_usage_heatmap_plot(self, file, report):
+        """Generate an interactive OST usage heatmap plot."""
+        from explorer import dataset
+
+        limits = self.get_plot_options()
+
+        file_ids = self.list_files(report)
+
+        if len(file_ids) == 0:
+            self.logger.info("No data to generate plots")
+        else:
+            self.subset_dataset(file, file_ids, report)
+
+            for file_id, file_name in file_ids.items():
+                output_file = "{}/{}-{}.html".format(
+                    self.prefix, file_id, "ost_usage_heatmap"
+                )
+                path = "plots/ost_usage_heatmap.py"
+                script = get_script(path)
+
+                command = "python3 {} -f {}.dxt {} -o {} -x {}".format(
+                    script,
+                    dataset.dataset_name(file, file_id, self.window),
+                    limits,
+                    output_file,
+                    file_name,
+                )
+
+                args = shlex.split(command)
+                self.logger.info(
+                    "generating interactive OST usage heatmap plot for: {}".format(
+                        file_name
+                    )
+                )
+
+                with self.metrics.stage("plot ost usage heatmap", file_id):
+                    s = subprocess.run(args)
 
                 if s.returncode == 0:
                     if os.path.exists(output_file):
@@ -1093,9 +1265,9 @@ class Explorer:
 
                     sys.exit(os.EX_SOFTWARE)
 
-    def generate_index(self, file, report):
+    def generate_index(self, file, report, summary_html=""):
         """Generate index file with all the plots."""
-        file_ids = self.list_files(report, False)
+        file_ids = self.list_files(report, False) if self.generated_files else {}
 
         file = open(os.path.join(self.ROOT, "plots/index.html"), mode="r")
         template = file.read()
@@ -1127,6 +1299,13 @@ class Explorer:
                 if "ost_usage_transfer" in file_name:
                     plot_type = "OST USAGE TRANSFER"
 
+                if "ost_usage_heatmap" in file_name:
+                    plot_type = "OST USAGE HEATMAP"
+
+                snapshot = re.search(r"-snapshot-(\d+)-", os.path.basename(file_name))
+                if snapshot:
+                    plot_type = "{} {}".format(plot_type, snapshot.group(1))
+
                 plots.append(
                     """
                     <li>
@@ -1152,6 +1331,10 @@ class Explorer:
 
         template = template.replace("DXT_DARSHAN_FILE", self.args.darshan)
         template = template.replace("DXT_EXPLORER_FILES", file_index)
+        if self.args.metrics:
+            summary_html += self.metrics.to_html()
+
+        template = template.replace("DXT_EXPLORER_SUMMARY", summary_html)
         template = template.replace("DXT_EXPLORER_VERSION", dxt_version.__version__)
         template = template.replace("DXT_EXPLORER_DATE", str(datetime.datetime.now()))
         template = template.replace(
@@ -1161,16 +1344,33 @@ class Explorer:
 
         output_file = "{}/{}.html".format(self.prefix, "index")
 
+        self.write_assets()
+
         file = open(output_file, mode="w")
         file.write(template)
         file.close()
 
+        self.metrics.write(
+            os.path.join(self.prefix, "run_metrics.json"),
+            darshan=self.args.darshan,
+            version=dxt_version.__version__,
+            runtime=round(self.explorer_end_time - self.explorer_start_time, 6),
+        )
+
+        if self.args.profile:
+            hot_functions = self.metrics.profiler.summary()
+
+            if hot_functions:
+                self.logger.info("PROFILE: {}".format(hot_functions))
+
         self.logger.info("SUCCESS: {}".format(output_file))
         self.logger.info(
             "You can open the index.html file in your browser to interactively explore all plots"
         )
 
     def check_log_version(self, file, log_version, library_version):
+        from packaging import version
+
         use_file = file
         if version.parse(log_version) < version.parse(library_version):
             use_file = file.replace(".darshan", ".converted.darshan")
@@ -1193,7 +1393,8 @@ class Explorer:
         return use_file
 
 
-def main():
+def build_parser():
+    """Create the command line parser of DXT Explorer."""
     PARSER = argparse.ArgumentParser(description="DXT Explorer: ")
 
     PARSER.add_argument("darshan", help="Input .darshan file")
@@ -1248,6 +1449,14 @@ def main():
         help="Generate an interactive OST usage data transfer size explorer",
     )
 
+    PARSER.add_argument(
+        "-oh",
+        "--ost_usage_heatmap",
+        default=False,
+        action="store_true",
+        help="Generate an interactive heatmap of the bytes and requests of each OST over time, flagging the hotspots",
+    )
+
     PARSER.add_argument(
         "-r",
         "--rank_zero_workload",
@@ -1275,6 +1484,15 @@ def main():
         help="Determine the 5 percent slowest operations in the time distribution",
     )
 
+    PARSER.add_argument(
+        "-ap",
+        "--access_patterns",
+        default=False,
+        action="store_true",
+        dest="access_patterns",
+        help="Determine if the ranks access the file backward or at random",
+    )
+
     PARSER.add_argument(
         "-d", "--debug", action="store_true", dest="debug", help="Enable debug mode"
     )
@@ -1309,6 +1527,126 @@ def main():
         "--to", action="store", dest="end_rank", help="Report up to rank M"
     )
 
+    PARSER.add_argument(
+        "--file_id",
+        action="append",
+        dest="file_id",
+        help="Only explore the file with this id (can be repeated)",
+    )
+
+    PARSER.add_argument(
+        "--match",
+        action="append",
+        dest="file_match",
+        help="Only explore files whose path matches this glob pattern (can be repeated)",
+    )
+
+    PARSER.add_argument(
+        "--regex",
+        action="append",
+        dest="file_regex",
+        help="Only explore files whose path matches this regular expression (can be repeated)",
+    )
+
+    PARSER.add_argument(
+        "--top",
+        type=int,
+        default=None,
+        dest="top",
+        help="Only explore the N files that moved more bytes or spent more time in I/O",
+    )
+
+    PARSER.add_argument(
+        "--top_by",
+        choices=["bytes", "time"],
+        default="bytes",
+        dest="top_by",
+        help="Counter used to rank the files with --top (default: bytes)",
+    )
+
+    PARSER.add_argument(
+        "--min_ops",
+        type=int,
+        default=1,
+        dest="min_ops",
+        help="Only explore files with at least N traced operations",
+    )
+
+    PARSER.add_argument(
+        "--summary",
+        default=False,
+        action="store_true",
+        dest="summary",
+        help="Only report per-file and per-rank totals, without generating plots",
+    )
+
+    PARSER.add_argument(
+        "--stripe",
+        default=False,
+        action="store_true",
+        dest="stripe",
+        help="Replay the operations of each file under other Lustre stripe layouts and recommend one",
+    )
+
+    PARSER.add_argument(
+        "--stripe_sizes",
+        default=None,
+        nargs="+",
+        dest="stripe_sizes",
+        metavar="SIZE",
+        help="Stripe sizes simulated with --stripe, with a K, M or G suffix (default: 1M 4M 16M 64M)",
+    )
+
+    PARSER.add_argument(
+        "--stripe_counts",
+        default=None,
+        nargs="+",
+        type=int,
+        dest="stripe_counts",
+        metavar="COUNT",
+        help="Stripe counts simulated with --stripe (default: 1 2 4 8 16 32 64)",
+    )
+
+    PARSER.add_argument(
+        "--metrics",
+        default=False,
+        action="store_true",
+        dest="metrics",
+        help="Show the time, memory and throughput of each stage in the index page",
+    )
+
+    PARSER.add_argument(
+        "--profile",
+        default=False,
+        action="store_true",
+        dest="profile",
+        help="Save cProfile and tracemalloc dumps of each stage into the profile directory",
+    )
+
+    PARSER.add_argument(
+        "--serve",
+        default=False,
+        action="store_true",
+        dest="serve",
+        help="Serve the plots on a local web server, loading the operations of the visible window as you zoom",
+    )
+
+    PARSER.add_argument(
+        "--port",
+        default=8000,
+        type=int,
+        dest="port",
+        help="Port of the local web server (default: 8000)",
+    )
+
+    PARSER.add_argument(
+        "--cache",
+        default=256,
+        type=int,
+        dest="cache",
+        help="Number of window queries kept in memory by the local web server (default: 256)",
+    )
+
     PARSER.add_argument(
         "--browser",
         default=False,
@@ -1317,6 +1655,23 @@ def main():
         help="Open the browser with the generated plot",
     )
 
+    PARSER.add_argument(
+        "-y",
+        "--yes",
+        default=False,
+        action="store_true",
+        dest="yes",
+        help="Generate the plots of every interval of large traces without asking",
+    )
+
+    PARSER.add_argument(
+        "--sidecar",
+        default=False,
+        action="store_true",
+        dest="sidecar",
+        help="Save the data of each plot into a compressed file loaded by the page after it is shown",
+    )
+
     PARSER.add_argument(
         "-csv",
         "--csv",
@@ -1337,8 +1692,25 @@ def main():
         + ")",
     )
 
+    return PARSER
+
+
+def main():
+    PARSER = build_parser()
+
     ARGS = PARSER.parse_args()
 
+    if ARGS.stripe_sizes:
+        from explorer import dataset
+
+        try:
+            ARGS.stripe_sizes = [dataset.parse_size(size) for size in ARGS.stripe_sizes]
+        except ValueError as error:
+            PARSER.error(str(error))
+
+    if ARGS.stripe_counts and min(ARGS.stripe_counts) <= 0:
+        PARSER.error("stripe counts must be positive")
+
     EXPLORE = Explorer(ARGS)
     EXPLORE.run()
 
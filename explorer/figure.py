@@ -0,0 +1,340 @@
+"""
+Write the plotly figures of the plot scripts as HTML pages.
+
+Every page references the plotly.js bundle written next to index.html. By
+default the figure is inlined into the page, which the browser must parse
+entirely before showing anything. With sidecar=True, the page only holds a
+small loader and the figure goes to a separate data file: the numeric arrays
+are stored as little-endian typed arrays in a binary section, the rest of the
+figure as JSON, and both are gzip compressed. The page shows up at once and
+decodes the data file asynchronously, building the typed arrays as views of
+the decompressed buffer without parsing the numbers.
+
+Data file layout, once decompressed:
+    4 bytes     length of the JSON header (little-endian)
+    4 bytes     padding
+    header      figure as JSON, the numeric arrays replaced by
+                {"typed_array": {"dtype", "offset", "length"}}, padded to 8 bytes
+    buffers     the numeric arrays, each one aligned to 8 bytes
+
+The compressed payload is saved in base64 inside a script, since browsers do
+not let pages opened from file:// fetch other files.
+
+Inlined figures are serialized by a JSON engine, set with the
+DXT_EXPLORER_JSON_ENGINE environment variable:
+    orjson      orjson, serializing the NumPy arrays natively (default when
+                orjson is installed)
+    base64      the numeric arrays as base64 typed arrays, which plotly.js
+                decodes without parsing the numbers (from plotly.js 2.28,
+                bundled since plotly 5.19), the rest with the json module
+                (default otherwise)
+    plotly      the plotly encoder used by fig.write_html
+"""
+
+import os
+import json
+import gzip
+import uuid
+import base64
+import struct
+
+import numpy as np
+import plotly.io as pio
+
+from plotly.basedatatypes import BasePlotlyType
+
+from explorer import dxt
+
+
+PLOTLYJS = "plotly.min.js"
+
+# JavaScript typed arrays for each NumPy dtype, the other dtypes are converted
+TYPED_ARRAYS = {
+    "float64": "f8",
+    "float32": "f4",
+    "int32": "i4",
+    "int16": "i2",
+    "int8": "i1",
+    "uint32": "u4",
+    "uint16": "u2",
+    "uint8": "u1",
+}
+
+# The numeric arrays barely compress further at higher levels, which are much slower
+COMPRESSION_LEVEL = 1
+
+ENGINES = ["orjson", "base64", "plotly"]
+
+PAGE = """<html>
+<head><meta charset="utf-8" /></head>
+<body>
+{}</body>
+</html>
+"""
+
+INLINE = """<div>
+    <script charset="utf-8" src="{plotlyjs}"></script>
+    <div id="{id}" class="plotly-graph-div" style="height:{height}; width:{width};"></div>
+    <script type="text/javascript">
+        window.PLOTLYENV = window.PLOTLYENV || {{}};
+
+        if (document.getElementById("{id}")) {{
+            Plotly.newPlot("{id}", {data}, {layout}, {config});
+        }}
+    </script>
+</div>
+"""
+
+
+def get_engine():
+    """JSON engine of the inlined figures, from DXT_EXPLORER_JSON_ENGINE or the fastest one installed."""
+    engine = os.environ.get("DXT_EXPLORER_JSON_ENGINE")
+
+    if engine:
+        if engine not in ENGINES:
+            raise ValueError(
+                "unknown JSON engine {} (use {})".format(engine, ", ".join(ENGINES))
+            )
+
+        return engine
+
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        return "base64"
+
+    return "orjson"
+
+
+def to_json(value, engine):
+    """
+    Serialize a part of a figure (its data, layout or config) into JSON.
+
+    Arguments:
+        value: figure dictionary, as returned by fig.to_plotly_json()
+        engine: one of ENGINES
+
+    Returns:
+        JSON as a string
+    """
+    if engine == "orjson":
+        import orjson
+
+        return orjson.dumps(
+            clean(value),
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        ).decode()
+
+    if engine == "base64":
+        return json.dumps(to_typed_arrays(value), default=to_builtin)
+
+    return pio.json.to_json_plotly(value, engine="json")
+
+
+def clean(value):
+    """Convert the arrays orjson cannot serialize natively into lists."""
+    if isinstance(value, BasePlotlyType):
+        # Plotly objects left inside the layout, such as the shapes of the update menus
+        return clean(value.to_plotly_json())
+
+    if isinstance(value, dict):
+        return {key: clean(item) for key, item in value.items()}
+
+    if isinstance(value, (list, tuple)):
+        return [clean(item) for item in value]
+
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind not in "biuf" or (value.dtype.kind == "f" and value.dtype.itemsize < 4):
+            return value.tolist()
+
+        return np.ascontiguousarray(value)
+
+    return value
+
+
+def to_typed_arrays(value):
+    """Replace the numeric arrays of a figure by the base64 typed arrays of plotly.js."""
+    if isinstance(value, BasePlotlyType):
+        return to_typed_arrays(value.to_plotly_json())
+
+    if isinstance(value, dict):
+        return {key: to_typed_arrays(item) for key, item in value.items()}
+
+    if isinstance(value, (list, tuple)):
+        return [to_typed_arrays(item) for item in value]
+
+    if not isinstance(value, np.ndarray):
+        return value
+
+    if value.ndim != 1 or value.dtype.kind not in "iuf":
+        return value.tolist()
+
+    dtype, buffer = to_buffer(value)
+
+    return {"dtype": dtype, "bdata": base64.b64encode(buffer).decode("ascii")}
+
+
+def to_buffer(value):
+    """
+    Convert a numeric array into the smallest JavaScript typed array that holds it.
+
+    Returns:
+        tuple with the typed array code and its little-endian bytes
+    """
+    if value.dtype.kind in "iu" and len(value):
+        minimum, maximum = value.min(), value.max()
+
+        # Ranks, sizes and counts usually fit in far fewer than 64 bits
+        for dtype in [np.int8, np.uint8, np.int16, np.uint16, np.int32, np.uint32]:
+            limits = np.iinfo(dtype)
+
+            if limits.min <= minimum and maximum <= limits.max:
+                value = value.astype(dtype, copy=False)
+                break
+
+    if value.dtype.name not in TYPED_ARRAYS:
+        # JavaScript has no 64-bit integer arrays plotly.js can draw
+        value = value.astype(np.float64)
+
+    return (
+        TYPED_ARRAYS[value.dtype.name],
+        value.astype(value.dtype.newbyteorder("<"), copy=False).tobytes(),
+    )
+
+
+def to_builtin(value):
+    """Convert the NumPy scalars left in a figure for the json module."""
+    if isinstance(value, np.generic):
+        return value.item()
+
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+
+    if isinstance(value, BasePlotlyType):
+        return value.to_plotly_json()
+
+    raise TypeError("{} is not JSON serializable".format(type(value).__name__))
+
+
+def write_html(fig, output, full_html=True, sidecar=False, engine=None, footer=""):
+    """
+    Write a figure as an HTML page that loads the shared plotly.js bundle.
+
+    Arguments:
+        fig: plotly figure
+        output: path of the HTML page
+        full_html: write a complete page instead of a fragment
+        sidecar: save the figure data in a compressed file loaded by the page
+        engine: JSON engine of the inlined figure, see get_engine
+        footer: HTML shown below the figure
+    """
+    figure_id = str(uuid.uuid4())
+
+    layout = fig.layout
+
+    height = "{}px".format(layout.height) if layout.height else "100%"
+    width = "{}px".format(layout.width) if layout.width else "100%"
+
+    if not sidecar:
+        engine = get_engine() if engine is None else engine
+
+        figure = fig.to_plotly_json()
+
+        page = INLINE.format(
+            plotlyjs=PLOTLYJS,
+            id=figure_id,
+            height=height,
+            width=width,
+            data=to_json(figure["data"], engine),
+            layout=to_json(figure["layout"], engine),
+            config=json.dumps({"responsive": True}),
+        ) + footer
+
+        with open(output, "w") as f:
+            f.write(PAGE.format(page) if full_html else page)
+
+        return
+
+    data_file = "{}.data.js".format(output)
+
+    with open(data_file, "w") as f:
+        f.write(
+            "window.DXT_EXPLORER_DATA = window.DXT_EXPLORER_DATA || {{}};\n"
+            "window.DXT_EXPLORER_DATA[\"{}\"] = \"{}\";\n".format(
+                figure_id,
+                base64.b64encode(encode(fig)).decode("ascii"),
+            )
+        )
+
+    with open(dxt.get_script("plots/figure.html")) as f:
+        page = f.read()
+
+    page = page.replace("DXT_EXPLORER_FIGURE_ID", figure_id)
+    page = page.replace("DXT_EXPLORER_DATA_FILE", os.path.basename(data_file))
+    page = page.replace("DXT_EXPLORER_HEIGHT", height)
+    page = page.replace("DXT_EXPLORER_WIDTH", width) + footer
+
+    with open(output, "w") as f:
+        f.write(PAGE.format(page) if full_html else page)
+
+
+def encode(fig):
+    """
+    Encode a figure into the compressed payload of a data file.
+
+    Returns:
+        gzip compressed payload as bytes
+    """
+    buffers = []
+    offset = [0]
+
+    def extract(value):
+        if isinstance(value, BasePlotlyType):
+            return extract(value.to_plotly_json())
+
+        if isinstance(value, dict):
+            return {key: extract(item) for key, item in value.items()}
+
+        if isinstance(value, (list, tuple)):
+            return [extract(item) for item in value]
+
+        if not isinstance(value, np.ndarray):
+            return value
+
+        if value.ndim != 1 or value.dtype.kind not in "iuf":
+            return value.tolist()
+
+        dtype, buffer = to_buffer(value)
+
+        array = {
+            "dtype": dtype,
+            "offset": offset[0],
+            "length": len(value),
+        }
+
+        buffers.append(buffer)
+        buffers.append(b"\0" * (-len(buffer) % 8))
+
+        offset[0] += len(buffer) + (-len(buffer) % 8)
+
+        return {"typed_array": array}
+
+    figure = fig.to_plotly_json()
+
+    header = extract(
+        {
+            "data": figure["data"],
+            "layout": figure["layout"],
+            "config": {"responsive": True},
+        }
+    )
+
+    header = pio.json.to_json_plotly(header).encode()
+
+    payload = [
+        struct.pack("<II", len(header), 0),
+        header,
+        b"\0" * (-len(header) % 8),
+    ] + buffers
+
+    return gzip.compress(b"".join(payload), compresslevel=COMPRESSION_LEVEL)
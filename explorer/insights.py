@@ -1,12 +1,28 @@
 import logging
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import logging.handlers
+import pyarrow.compute as pc
+
+from explorer import dataset
+from explorer import patterns
+
+
+APIS = ["MPIIO", "POSIX"]
+
+# Number of time buckets of the OST load
+OST_BUCKETS = 200
+
+# Standard deviations above the other OSTs of a bucket for an OST to be hot
+OST_HOTSPOT_THRESHOLD = 2
 
 
 class insights:
     def __init__(self, df):
         """Initialize the recommendation system."""
         self.df = df
+        self.rank_index = None
         self.configure_log()
 
     def configure_log(self):
@@ -54,82 +70,65 @@ class insights:
                     duration_read = sum(duration_read)
                 time.append(duration_read + duration_write)
 
+    def get_rank_index(self):
+        """Group the rows of the dataframe by rank, built only once."""
+        if self.rank_index is None:
+            self.rank_index = dataset.RankIndex.build(self.df)
+
+        return self.rank_index
+
+    def get_rank_stats(self, api):
+        """
+        Aggregate the operations of an API per rank.
+
+        Returns:
+            Dictionary with the ranks that used the API and, aligned with
+            them, their read count, write count, total size and I/O time
+        """
+        index = self.get_rank_index()
+
+        api_rows = self.df["api"].to_numpy() == api
+        operation = self.df["operation"].to_numpy()
+
+        present = index.count(api_rows) > 0
+
+        stats = {
+            "rank": index.ranks,
+            "read_count": index.count(api_rows & (operation == "read")),
+            "write_count": index.count(api_rows & (operation == "write")),
+            "total_size": index.aggregate(
+                np.where(api_rows, self.df["size"].to_numpy(), 0)
+            ),
+        }
+
+        if "duration" in self.df.columns:
+            stats["time"] = index.aggregate(
+                np.where(api_rows, self.df["duration"].to_numpy(), 0)
+            )
+
+        return {key: values[present] for key, values in stats.items()}
+
+    def rank_zero_flags(self, api):
+        """Check if any other rank issues more bytes, reads or writes than rank 0."""
+        stats = self.get_rank_stats(api)
+
+        zero = stats["rank"] == 0
+        others = ~zero
+
+        flags = []
+        for key in ["total_size", "read_count", "write_count"]:
+            # Rank 0 counts as zero when it did not use the API
+            rank_zero = stats[key][zero].sum()
+
+            flags.append(bool((stats[key][others] > rank_zero).any()))
+
+        return flags
+
     def rank_zero_workload(self):
         message = []
         if not self.df.empty:
-            read_count_mpiio = 0
-            write_count_mpiio = 0
-            total_size_mpiio = 0
-
-            read_count_posix = 0
-            write_count_posix = 0
-            total_size_posix = 0
-
-            break_flag_mpiio = [False, False, False]
-            break_flag_posix = [False, False, False]
-
-            unique_val = self.df["rank"].unique().tolist()
-
-            for val in unique_val:
-                if val == 0:
-                    temp_df = self.df.loc[self.df["rank"] == val]
-                    temp_df = temp_df.loc[temp_df["api"] == "MPIIO"]
-                    if not temp_df.empty:
-                        total_size_mpiio = temp_df["size"].sum()
-                        read_count_mpiio = len(
-                            temp_df.loc[temp_df["operation"] == "read"]
-                        )
-                        write_count_mpiio = len(
-                            temp_df.loc[temp_df["operation"] == "write"]
-                        )
-
-                    temp_df = self.df.loc[self.df["rank"] == val]
-                    temp_df = temp_df.loc[temp_df["api"] == "POSIX"]
-                    if not temp_df.empty:
-                        total_size_posix = temp_df["size"].sum()
-                        read_count_posix = len(
-                            temp_df.loc[temp_df["operation"] == "read"]
-                        )
-                        write_count_posix = len(
-                            temp_df.loc[temp_df["operation"] == "write"]
-                        )
-                else:
-                    if all(break_flag_posix) and all(break_flag_mpiio):
-                        break
-                    else:
-                        if not all(break_flag_mpiio):
-                            temp_df = self.df.loc[self.df["rank"] == val]
-                            temp_df = temp_df.loc[temp_df["api"] == "MPIIO"]
-                            if not temp_df.empty:
-                                if temp_df["size"].sum() > total_size_mpiio:
-                                    break_flag_mpiio[0] = True
-                                if (
-                                    len(temp_df.loc[temp_df["operation"] == "read"])
-                                    > read_count_mpiio
-                                ):
-                                    break_flag_mpiio[1] = True
-                                if (
-                                    len(temp_df.loc[temp_df["operation"] == "write"])
-                                    > write_count_mpiio
-                                ):
-                                    break_flag_mpiio[2] = True
-
-                        if not all(break_flag_posix):
-                            temp_df = self.df.loc[self.df["rank"] == val]
-                            temp_df = temp_df.loc[temp_df["api"] == "POSIX"]
-                            if not temp_df.empty:
-                                if temp_df["size"].sum() > total_size_posix:
-                                    break_flag_posix[0] = True
-                                if (
-                                    len(temp_df.loc[temp_df["operation"] == "read"])
-                                    > read_count_posix
-                                ):
-                                    break_flag_posix[1] = True
-                                if (
-                                    len(temp_df.loc[temp_df["operation"] == "write"])
-                                    > write_count_posix
-                                ):
-                                    break_flag_posix[2] = True
+            break_flag_mpiio = self.rank_zero_flags("MPIIO")
+            break_flag_posix = self.rank_zero_flags("POSIX")
 
             if (
                 break_flag_mpiio[0] is False
@@ -166,153 +165,35 @@ class insights:
     def unbalanced_workloads(self):
         ranks_dict = {}
 
-        df_posix = self.df[self.df["api"] == "POSIX"]
-        if not df_posix.empty:
-            read_count_posix = []
-            write_count_posix = []
-            total_size = []
-            time = []
-
-            unique_val = df_posix["rank"].unique().tolist()
-
-            for val in unique_val:
-                temp_df = df_posix.loc[df_posix["rank"] == val]
-                if not temp_df.empty:
-                    total_size.append(temp_df["size"].sum())
-                    read_count_posix.append(
-                        len(temp_df.loc[temp_df["operation"] == "read"])
-                    )
-                    write_count_posix.append(
-                        len(temp_df.loc[temp_df["operation"] == "write"])
-                    )
-                    time.append(temp_df["duration"].sum())
-
-            mean_read = sum(read_count_posix) / len(read_count_posix)
-            variance = sum([((x - mean_read) ** 2) for x in read_count_posix]) / len(
-                read_count_posix
-            )
-            std_dev_read = variance**0.5
-
-            mean_write = sum(write_count_posix) / len(write_count_posix)
-            variance = sum([((x - mean_write) ** 2) for x in write_count_posix]) / len(
-                write_count_posix
-            )
-            std_dev_write = variance**0.5
-
-            mean_size = sum(total_size) / len(total_size)
-            variance = sum([((x - mean_size) ** 2) for x in total_size]) / len(
-                total_size
-            )
-            std_dev_size = variance**0.5
-
-            mean_time = sum(time) / len(time)
-            variance = sum([((x - mean_time) ** 2) for x in time]) / len(time)
-            std_dev_time = variance**0.5
-
-            threshold = 1
-
-            rank_read = []
-            for i in range(len(read_count_posix)):
-                if read_count_posix[i] > mean_read + threshold * std_dev_read:
-                    rank_read.append(i)
-
-            rank_write = []
-            for i in range(len(write_count_posix)):
-                if write_count_posix[i] > mean_write + threshold * std_dev_write:
-                    rank_write.append(i)
-
-            rank_size = []
-            for i in range(len(total_size)):
-                if total_size[i] > mean_size + threshold * std_dev_size:
-                    rank_size.append(i)
-
-            rank_time = []
-            for i in range(len(time)):
-                if time[i] > mean_time + threshold * std_dev_time:
-                    rank_time.append(i)
-
-            common_ranks = set(rank_read).intersection(set(rank_write))
-            common_ranks = common_ranks.intersection(set(rank_size))
-            common_ranks = common_ranks.intersection(set(rank_time))
-
-            common_ranks = list(common_ranks)
-
-            if common_ranks:
-                ranks_dict["POSIX"] = common_ranks
-
-        df_mpiio = self.df[self.df["api"] == "MPIIO"]
-        if not df_mpiio.empty:
-            read_count_mpiio = []
-            write_count_mpiio = []
-            total_size = []
-            time = []
-
-            unique_val = df_mpiio["rank"].unique().tolist()
-
-            for val in unique_val:
-                temp_df = df_mpiio.loc[df_mpiio["rank"] == val]
-                if not temp_df.empty:
-                    total_size.append(temp_df["size"].sum())
-                    read_count_mpiio.append(
-                        len(temp_df.loc[temp_df["operation"] == "read"])
-                    )
-                    write_count_mpiio.append(
-                        len(temp_df.loc[temp_df["operation"] == "write"])
-                    )
-                    time.append(temp_df["duration"].sum())
-
-            mean_read = sum(read_count_mpiio) / len(read_count_mpiio)
-            variance = sum([((x - mean_read) ** 2) for x in read_count_mpiio]) / len(
-                read_count_mpiio
-            )
-            std_dev_read = variance**0.5
-
-            mean_write = sum(write_count_mpiio) / len(write_count_mpiio)
-            variance = sum([((x - mean_write) ** 2) for x in write_count_mpiio]) / len(
-                write_count_mpiio
-            )
-            std_dev_write = variance**0.5
-
-            mean_size = sum(total_size) / len(total_size)
-            variance = sum([((x - mean_size) ** 2) for x in total_size]) / len(
-                total_size
-            )
-            std_dev_size = variance**0.5
+        if self.df.empty:
+            return ranks_dict
 
-            mean_time = sum(time) / len(time)
-            variance = sum([((x - mean_time) ** 2) for x in time]) / len(time)
-            std_dev_time = variance**0.5
+        threshold = 1
 
-            threshold = 1
+        for api in ["POSIX", "MPIIO"]:
+            stats = self.get_rank_stats(api)
 
-            rank_read = []
-            for i in range(len(read_count_mpiio)):
-                if read_count_mpiio[i] > mean_read + threshold * std_dev_read:
-                    rank_read.append(i)
+            if len(stats["rank"]) == 0:
+                continue
 
-            rank_write = []
-            for i in range(len(write_count_mpiio)):
-                if write_count_mpiio[i] > mean_write + threshold * std_dev_write:
-                    rank_write.append(i)
+            common_ranks = None
+            for key in ["read_count", "write_count", "total_size", "time"]:
+                values = stats[key]
 
-            rank_size = []
-            for i in range(len(total_size)):
-                if total_size[i] > mean_size + threshold * std_dev_size:
-                    rank_size.append(i)
+                mean = values.mean()
+                std_dev = values.std()
 
-            rank_time = []
-            for i in range(len(time)):
-                if time[i] > mean_time + threshold * std_dev_time:
-                    rank_time.append(i)
+                ranks = set(stats["rank"][values > mean + threshold * std_dev].tolist())
 
-            common_ranks = set(rank_read).intersection(set(rank_write))
-            common_ranks = common_ranks.intersection(set(rank_size))
-            common_ranks = common_ranks.intersection(set(rank_time))
+                if common_ranks is None:
+                    common_ranks = ranks
+                else:
+                    common_ranks = common_ranks.intersection(ranks)
 
-            common_ranks = list(common_ranks)
+            common_ranks = sorted(common_ranks)
 
             if common_ranks:
-                ranks_dict["MPIIO"] = common_ranks
+                ranks_dict[api] = common_ranks
 
         return ranks_dict
 
@@ -399,3 +280,153 @@ class insights:
             ].round(4)
 
         return io_phases_with_rank_posix, io_phases_with_rank_mpiio
+
+    def get_ost_entries(self):
+        """
+        Flatten the operations into one entry for each OST they touch.
+
+        Returns:
+            tuple with the row of each entry and its OST
+        """
+        osts = pa.array(self.df["osts"], type=pa.list_(pa.int64()))
+
+        rows = pc.list_parent_indices(osts).to_numpy()
+        values = pc.list_flatten(osts).to_numpy()
+
+        return rows, values
+
+    def ost_load(self, buckets=OST_BUCKETS):
+        """
+        Spread the bytes and the requests of each OST over time buckets.
+
+        The bytes of an operation are split evenly among its OSTs and spread
+        over its duration at a constant rate, so each bucket gets the share of
+        the operation it overlaps. The concurrency of a bucket is the average
+        number of requests in flight on the OST during it.
+
+        Arguments:
+            buckets: number of time buckets between the first start and the last end
+
+        Returns:
+            Dictionary with the OSTs, the bucket edges, and, for each API that
+            touched an OST, its bytes and concurrency as OSTs x buckets arrays
+        """
+        rows, values = self.get_ost_entries()
+
+        start = self.df["start"].to_numpy(dtype=np.float64)
+        end = self.df["end"].to_numpy(dtype=np.float64)
+
+        edges = np.linspace(start.min(), end.max(), buckets + 1)
+        width = (edges[-1] - edges[0]) / buckets or 1.0
+
+        osts, ost = np.unique(values, return_inverse=True)
+
+        api = pd.Categorical(self.df["api"], categories=APIS).codes[rows]
+        known = api >= 0
+
+        rows = rows[known]
+
+        # One row of buckets for each (API, OST), with a last column for the difference array
+        cell = (api[known] * len(osts) + ost[known]) * (buckets + 1)
+
+        start = start[rows]
+        end = end[rows]
+        duration = end - start
+
+        share = self.df["size"].to_numpy(dtype=np.float64) / np.maximum(
+            np.bincount(rows, minlength=len(self.df)), 1
+        )
+
+        first = np.clip(((start - edges[0]) / width).astype(np.int64), 0, buckets - 1)
+        last = np.clip(((end - edges[0]) / width).astype(np.int64), 0, buckets - 1)
+
+        load = {}
+
+        for name, total in [("bytes", share[rows]), ("concurrency", duration / width)]:
+            rate = np.divide(total, duration, out=np.zeros_like(total), where=duration > 0)
+
+            cells = np.zeros(len(APIS) * len(osts) * (buckets + 1))
+
+            # Operations inside a single bucket
+            inside = first == last
+            np.add.at(cells, cell[inside] + first[inside], total[inside])
+
+            # The partial first and last buckets, and the whole buckets in between
+            across = ~inside
+            np.add.at(
+                cells,
+                cell[across] + first[across],
+                rate[across] * (edges[0] + (first[across] + 1) * width - start[across]),
+            )
+            np.add.at(
+                cells,
+                cell[across] + last[across],
+                rate[across] * (end[across] - edges[0] - last[across] * width),
+            )
+
+            whole = np.zeros_like(cells)
+            np.add.at(whole, cell[across] + first[across] + 1, rate[across] * width)
+            np.add.at(whole, cell[across] + last[across], -rate[across] * width)
+
+            cells = cells.reshape(len(APIS), len(osts), buckets + 1)
+            whole = np.cumsum(whole.reshape(len(APIS), len(osts), buckets + 1), axis=2)
+
+            load[name] = (cells + whole)[:, :, :buckets]
+
+        present = np.bincount(api[known], minlength=len(APIS)) > 0
+
+        return {
+            "osts": osts,
+            "edges": edges,
+            "apis": {
+                api_name: {
+                    "bytes": load["bytes"][index],
+                    "concurrency": load["concurrency"][index],
+                }
+                for index, api_name in enumerate(APIS)
+                if present[index]
+            },
+        }
+
+    def ost_hotspots(self, load, threshold=OST_HOTSPOT_THRESHOLD):
+        """
+        Find when an OST has many more requests in flight than the others.
+
+        An OST is hot in a bucket when its concurrency is above both the other
+        OSTs in that bucket and the busy buckets of all OSTs, by more than
+        threshold standard deviations of each.
+
+        Arguments:
+            load: OST load, as returned by ost_load
+
+        Returns:
+            Dictionary with, for each API, the OSTs x buckets boolean array of hot buckets
+        """
+        hotspots = {}
+
+        for api, arrays in load["apis"].items():
+            values = arrays["concurrency"]
+
+            mean = values.mean(axis=0)
+            std_dev = values.std(axis=0)
+
+            busy = values[values > 0]
+
+            hotspots[api] = (
+                (values > mean + threshold * std_dev)
+                & (values > busy.mean() + threshold * busy.std())
+                & (std_dev > 0)
+            )
+
+        return hotspots
+
+    def access_patterns(self):
+        """
+        Classify the access pattern of each rank, see patterns.classify.
+
+        Returns:
+            tuple with the access pattern of each API and rank, and of each API
+        """
+        ranks = patterns.classify(self.df)
+
+        return ranks, patterns.summarize(ranks)
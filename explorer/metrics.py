@@ -0,0 +1,298 @@
+"""
+Per-stage instrumentation of the explorer pipeline.
+
+Each stage records its wall time, CPU time, peak resident memory and, when the
+stage knows how many rows it handled, its throughput. The plot scripts run in
+child processes: they find the file to report their own stages in an
+environment variable, and the parent attaches the stages of its children to
+the stage that launched them.
+"""
+
+import os
+import sys
+import json
+import time
+import contextlib
+
+from explorer import profiling
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, memory is then not reported
+    resource = None
+
+
+ENVIRONMENT = "DXT_EXPLORER_METRICS"
+
+
+def get_peak_rss(who="self"):
+    """Peak resident memory in bytes of this process or of its largest child."""
+    if who == "self" and os.path.exists("/proc/self/status"):
+        # Unlike getrusage, the high water mark is reset when a child calls exec
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+
+    if resource is None:
+        return None
+
+    usage = resource.getrusage(
+        resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN
+    )
+
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == "darwin":
+        return usage.ru_maxrss
+
+    return usage.ru_maxrss * 1024
+
+
+def reset_peak_rss():
+    """Reset the peak resident memory of this process, only possible on Linux."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+
+    return True
+
+
+class PeakRSS:
+    """
+    Peak resident memory of this process while a block of code runs.
+
+    The peak is reset when the block starts, so it does not include the memory
+    used by the earlier stages. When the reset is not possible, the peak is the
+    one of the whole process so far, and scope is "process" instead of "stage".
+    """
+
+    # Peaks of the blocks still running, a nested block resets the peak of the
+    # blocks around it and keeps it here
+    running = []
+
+    def __enter__(self):
+        if PeakRSS.running:
+            PeakRSS.running[-1] = max(PeakRSS.running[-1], get_peak_rss() or 0)
+
+        self.reset = reset_peak_rss()
+        PeakRSS.running.append(0)
+
+        return self
+
+    def __exit__(self, *exception):
+        self.peak = get_peak_rss()
+        self.scope = "stage" if self.reset else "process"
+
+        inner = PeakRSS.running.pop()
+
+        if self.reset and self.peak is not None:
+            self.peak = max(self.peak, inner)
+
+            if PeakRSS.running:
+                PeakRSS.running[-1] = max(PeakRSS.running[-1], self.peak)
+
+
+def get_cpu_time():
+    """CPU time (user and system) of this process and of its finished children."""
+    times = os.times()
+
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class Metrics:
+    """Timing, memory and throughput of the stages of a run."""
+
+    def __init__(self, output=None, profiler=None):
+        """
+        Initialize the metrics.
+
+        Arguments:
+            output: file where each finished stage is appended as a JSON line,
+                used by the child processes to report to the parent
+            profiler: profiler of the stages, if profiling was requested
+        """
+        self.output = output
+        self.profiler = profiler
+        self.children = None
+        self.offset = 0
+        self.stages = []
+
+    @classmethod
+    def from_environment(cls):
+        """Create the metrics of a child process launched by the explorer."""
+        return cls(
+            os.environ.get(ENVIRONMENT), profiling.Profiler.from_environment()
+        )
+
+    def collect_children(self, path):
+        """Ask the child processes launched from now on to report into a file."""
+        self.children = path
+        self.offset = 0
+
+        # Stages left behind by an interrupted run
+        if os.path.exists(path):
+            os.remove(path)
+
+        os.environ[ENVIRONMENT] = path
+
+    def read_children(self):
+        """Read the stages reported by the child processes since the last call."""
+        if self.children is None or not os.path.exists(self.children):
+            return []
+
+        with open(self.children) as f:
+            f.seek(self.offset)
+            lines = f.readlines()
+            self.offset = f.tell()
+
+        return [json.loads(line) for line in lines if line.strip()]
+
+    @contextlib.contextmanager
+    def stage(self, name, file_id=None):
+        """
+        Measure a stage of the pipeline.
+
+        The caller may set the number of rows handled by the stage in the
+        yielded dictionary, to report the throughput of the stage.
+        """
+        record = {"stage": name, "file_id": None if file_id is None else str(file_id)}
+        record["rows"] = None
+
+        wall_start = time.perf_counter()
+        cpu_start = get_cpu_time()
+
+        if self.profiler is not None:
+            profile = self.profiler.stage(name, file_id)
+        else:
+            profile = contextlib.nullcontext()
+
+        memory = PeakRSS()
+
+        try:
+            with memory, profile:
+                yield record
+        finally:
+            wall_time = time.perf_counter() - wall_start
+
+            record["wall_time"] = round(wall_time, 6)
+            record["cpu_time"] = round(get_cpu_time() - cpu_start, 6)
+            record["peak_rss"] = memory.peak
+            record["peak_rss_scope"] = memory.scope
+            record["rows_per_second"] = None
+
+            if record["rows"] is not None and wall_time > 0:
+                record["rows_per_second"] = round(record["rows"] / wall_time, 2)
+
+            children = self.read_children()
+            if children:
+                record["peak_rss_children"] = get_peak_rss("children")
+                record["children"] = children
+
+            self.stages.append(record)
+
+            if self.output:
+                with open(self.output, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+
+    def totals(self):
+        """Aggregate the stages, and the stages of the children, by name."""
+        totals = {}
+
+        def add(stages, prefix):
+            for record in stages:
+                name = prefix + record["stage"]
+
+                if name not in totals:
+                    totals[name] = {
+                        "count": 0,
+                        "wall_time": 0.0,
+                        "cpu_time": 0.0,
+                        "rows": 0,
+                        "peak_rss": 0,
+                        "peak_rss_scope": "stage",
+                    }
+
+                total = totals[name]
+
+                total["count"] += 1
+                total["wall_time"] += record["wall_time"]
+                total["cpu_time"] += record["cpu_time"]
+                total["rows"] += record["rows"] or 0
+                total["peak_rss"] = max(total["peak_rss"], record["peak_rss"] or 0)
+
+                if record.get("peak_rss_scope", "process") == "process":
+                    total["peak_rss_scope"] = "process"
+
+                add(record.get("children", []), name + " > ")
+
+        add(self.stages, "")
+
+        for total in totals.values():
+            total["wall_time"] = round(total["wall_time"], 6)
+            total["cpu_time"] = round(total["cpu_time"], 6)
+
+        return totals
+
+    def write(self, output_file, **information):
+        """Save the stages and their totals into a JSON report."""
+        report = dict(information)
+        report["stages"] = self.stages
+        report["totals"] = self.totals()
+
+        with open(output_file, "w") as f:
+            json.dump(report, f, indent=2)
+
+        if self.children is not None and os.path.exists(self.children):
+            os.remove(self.children)
+
+    def to_html(self):
+        """Render the totals of each stage as the table shown in the index page."""
+        rows = []
+        for name, total in sorted(
+            self.totals().items(), key=lambda item: item[1]["wall_time"], reverse=True
+        ):
+            rows.append(
+                """
+                <tr>
+                    <td class='name'>{}</td>
+                    <td>{}</td>
+                    <td>{:.4f}</td>
+                    <td>{:.4f}</td>
+                    <td>{:.1f}{}</td>
+                    <td>{}</td>
+                    <td>{}</td>
+                </tr>
+            """.format(
+                    name,
+                    total["count"],
+                    total["wall_time"],
+                    total["cpu_time"],
+                    total["peak_rss"] / 1024 ** 2,
+                    " (process)" if total["peak_rss_scope"] == "process" else "",
+                    total["rows"],
+                    "{:.0f}".format(total["rows"] / total["wall_time"])
+                    if total["rows"] and total["wall_time"]
+                    else "-",
+                )
+            )
+
+        return """
+        <h2>RUN METRICS</h2>
+        <table>
+            <tr>
+                <th>STAGE</th>
+                <th>COUNT</th>
+                <th>WALL TIME (s)</th>
+                <th>CPU TIME (s)</th>
+                <th>PEAK RSS (MB)</th>
+                <th>ROWS</th>
+                <th>ROWS/s</th>
+            </tr>
+            {}
+        </table>
+    """.format(
+            "".join(rows)
+        )
@@ -0,0 +1,250 @@
+"""
+Classify the access pattern of each rank of a file.
+
+The operations of each file, API and rank are taken in time order, reads and
+writes together, and each one is classified by where it starts relative to the
+previous one:
+    contiguous  it starts where the previous one ended
+    strided     it skips ahead of the previous one by the same distance as the
+                operation before or after it does, as in a fixed-stride run
+    backward    it ends where the previous one started, or moves back by the
+                same distance as the operation before or after it does
+    random      any other jump
+The first operation of a rank takes the class of the second one. The share of
+each pattern is weighted by the bytes of the operations, so a few small jumps do
+not outweigh large contiguous transfers.
+
+A single sort groups the operations, everything else is linear, so the
+classification stays O(n log n) on traces with hundreds of millions of
+operations.
+"""
+
+import html
+import numpy as np
+import pandas as pd
+
+
+PATTERNS = ["contiguous", "strided", "backward", "random"]
+
+COLUMNS = ["file_id", "api", "rank", "operations", "bytes"] + PATTERNS + ["pattern"]
+
+# Share of the bytes accessed out of order (backward or random) for the
+# access pattern of an API to be reported as random
+RANDOM_THRESHOLD = 0.5
+
+
+def classify(df):
+    """
+    Classify the access pattern of each file, API and rank.
+
+    Arguments:
+        df: dataframe with the operations of one or more files
+
+    Returns:
+        dataframe with, for each file, API and rank, the number of operations,
+        their bytes, the share of the bytes of each pattern, and the pattern
+        with the largest share
+    """
+    if df.empty:
+        return pd.DataFrame(columns=COLUMNS)
+
+    api = pd.Categorical(df["api"])
+
+    file_id = df["file_id"].to_numpy(dtype=np.uint64)
+    rank = df["rank"].to_numpy(dtype=np.int64)
+    start = df["start"].to_numpy(dtype=np.float64)
+
+    order = np.lexsort((start, rank, api.codes, file_id))
+
+    file_id = file_id[order]
+    api_codes = api.codes[order]
+
+    rank = rank[order]
+    offset = df["offset"].to_numpy(dtype=np.int64)[order]
+    size = df["size"].to_numpy(dtype=np.int64)[order]
+
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (file_id[1:] != file_id[:-1]) | (np.diff(api_codes) != 0) | (np.diff(rank) != 0)
+
+    # Jump of each operation from the previous one, meaningless for the first of each group
+    stride = np.diff(offset)
+    gap = offset[1:] - (offset[:-1] + size[:-1])
+
+    follows = ~first[1:]
+
+    # Strides repeated by the operation before or after, inside the same group
+    repeated = np.zeros(len(stride), dtype=bool)
+    same = (stride[1:] == stride[:-1]) & follows[1:] & follows[:-1]
+    repeated[1:] |= same
+    repeated[:-1] |= same
+
+    kind = np.full(len(stride), PATTERNS.index("random"), dtype=np.int8)
+    kind[(gap > 0) & repeated] = PATTERNS.index("strided")
+    kind[(stride < 0) & (repeated | (offset[1:] + size[1:] == offset[:-1]))] = PATTERNS.index("backward")
+    kind[gap == 0] = PATTERNS.index("contiguous")
+
+    pattern = np.empty(len(order), dtype=np.int8)
+    pattern[1:] = kind
+
+    # The first operation of a group takes the class of the next one, or is contiguous when alone
+    alone = first & ~np.append(follows, False)
+    pattern[first] = np.append(kind, 0)[np.flatnonzero(first)]
+    pattern[alone] = PATTERNS.index("contiguous")
+
+    group = np.cumsum(first) - 1
+    groups = group[-1] + 1
+
+    cells = group * len(PATTERNS) + pattern
+
+    shares = np.bincount(cells, weights=size, minlength=groups * len(PATTERNS))
+    counts = np.bincount(cells, minlength=groups * len(PATTERNS))
+
+    shares = shares.reshape(groups, len(PATTERNS))
+    counts = counts.reshape(groups, len(PATTERNS))
+
+    total_bytes = shares.sum(axis=1)
+    operations = counts.sum(axis=1)
+
+    # Groups that moved no bytes are weighted by their operations instead
+    shares = np.where(
+        total_bytes[:, None] > 0,
+        shares / np.maximum(total_bytes, 1)[:, None],
+        counts / operations[:, None],
+    )
+
+    heads = np.flatnonzero(first)
+
+    return pd.DataFrame(
+        {
+            "file_id": file_id[heads],
+            "api": np.asarray(api.categories)[api_codes[heads]],
+            "rank": rank[heads],
+            "operations": operations,
+            "bytes": total_bytes.astype(np.int64),
+            **{name: shares[:, index].round(4) for index, name in enumerate(PATTERNS)},
+            "pattern": np.asarray(PATTERNS)[shares.argmax(axis=1)],
+        },
+        columns=COLUMNS,
+    )
+
+
+def summarize(ranks):
+    """
+    Combine the access patterns of the ranks into one for each API.
+
+    Arguments:
+        ranks: dataframe returned by classify
+
+    Returns:
+        dictionary with, for each API, its operations, bytes, the share of the
+        bytes of each pattern, the pattern with the largest share, and the
+        ranks whose pattern is mostly backward or random
+    """
+    apis = {}
+
+    for api, df in ranks.groupby("api", sort=True):
+        total_bytes = int(df["bytes"].sum())
+
+        if total_bytes > 0:
+            weights = df["bytes"].to_numpy(dtype=np.float64) / total_bytes
+        else:
+            weights = df["operations"].to_numpy(dtype=np.float64) / df["operations"].sum()
+
+        shares = {
+            name: round(float((df[name].to_numpy() * weights).sum()), 4)
+            for name in PATTERNS
+        }
+
+        apis[api] = {
+            "operations": int(df["operations"].sum()),
+            "bytes": total_bytes,
+            "shares": shares,
+            "pattern": max(PATTERNS, key=lambda name: shares[name]),
+            "random_ranks": sorted(
+                set(df.loc[df["pattern"].isin(["backward", "random"]), "rank"].tolist())
+            ),
+        }
+
+    return apis
+
+
+def is_random(summary):
+    """Check if most of the bytes of an API were accessed out of order."""
+    return summary["shares"]["backward"] + summary["shares"]["random"] > RANDOM_THRESHOLD
+
+
+def to_html(ranks):
+    """Render the access patterns of the ranks as the table shown below the spatiality plot."""
+    rows = []
+
+    for row in ranks.itertuples(index=False):
+        rows.append(
+            """
+            <tr>
+                <td class="name">{}</td>
+                <td>{}</td>
+                <td>{}</td>
+                <td>{}</td>
+                {}
+                <td class="name">{}</td>
+            </tr>
+        """.format(
+                html.escape(row.api),
+                row.rank,
+                row.operations,
+                row.bytes,
+                "".join(
+                    "<td>{:.2%}</td>".format(getattr(row, name)) for name in PATTERNS
+                ),
+                row.pattern,
+            )
+        )
+
+    return """
+    <style>
+        table.patterns {{
+            border-collapse: collapse;
+            font-family: 'IBM Plex Mono', monospace;
+            font-size: 10px;
+            margin: 5px 20px 14px;
+        }}
+
+        table.patterns th {{
+            background: #395393;
+            color: #fff;
+            padding: 3px 10px;
+        }}
+
+        table.patterns td {{
+            background: #efefef;
+            border-bottom: 1px solid #fff;
+            padding: 3px 10px;
+            text-align: right;
+        }}
+
+        table.patterns td.name {{
+            text-align: left;
+        }}
+
+        h2.patterns {{
+            font-family: 'IBM Plex Mono', monospace;
+            font-size: 12px;
+            margin: 14px 20px 5px;
+        }}
+    </style>
+    <h2 class="patterns">ACCESS PATTERN OF EACH RANK</h2>
+    <table class="patterns">
+        <tr>
+            <th>API</th>
+            <th>RANK</th>
+            <th>OPERATIONS</th>
+            <th>BYTES</th>
+            {}
+            <th>PATTERN</th>
+        </tr>
+        {}
+    </table>
+""".format(
+        "".join("<th>{}</th>".format(name.upper()) for name in PATTERNS),
+        "".join(rows),
+    )
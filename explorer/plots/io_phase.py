@@ -1,10 +1,9 @@
-import os
-import explorer
 import plotly.express as px
-import pyarrow.feather as feather
 
+from explorer import figure
+from explorer import dataset
+from explorer import metrics
 from optparse import OptionParser
-from PIL import Image
 
 
 parser = OptionParser()
@@ -19,13 +18,13 @@ parser.add_option(
 parser.add_option(
     "-s",
     "--start",
-    type="int",
+    type="float",
     default=None,
     help="Mark trace start time",
     metavar="start",
 )
 parser.add_option(
-    "-e", "--end", type="int", default=None, help="Mark trace end time", metavar="end"
+    "-e", "--end", type="float", default=None, help="Mark trace end time", metavar="end"
 )
 parser.add_option(
     "-n",
@@ -59,11 +58,25 @@ parser.add_option(
     help="Set the identifier of the original file captured by Darshan DXT",
     metavar="identifier",
 )
+parser.add_option(
+    "--sidecar",
+    action="store_true",
+    default=False,
+    help="Save the plot data in a compressed file loaded by the page",
+)
 
 (options, args) = parser.parse_args()
 options = vars(options)
 
-df = feather.read_feather(options["file"])
+# I/O phases are not bound to a single rank, only the runtime is limited
+window = dataset.Window(options["start"], options["end"])
+
+run_metrics = metrics.Metrics.from_environment()
+
+with run_metrics.stage("load") as stage:
+    df = dataset.read(options["file"], window)
+
+    stage["rows"] = len(df)
 
 if df.empty:
     quit()
@@ -177,13 +190,10 @@ fig.update_layout(
     xaxis_rangeslider_thickness=0.04,
 )
 
-path = os.path.abspath(explorer.__file__)
-path = path.split("__init__.py")[0]
-pyLogo = Image.open(path + "plots/dxt-explorer.png")
 
 fig.add_layout_image(
     dict(
-        source=pyLogo,
+        source="dxt-explorer.png",
         xref="paper",
         yref="paper",
         x=0,
@@ -194,4 +204,7 @@ fig.add_layout_image(
         yanchor="top",
     )
 )
-fig.write_html(options["output"], include_plotlyjs="cdn", full_html=False)
+with run_metrics.stage("render") as stage:
+    figure.write_html(fig, options["output"], full_html=False, sidecar=options["sidecar"])
+
+    stage["rows"] = len(df)
@@ -2,16 +2,18 @@ import os
 import sys
 import json
 import shlex
-import explorer
 import subprocess
 import pandas as pd
 import plotly.express as px
 import pyarrow.feather as feather
 import plotly.graph_objects as go
 
-from PIL import Image
 from bs4 import BeautifulSoup
+from explorer import figure
+from explorer import dataset
+from explorer import metrics
 from explorer import insights
+from explorer import patterns
 from optparse import OptionParser
 
 
@@ -188,6 +190,14 @@ parser.add_option(
     help="Determine if we have collective metadata operations",
     metavar="collective_metadata",
 )
+parser.add_option(
+    "-4",
+    "--access_patterns",
+    type="string",
+    default="False",
+    help="Determine if the ranks access the file backward or at random",
+    metavar="access_patterns",
+)
 parser.add_option(
     "-o",
     "--output",
@@ -220,33 +230,37 @@ parser.add_option(
     help="Runtime of the graph",
     metavar="runtime",
 )
+parser.add_option(
+    "--sidecar",
+    action="store_true",
+    default=False,
+    help="Save the plot data in a compressed file loaded by the page",
+)
 
 
 (options, args) = parser.parse_args()
 options = vars(options)
 
-df = feather.read_feather(options["file1"])
-if df.empty:
-    quit()
+window = dataset.Window.from_options(options)
 
-df["osts"].fillna(value="-", inplace=True)
-df.drop(df.tail(2).index, inplace=True)
+run_metrics = metrics.Metrics.from_environment()
 
-if not options["graph_type"]:
-    if options["start"] is not None:
-        df = df[df["start"] >= options["start"]]
+with run_metrics.stage("load") as stage:
+    if options["graph_type"]:
+        df = dataset.read(options["file1"])
+    else:
+        df = dataset.read(options["file1"], window)
 
-    if options["end"] is not None:
-        df = df[df["end"] <= options["end"]]
+    stage["rows"] = len(df)
 
-    if options["from"] is not None:
-        df = df[df["rank"] >= options["from"]]
+if df.empty:
+    quit()
 
-    if options["to"] is not None:
-        df = df[df["rank"] <= options["to"]]
+df["osts"].fillna(value="-", inplace=True)
+df.drop(df.tail(2).index, inplace=True)
 
-    if len(df.index) == 0:
-        quit()
+if len(df.index) == 0:
+    quit()
 
 df["duration"] = df["end"] - df["start"]
 df["duration"] = df["duration"].round(4)
@@ -288,7 +302,10 @@ if options["rank_zero_workload"] == "True":
     if options["from"] is not None and options["from"] > 0:
         options["rank_zero_workload"] = "False"
     else:
-        messages = diagnosis.rank_zero_workload()
+        with run_metrics.stage("rank zero workload") as stage:
+            messages = diagnosis.rank_zero_workload()
+
+            stage["rows"] = len(df)
         isPOSIX_rank0 = False
         isMPIIO_rank0 = False
         for message in messages:
@@ -347,7 +364,10 @@ if options["rank_zero_workload"] == "True":
 bottleneck2 = pd.DataFrame()
 if options["unbalanced_workload"] == "True":
     any_bottleneck = True
-    ranks = diagnosis.unbalanced_workloads()
+    with run_metrics.stage("unbalanced workloads") as stage:
+        ranks = diagnosis.unbalanced_workloads()
+
+        stage["rows"] = len(df)
 
     isPOSIX = False
     isMPIIO = False
@@ -439,15 +459,49 @@ if options["unbalanced_workload"] == "True":
 
             dxt_issues.append(messages)
 
+# Access patterns
+if options["access_patterns"] == "True":
+    with run_metrics.stage("access patterns") as stage:
+        _, access_patterns = diagnosis.access_patterns()
+
+        stage["rows"] = len(df)
+
+    random_apis = []
+    for api, summary in access_patterns.items():
+        if patterns.is_random(summary):
+            random_apis.append(
+                "{} ({:.0%} of the bytes, {} ranks)".format(
+                    api,
+                    summary["shares"]["backward"] + summary["shares"]["random"],
+                    len(summary["random_ranks"]),
+                )
+            )
+
+    if random_apis:
+        messages = {
+            "code": "D03",
+            "level": 1,
+            "issue": "Detected random access patterns in " + " and ".join(random_apis),
+            "recommendations": [
+                "Consider issuing the requests of each rank in offset order, or aggregating them with MPI-IO collective operations",
+                "Consider reorganizing the data layout in the file to match how the ranks access it",
+            ],
+        }
+
+        dxt_issues.append(messages)
+
 my_shapes = []
 # Bottleneck 3
 bottleneck3 = pd.DataFrame()
 if options["stragglers"] == "True":
     any_bottleneck = True
     df_phases = feather.read_feather(options["file2"])
-    io_phases_with_rank_posix, io_phases_with_rank_mpiio = diagnosis.stragglers(
-        df_phases
-    )
+    with run_metrics.stage("stragglers") as stage:
+        io_phases_with_rank_posix, io_phases_with_rank_mpiio = diagnosis.stragglers(
+            df_phases
+        )
+
+        stage["rows"] = len(df)
 
     if options["start"] is not None:
         io_phases_with_rank_posix = io_phases_with_rank_posix[
@@ -707,12 +761,9 @@ fig.add_shape(
     col="all",
 )
 
-path = os.path.abspath(explorer.__file__)
-path = path.split("__init__.py")[0]
-pyLogo = Image.open(path + "plots/dxt-explorer.png")
 fig.add_layout_image(
     dict(
-        source=pyLogo,
+        source="dxt-explorer.png",
         xref="paper",
         yref="paper",
         x=0,
@@ -868,7 +919,10 @@ if any_bottleneck:
         ]
     )
 
-fig.write_html(options["output"])
+with run_metrics.stage("render") as stage:
+    figure.write_html(fig, options["output"], sidecar=options["sidecar"])
+
+    stage["rows"] = len(df)
 
 json_data = {}
 json_data["dxt"] = dxt_issues
@@ -887,8 +941,9 @@ command = "drishti --html --light --size {} --json {} {}.darshan".format(
     size, json_file_path, file
 )
 args = shlex.split(command)
-s = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-sOutput, sError = s.communicate()
+with run_metrics.stage("drishti"):
+    s = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    sOutput, sError = s.communicate()
 
 if s.returncode == 0:
     drishti_output = open(file + ".drishti", "w")
@@ -0,0 +1,241 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from plotly.subplots import make_subplots
+
+from explorer import figure
+from explorer import dataset
+from explorer import metrics
+from explorer import insights
+from optparse import OptionParser
+
+
+parser = OptionParser()
+parser.add_option(
+    "-f",
+    "--file",
+    type="string",
+    default=None,
+    help="DXT CSV file name",
+    metavar="FILE",
+)
+parser.add_option(
+    "-s",
+    "--start",
+    type="float",
+    default=None,
+    help="Mark trace start time",
+    metavar="start",
+)
+parser.add_option(
+    "-e", "--end", type="float", default=None, help="Mark trace end time", metavar="end"
+)
+parser.add_option(
+    "-n",
+    "--from",
+    type="int",
+    default=None,
+    help="Display trace from rank N",
+    metavar="from",
+)
+parser.add_option(
+    "-m",
+    "--to",
+    type="int",
+    default=None,
+    help="Display trace up to rank N",
+    metavar="to",
+)
+parser.add_option(
+    "-o",
+    "--output",
+    type="string",
+    default=None,
+    help="Name of the output file",
+    metavar="output",
+)
+parser.add_option(
+    "-x",
+    "--identifier",
+    type="string",
+    default=None,
+    help="Set the identifier of the original file captured by Darshan DXT",
+    metavar="identifier",
+)
+parser.add_option(
+    "-b",
+    "--buckets",
+    type="int",
+    default=insights.OST_BUCKETS,
+    help="Number of time buckets",
+    metavar="buckets",
+)
+parser.add_option(
+    "--sidecar",
+    action="store_true",
+    default=False,
+    help="Save the plot data in a compressed file loaded by the page",
+)
+
+(options, args) = parser.parse_args()
+options = vars(options)
+
+window = dataset.Window.from_options(options)
+
+run_metrics = metrics.Metrics.from_environment()
+
+with run_metrics.stage("load") as stage:
+    df = dataset.read(options["file"], window)
+
+    stage["rows"] = len(df)
+if df.empty or df["osts"].isnull().all():
+    quit()
+
+diagnosis = insights.insights(df)
+
+with run_metrics.stage("ost load") as stage:
+    load = diagnosis.ost_load(options["buckets"])
+
+    stage["rows"] = len(df)
+
+with run_metrics.stage("ost hotspots") as stage:
+    hotspots = diagnosis.ost_hotspots(load)
+
+    stage["rows"] = len(df)
+
+if not load["apis"]:
+    quit()
+
+METRICS = [
+    ("bytes", "Bytes", "coloraxis"),
+    ("concurrency", "Requests in flight", "coloraxis2"),
+]
+
+apis = list(load["apis"].keys())
+
+edges = load["edges"]
+buckets = ((edges[:-1] + edges[1:]) / 2).round(4)
+
+osts = load["osts"].astype(str)
+
+fig = make_subplots(
+    rows=len(METRICS) * len(apis),
+    cols=1,
+    shared_xaxes=True,
+    vertical_spacing=0.04,
+    subplot_titles=[
+        "{} - {}".format(api, title) for _, title, _ in METRICS for api in apis
+    ],
+)
+
+hot_osts = []
+
+for metric_index, (metric, title, coloraxis) in enumerate(METRICS):
+    for api_index, api in enumerate(apis):
+        row = metric_index * len(apis) + api_index + 1
+
+        fig.add_trace(
+            go.Heatmap(
+                x=buckets,
+                y=osts,
+                z=load["apis"][api][metric],
+                coloraxis=coloraxis,
+                hovertemplate="OST: %{y}<br>Time: %{x} s<br>"
+                + title
+                + ": %{z:.4s}<extra></extra>",
+            ),
+            row=row,
+            col=1,
+        )
+
+        hot_ost, hot_bucket = np.nonzero(hotspots[api])
+
+        if metric_index == 0 and len(hot_ost):
+            hot_osts.append(
+                "{}: {}".format(api, ", ".join(np.unique(load["osts"][hot_ost]).astype(str)))
+            )
+
+        fig.add_trace(
+            go.Scatter(
+                x=buckets[hot_bucket],
+                y=osts[hot_ost],
+                mode="markers",
+                marker=dict(
+                    symbol="square-open",
+                    size=6,
+                    color="#f0746e",
+                ),
+                name="hotspot",
+                legendgroup="hotspot",
+                showlegend=row == 1,
+                hovertemplate="Hotspot<br>OST: %{y}<br>Time: %{x} s<extra></extra>",
+            ),
+            row=row,
+            col=1,
+        )
+
+        fig.update_yaxes(
+            title="OST#",
+            type="category",
+            categoryorder="array",
+            categoryarray=osts,
+            row=row,
+            col=1,
+        )
+
+fig.update_xaxes(showline=True, linewidth=1, linecolor="black", mirror=True)
+fig.update_yaxes(showline=True, linewidth=1, linecolor="black", mirror=True)
+fig.update_xaxes(title="Runtime (Seconds)", row=len(METRICS) * len(apis), col=1)
+
+fig.update_layout(
+    legend=dict(
+        itemsizing="constant",
+        orientation="h",
+        yanchor="bottom",
+        y=1.008,
+        xanchor="right",
+        x=0.98,
+    ),
+    template="plotly_white",
+    autosize=False,
+    height=1200,
+    width=1800,
+    margin=dict(r=20, l=20, b=75, t=125),
+    title=(
+        "Explore <b>OST usage heatmap</b> <br>"
+        + options["identifier"]
+        + "<br><sup>OST hotspots - {}</sup>".format(
+            "; ".join(hot_osts) if hot_osts else "none"
+        )
+    ),
+    title_x=0.5,
+    title_y=0.98,
+    font=dict(size=13, color="#000000"),
+    coloraxis=dict(
+        colorscale="Blues",
+        colorbar=dict(title="Bytes", y=0.75, len=0.45),
+    ),
+    coloraxis2=dict(
+        colorscale="Reds",
+        colorbar=dict(title="Requests", y=0.25, len=0.45),
+    ),
+)
+
+fig.add_layout_image(
+    dict(
+        source="dxt-explorer.png",
+        xref="paper",
+        yref="paper",
+        x=0,
+        y=1.15,
+        sizex=0.2,
+        sizey=0.2,
+        xanchor="left",
+        yanchor="top",
+    )
+)
+
+with run_metrics.stage("render") as stage:
+    figure.write_html(fig, options["output"], full_html=False, sidecar=options["sidecar"])
+
+    stage["rows"] = len(df)
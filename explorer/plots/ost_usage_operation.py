@@ -1,11 +1,12 @@
-import os
-import copy
-import explorer
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import plotly.express as px
-import pyarrow.feather as feather
 
-from PIL import Image
+from explorer import figure
+from explorer import dataset
+from explorer import metrics
 from optparse import OptionParser
 
 
@@ -21,13 +22,13 @@ parser.add_option(
 parser.add_option(
     "-s",
     "--start",
-    type="int",
+    type="float",
     default=None,
     help="Mark trace start time",
     metavar="start",
 )
 parser.add_option(
-    "-e", "--end", type="int", default=None, help="Mark trace end time", metavar="end"
+    "-e", "--end", type="float", default=None, help="Mark trace end time", metavar="end"
 )
 parser.add_option(
     "-n",
@@ -61,11 +62,24 @@ parser.add_option(
     help="Set the identifier of the original file captured by Darshan DXT",
     metavar="identifier",
 )
+parser.add_option(
+    "--sidecar",
+    action="store_true",
+    default=False,
+    help="Save the plot data in a compressed file loaded by the page",
+)
 
 (options, args) = parser.parse_args()
 options = vars(options)
 
-df = feather.read_feather(options["file"])
+window = dataset.Window.from_options(options)
+
+run_metrics = metrics.Metrics.from_environment()
+
+with run_metrics.stage("load") as stage:
+    df = dataset.read(options["file"], window)
+
+    stage["rows"] = len(df)
 if df.empty or df["osts"].isnull().all():
     quit()
 
@@ -79,21 +93,21 @@ else:
     facet_row = None
     category_orders = None
 
-df_dict = df.to_dict("records")
-new_records = []
-for row in df_dict:
-    osts = row["osts"].tolist()
-    if len(osts) > 1:
-        for ost in osts[1:]:
-            new_row = copy.deepcopy(row)
-            new_row["osts"] = ost
-            new_records.append(new_row)
-
-    row["osts"] = osts[0]
-
-df_dict = df_dict + new_records
-new_df = pd.DataFrame.from_dict(df_dict)
-new_df["osts"] = new_df["osts"].astype("string")
+# One row for each OST touched by an operation, keeping only the plotted columns
+osts = pa.array(df["osts"], type=pa.list_(pa.int64()))
+
+rows = pc.list_parent_indices(osts).to_numpy()
+values = pc.list_flatten(osts).to_numpy()
+
+# The first OST of every operation goes before the others, so the OST axis keeps its order
+first = np.ones(len(rows), dtype=bool)
+first[1:] = rows[1:] != rows[:-1]
+
+order = np.concatenate([np.flatnonzero(first), np.flatnonzero(~first)])
+
+new_df = df[["start", "duration", "operation", "api"]].take(rows[order])
+new_df = new_df.reset_index(drop=True)
+new_df["osts"] = pd.array(values[order].astype(str), dtype="string")
 new_df.sort_values(by="start", ascending=False)
 
 count = new_df["osts"].nunique()
@@ -158,13 +172,10 @@ for annotation in fig.layout.annotations:
     elif "MPIIO" in annotation.text:
         annotation.text = "MPIIO"
 
-path = os.path.abspath(explorer.__file__)
-path = path.split("__init__.py")[0]
-pyLogo = Image.open(path + "plots/dxt-explorer.png")
 
 fig.add_layout_image(
     dict(
-        source=pyLogo,
+        source="dxt-explorer.png",
         xref="paper",
         yref="paper",
         x=0,
@@ -176,4 +187,7 @@ fig.add_layout_image(
     )
 )
 
-fig.write_html(options["output"], include_plotlyjs="cdn", full_html=False)
+with run_metrics.stage("render") as stage:
+    figure.write_html(fig, options["output"], full_html=False, sidecar=options["sidecar"])
+
+    stage["rows"] = len(df)
@@ -1,10 +1,12 @@
-import os
-import explorer
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import plotly.express as px
-import pyarrow.feather as feather
 
-from PIL import Image
+from explorer import figure
+from explorer import dataset
+from explorer import metrics
 from optparse import OptionParser
 
 
@@ -20,13 +22,13 @@ parser.add_option(
 parser.add_option(
     "-s",
     "--start",
-    type="int",
+    type="float",
     default=None,
     help="Mark trace start time",
     metavar="start",
 )
 parser.add_option(
-    "-e", "--end", type="int", default=None, help="Mark trace end time", metavar="end"
+    "-e", "--end", type="float", default=None, help="Mark trace end time", metavar="end"
 )
 parser.add_option(
     "-n",
@@ -60,11 +62,24 @@ parser.add_option(
     help="Set the identifier of the original file captured by Darshan DXT",
     metavar="identifier",
 )
+parser.add_option(
+    "--sidecar",
+    action="store_true",
+    default=False,
+    help="Save the plot data in a compressed file loaded by the page",
+)
 
 (options, args) = parser.parse_args()
 options = vars(options)
 
-df = feather.read_feather(options["file"])
+window = dataset.Window.from_options(options)
+
+run_metrics = metrics.Metrics.from_environment()
+
+with run_metrics.stage("load") as stage:
+    df = dataset.read(options["file"], window)
+
+    stage["rows"] = len(df)
 if df.empty or df["osts"].isnull().all():
     quit()
 
@@ -78,105 +93,63 @@ else:
     facet_row = None
     category_orders = None
 
-dict_request_sizes_posix_read = {}
-dict_request_sizes_posix_write = {}
-
-if "POSIX" in df["api"].unique():
-    df_posix = df[df["api"] == "POSIX"]
-    df_posix_size = df_posix["size"].tolist()
-    df_posix_operation = df_posix["operation"].tolist()
-    df_posix_osts = df_posix["osts"].tolist()
-    df_posix_osts_unique = []
-
-    for i in range(len(df_posix_osts)):
-        df_posix_osts[i] = list(df_posix_osts[i])
-        if df_posix_osts[i] not in df_posix_osts_unique:
-            df_posix_osts_unique.append(df_posix_osts[i])
-
-    for ost in df_posix_osts_unique:
-        ost_index = [i for i in range(len(df_posix_osts)) if df_posix_osts[i] == ost]
-        for index in ost_index:
-            osts = df_posix_osts[index]
-            for ost in osts:
-                ost_operation = df_posix_operation[index]
-                if ost_operation == "read":
-                    ost_size = df_posix_size[index]
-                    if ost not in dict_request_sizes_posix_read:
-                        dict_request_sizes_posix_read[ost] = ost_size
-                    else:
-                        dict_request_sizes_posix_read[ost] += ost_size
-                elif ost_operation == "write":
-                    ost_size = df_posix_size[index]
-                    if ost not in dict_request_sizes_posix_write:
-                        dict_request_sizes_posix_write[ost] = ost_size
-                    else:
-                        dict_request_sizes_posix_write[ost] += ost_size
-
-dict_request_sizes_mpiio_read = {}
-dict_request_sizes_mpiio_write = {}
-
-if "MPIIO" in df["api"].unique():
-    df_mpiio = df[df["api"] == "MPIIO"]
-    df_mpiio_size = df_mpiio["size"].tolist()
-    df_mpiio_operation = df_mpiio["operation"].tolist()
-    df_mpiio_osts = df_mpiio["osts"].tolist()
-    df_mpiio_osts_unique = []
-
-    for i in range(len(df_mpiio_osts)):
-        df_mpiio_osts[i] = list(df_mpiio_osts[i])
-        if df_mpiio_osts[i] not in df_mpiio_osts_unique:
-            df_mpiio_osts_unique.append(df_mpiio_osts[i])
-
-    for ost in df_mpiio_osts_unique:
-        ost_index = [i for i in range(len(df_mpiio_osts)) if df_mpiio_osts[i] == ost]
-        for index in ost_index:
-            osts = df_mpiio_osts[index]
-            for ost in osts:
-                ost_operation = df_mpiio_operation[index]
-                if ost_operation == "read":
-                    ost_size = df_mpiio_size[index]
-                    if ost not in dict_request_sizes_mpiio_read:
-                        dict_request_sizes_mpiio_read[ost] = ost_size
-                    else:
-                        dict_request_sizes_mpiio_read[ost] += ost_size
-                elif ost_operation == "write":
-                    ost_size = df_mpiio_size[index]
-                    if ost not in dict_request_sizes_mpiio_write:
-                        dict_request_sizes_mpiio_write[ost] = ost_size
-                    else:
-                        dict_request_sizes_mpiio_write[ost] += ost_size
-
-if dict_request_sizes_posix_read:
-    posix_read = pd.DataFrame(
-        dict_request_sizes_posix_read.items(), columns=["OST", "size"]
-    )
-    posix_read["operation"] = "read"
+APIS = ["POSIX", "MPIIO"]
+OPERATIONS = ["read", "write"]
 
-if dict_request_sizes_posix_write:
-    posix_write = pd.DataFrame(
-        dict_request_sizes_posix_write.items(), columns=["OST", "size"]
-    )
-    posix_write["operation"] = "write"
+# One entry for each OST touched by an operation
+osts = pa.array(df["osts"], type=pa.list_(pa.int64()))
 
-if dict_request_sizes_mpiio_read:
-    mpiio_read = pd.DataFrame(
-        dict_request_sizes_mpiio_read.items(), columns=["OST", "size"]
-    )
-    mpiio_read["operation"] = "read"
+rows = pc.list_parent_indices(osts).to_numpy()
+values = pc.list_flatten(osts).to_numpy()
 
-if dict_request_sizes_mpiio_write:
-    mpiio_write = pd.DataFrame(
-        dict_request_sizes_mpiio_write.items(), columns=["OST", "size"]
-    )
-    mpiio_write["operation"] = "write"
+api = pd.Categorical(df["api"], categories=APIS).codes[rows]
+operation = pd.Categorical(df["operation"], categories=OPERATIONS).codes[rows]
+
+known = (api >= 0) & (operation >= 0)
 
-request_df_posix = pd.concat([posix_read, posix_write])
-request_df_posix["api"] = "POSIX"
+rows = rows[known]
+unique_osts, ost = np.unique(values[known], return_inverse=True)
 
-request_df_mpiio = pd.concat([mpiio_read, mpiio_write])
-request_df_mpiio["api"] = "MPIIO"
+# Bytes of each (api, operation, OST), every operation counting its full size on each of its OSTs
+key = (api[known] * len(OPERATIONS) + operation[known]) * len(unique_osts) + ost
+entries = len(APIS) * len(OPERATIONS) * len(unique_osts)
 
-request_df = pd.concat([request_df_posix, request_df_mpiio])
+sizes = np.zeros(entries, dtype=np.int64)
+np.add.at(sizes, key, df["size"].to_numpy(dtype=np.int64)[rows])
+
+# The OSTs are shown in the order they first appear in the trace
+first = np.full(entries, len(key), dtype=np.int64)
+np.minimum.at(first, key, np.arange(len(key)))
+
+sizes = sizes.reshape(len(APIS), len(OPERATIONS), -1)
+first = first.reshape(len(APIS), len(OPERATIONS), -1)
+
+request_dfs = []
+
+for api_index, api_name in enumerate(APIS):
+    for operation_index, operation_name in enumerate(OPERATIONS):
+        touched = np.flatnonzero(first[api_index, operation_index] < len(key))
+
+        if not len(touched):
+            continue
+
+        touched = touched[np.argsort(first[api_index, operation_index, touched])]
+
+        request_dfs.append(
+            pd.DataFrame(
+                {
+                    "OST": unique_osts[touched],
+                    "size": sizes[api_index, operation_index, touched],
+                    "operation": operation_name,
+                    "api": api_name,
+                }
+            )
+        )
+
+if not request_dfs:
+    quit()
+
+request_df = pd.concat(request_dfs)
 request_df["OST"] = request_df["OST"].astype("string")
 fig = px.bar(
     request_df,
@@ -226,13 +199,10 @@ for annotation in fig.layout.annotations:
     elif "MPIIO" in annotation.text:
         annotation.text = "MPIIO"
 
-path = os.path.abspath(explorer.__file__)
-path = path.split("__init__.py")[0]
-pyLogo = Image.open(path + "plots/dxt-explorer.png")
 
 fig.add_layout_image(
     dict(
-        source=pyLogo,
+        source="dxt-explorer.png",
         xref="paper",
         yref="paper",
         x=0,
@@ -244,4 +214,7 @@ fig.add_layout_image(
     )
 )
 
-fig.write_html(options["output"], include_plotlyjs="cdn", full_html=False)
+with run_metrics.stage("render") as stage:
+    figure.write_html(fig, options["output"], full_html=False, sidecar=options["sidecar"])
+
+    stage["rows"] = len(df)
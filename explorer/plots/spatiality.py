@@ -1,10 +1,9 @@
-import os
-import explorer
-import numpy as np
 import plotly.express as px
-import pyarrow.feather as feather
 
-from PIL import Image
+from explorer import figure
+from explorer import dataset
+from explorer import metrics
+from explorer import patterns
 from optparse import OptionParser
 
 
@@ -17,6 +16,33 @@ parser.add_option(
     help="DXT CSV file name",
     metavar="FILE",
 )
+parser.add_option(
+    "-s",
+    "--start",
+    type="float",
+    default=None,
+    help="Mark trace start time",
+    metavar="start",
+)
+parser.add_option(
+    "-e", "--end", type="float", default=None, help="Mark trace end time", metavar="end"
+)
+parser.add_option(
+    "-n",
+    "--from",
+    type="int",
+    default=None,
+    help="Display trace from rank N",
+    metavar="from",
+)
+parser.add_option(
+    "-m",
+    "--to",
+    type="int",
+    default=None,
+    help="Display trace up to rank N",
+    metavar="to",
+)
 parser.add_option(
     "-o",
     "--output",
@@ -33,11 +59,24 @@ parser.add_option(
     help="Set the identifier of the original file captured by Darshan DXT",
     metavar="identifier",
 )
+parser.add_option(
+    "--sidecar",
+    action="store_true",
+    default=False,
+    help="Save the plot data in a compressed file loaded by the page",
+)
 
 (options, args) = parser.parse_args()
 options = vars(options)
 
-df = feather.read_feather(options["file"])
+window = dataset.Window.from_options(options)
+
+run_metrics = metrics.Metrics.from_environment()
+
+with run_metrics.stage("load") as stage:
+    df = dataset.read(options["file"], window)
+
+    stage["rows"] = len(df)
 
 if df.empty:
     quit()
@@ -49,6 +88,9 @@ maximum_rank = max(df["rank"])
 if len(df.index) == 0:
     quit()
 
+# Only the POSIX operations are shown, drop the others before building their labels
+df = df[df["api"] == "POSIX"].copy()
+
 
 def paste0():
     label = (
@@ -82,24 +124,12 @@ def paste0():
 
 df["label"] = paste0()
 
-df = df[df["api"] == "POSIX"]
+df["bin"], bins = dataset.label_size_bins(options["file"], df)
 
-conditions = [
-    (df["size"] >= 0) & (df["size"] <= 100),
-    (df["size"] >= 101) & (df["size"] <= 1000),
-    (df["size"] >= 1001) & (df["size"] <= 10000),
-    (df["size"] >= 10001) & (df["size"] <= 100000),
-    (df["size"] >= 100001) & (df["size"] <= 1000000),
-    (df["size"] >= 1000001) & (df["size"] <= 4000000),
-    (df["size"] >= 4000001) & (df["size"] <= 10000000),
-    (df["size"] >= 10000001) & (df["size"] <= 100000000),
-    (df["size"] >= 100000001) & (df["size"] <= 10000000000),
-    (df["size"] >= 10000000001),
-]
+with run_metrics.stage("access patterns") as stage:
+    access_patterns = patterns.classify(df)
 
-values = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]
-
-df["bin"] = np.select(conditions, values, default='Other')
+    stage["rows"] = len(df)
 
 fig = px.scatter(
     df,
@@ -111,23 +141,9 @@ fig = px.scatter(
     facet_row="operation",
     custom_data=["label"],
     template="plotly_white",
-    category_orders={"bin": ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]},
+    category_orders={"bin": bins},
 )
 
-col_names = {
-    "0": "0-100",
-    "1": "101-1K",
-    "2": "1K-10K",
-    "3": "10K-100K",
-    "4": "100K-1M",
-    "5": "1M-4M",
-    "6": "4M-10M",
-    "7": "10M-100M",
-    "8": "100M-1G",
-    "9": "1G+",
-}
-fig.for_each_trace(lambda t: t.update(name=col_names[t.name]))
-
 fig.update_xaxes(showline=True, linewidth=1, linecolor="black", mirror=True)
 fig.update_yaxes(showline=True, linewidth=1, linecolor="black", mirror=True)
 
@@ -145,13 +161,9 @@ fig.update_traces(
 )
 
 
-path = os.path.abspath(explorer.__file__)
-path = path.split("__init__.py")[0]
-pyLogo = Image.open(path + "plots/dxt-explorer.png")
-
 fig.add_layout_image(
     dict(
-        source=pyLogo,
+        source="dxt-explorer.png",
         xref="paper",
         yref="paper",
         x=0,
@@ -197,4 +209,12 @@ fig.update_layout(
     xaxis_rangeslider_thickness=0.04,
 )
 
-fig.write_html(options["output"])
+with run_metrics.stage("render") as stage:
+    figure.write_html(
+        fig,
+        options["output"],
+        sidecar=options["sidecar"],
+        footer=patterns.to_html(access_patterns),
+    )
+
+    stage["rows"] = len(df)
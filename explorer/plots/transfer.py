@@ -1,10 +1,8 @@
-import os
-import explorer
-import numpy as np
 import plotly.express as px
-import pyarrow.feather as feather
 
-from PIL import Image
+from explorer import figure
+from explorer import dataset
+from explorer import metrics
 from optparse import OptionParser
 
 
@@ -20,13 +18,13 @@ parser.add_option(
 parser.add_option(
     "-s",
     "--start",
-    type="int",
+    type="float",
     default=None,
     help="Mark trace start time",
     metavar="start",
 )
 parser.add_option(
-    "-e", "--end", type="int", default=None, help="Mark trace end time", metavar="end"
+    "-e", "--end", type="float", default=None, help="Mark trace end time", metavar="end"
 )
 parser.add_option(
     "-n",
@@ -41,7 +39,7 @@ parser.add_option(
     "--to",
     type="int",
     default=None,
-    help="Display trace up torank N",
+    help="Display trace up to rank N",
     metavar="to",
 )
 parser.add_option(
@@ -60,11 +58,24 @@ parser.add_option(
     help="Set the identifier of the original file captured by Darshan DXT",
     metavar="identifier",
 )
+parser.add_option(
+    "--sidecar",
+    action="store_true",
+    default=False,
+    help="Save the plot data in a compressed file loaded by the page",
+)
 
 (options, args) = parser.parse_args()
 options = vars(options)
 
-df = feather.read_feather(options["file"])
+window = dataset.Window.from_options(options)
+
+run_metrics = metrics.Metrics.from_environment()
+
+with run_metrics.stage("load") as stage:
+    df = dataset.read(options["file"])
+
+    stage["rows"] = len(df)
 
 if df.empty:
     quit()
@@ -82,17 +93,7 @@ maximum_limit = max(df["end"]) + (duration * 0.05)
 rank_gap = max(df["rank"]) * 0.075
 maximum_rank = max(df["rank"])
 
-if options["start"] is not None:
-    df = df[df["start"] >= options["start"]]
-
-if options["end"] is not None:
-    df = df[df["end"] <= options["end"]]
-
-if options["from"] is not None:
-    df = df[df["rank"] >= options["from"]]
-
-if options["to"] is not None:
-    df = df[df["rank"] <= options["to"]]
+df = window.apply(df)
 
 if len(df.index) == 0:
     quit()
@@ -130,31 +131,7 @@ def paste0():
 
 df["label"] = paste0()
 
-conditions = [
-    (df["size"] >= 0) & (df["size"] <= 100),
-    (df["size"] >= 101) & (df["size"] <= 1000),
-    (df["size"] >= 1001) & (df["size"] <= 10000),
-    (df["size"] >= 10001) & (df["size"] <= 100000),
-    (df["size"] >= 100001) & (df["size"] <= 1000000),
-    (df["size"] >= 1000001) & (df["size"] <= 4000000),
-    (df["size"] >= 4000001) & (df["size"] <= 10000000),
-    (df["size"] >= 10000001) & (df["size"] <= 100000000),
-    (df["size"] >= 100000001) & (df["size"] <= 10000000000),
-    (df["size"] >= 10000000001),
-]
-values = [
-    "0-100",
-    "101-1K",
-    "1K-10K",
-    "10K-100K",
-    "100K-1M",
-    "1M-4M",
-    "4M-10M",
-    "10M-100M",
-    "100M-1G",
-    "1G+",
-]
-df["bin"] = np.select(conditions, values, default='Other')
+df["bin"], bins = dataset.label_size_bins(options["file"], df)
 
 fig = px.scatter(
     df,
@@ -181,18 +158,7 @@ fig = px.scatter(
     ],
     category_orders={
         "api": ["MPIIO", "POSIX"],
-        "bin": [
-            "0-100",
-            "101-1K",
-            "1K-10K",
-            "10K-100K",
-            "100K-1M",
-            "1M-4M",
-            "4M-10M",
-            "10M-100M",
-            "100M-1G",
-            "1G+",
-        ],
+        "bin": bins,
     },
 )
 
@@ -297,13 +263,10 @@ fig.add_shape(
     col="all",
 )
 
-path = os.path.abspath(explorer.__file__)
-path = path.split("__init__.py")[0]
-pyLogo = Image.open(path + "plots/dxt-explorer.png")
 
 fig.add_layout_image(
     dict(
-        source=pyLogo,
+        source="dxt-explorer.png",
         xref="paper",
         yref="paper",
         x=0,
@@ -349,4 +312,7 @@ fig.update_layout(
     xaxis_rangeslider_thickness=0.04,
 )
 
-fig.write_html(options["output"])
+with run_metrics.stage("render") as stage:
+    figure.write_html(fig, options["output"], sidecar=options["sidecar"])
+
+    stage["rows"] = len(df)
@@ -0,0 +1,180 @@
+"""
+Profiling of the explorer pipeline.
+
+Each measured stage can also be profiled with cProfile and tracemalloc. The
+dumps of a stage are named after the stage and the file id. The plot scripts
+run in child processes, so they learn the profile directory and the name of
+the stage that launched them from environment variables, and prefix their own
+dumps with it.
+"""
+
+import os
+import re
+import pstats
+import cProfile
+import contextlib
+import tracemalloc
+
+
+ENVIRONMENT = "DXT_EXPLORER_PROFILE"
+
+STAGE_ENVIRONMENT = "DXT_EXPLORER_PROFILE_STAGE"
+
+# Number of allocations saved for each stage and of functions in the summary
+TOP = 25
+
+# Frames kept for each allocation, more frames make tracemalloc slower
+TRACEBACK = 5
+
+
+def dump_name(*parts):
+    """Name of the dumps of a stage, safe to be used as a file name."""
+    return ".".join(
+        re.sub(r"[^A-Za-z0-9_-]+", "-", str(part)) for part in parts if part is not None
+    )
+
+
+class Profiler:
+    """cProfile and tracemalloc dumps of the stages of a run."""
+
+    def __init__(self, directory, parent=None):
+        """
+        Initialize the profiler.
+
+        Arguments:
+            directory: directory where the dumps are saved
+            parent: name of the stage that launched this process, if any
+        """
+        self.directory = directory
+        self.parent = parent
+        self.active = False
+
+    @classmethod
+    def from_environment(cls):
+        """Create the profiler of a child process, if the explorer asked for one."""
+        directory = os.environ.get(ENVIRONMENT)
+
+        if not directory:
+            return None
+
+        return cls(directory, os.environ.get(STAGE_ENVIRONMENT))
+
+    def enable(self):
+        """Ask the child processes launched from now on to profile their stages."""
+        os.makedirs(self.directory, exist_ok=True)
+
+        # The summary aggregates every dump in the directory, so the dumps of
+        # earlier runs must not be mixed with the ones of this run
+        for name in os.listdir(self.directory):
+            if name.endswith((".prof", ".tracemalloc")):
+                os.remove(os.path.join(self.directory, name))
+
+        os.environ[ENVIRONMENT] = self.directory
+
+    @contextlib.contextmanager
+    def stage(self, name, file_id=None):
+        """Profile a stage of the pipeline."""
+        if self.active:
+            # Already covered by the profile of the enclosing stage
+            yield
+            return
+
+        label = dump_name(name, file_id)
+
+        if self.parent:
+            label = "{}.{}".format(self.parent, label)
+
+        previous = os.environ.get(STAGE_ENVIRONMENT)
+        os.environ[STAGE_ENVIRONMENT] = label
+
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start(TRACEBACK)
+
+        self.active = True
+
+        profile = cProfile.Profile()
+        profile.enable()
+
+        try:
+            yield
+        finally:
+            profile.disable()
+
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+
+            if not tracing:
+                tracemalloc.stop()
+
+            self.active = False
+
+            if previous is None:
+                del os.environ[STAGE_ENVIRONMENT]
+            else:
+                os.environ[STAGE_ENVIRONMENT] = previous
+
+            profile.dump_stats(os.path.join(self.directory, label + ".prof"))
+
+            self.write_allocations(
+                snapshot, peak, os.path.join(self.directory, label + ".tracemalloc")
+            )
+
+    def write_allocations(self, snapshot, peak, output_file):
+        """Save the lines that allocated most of the memory still in use."""
+        snapshot = snapshot.filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            ]
+        )
+
+        with open(output_file, "w") as f:
+            f.write("peak traced memory: {} bytes\n\n".format(peak))
+
+            for statistic in snapshot.statistics("lineno")[:TOP]:
+                f.write("{}\n".format(statistic))
+
+    def summary(self, output_file=None):
+        """
+        Aggregate the cProfile dumps of all the stages.
+
+        Arguments:
+            output_file: where the hot functions are saved, by default
+                hot_functions.txt inside the profile directory
+
+        Returns:
+            path of the summary, or None if there is nothing to aggregate
+        """
+        labels = [
+            name[: -len(".prof")]
+            for name in os.listdir(self.directory)
+            if name.endswith(".prof")
+        ]
+
+        # A stage that launched a plot script only waits for it, its children
+        # hold the actual work
+        dumps = sorted(
+            os.path.join(self.directory, label + ".prof")
+            for label in labels
+            if not any(other.startswith(label + ".") for other in labels)
+        )
+
+        if not dumps:
+            return None
+
+        if output_file is None:
+            output_file = os.path.join(self.directory, "hot_functions.txt")
+
+        with open(output_file, "w") as f:
+            stats = pstats.Stats(*dumps, stream=f)
+            stats.strip_dirs()
+
+            for sort in ["tottime", "cumulative"]:
+                f.write("Hottest functions of {} dumps by {}\n".format(len(dumps), sort))
+
+                stats.sort_stats(sort).print_stats(TOP)
+
+        return output_file
@@ -0,0 +1,349 @@
+"""
+Local HTTP server to explore large DXT traces.
+
+The static plots embed every operation of a file, so zooming in only magnifies
+the data loaded with the page, and large traces cannot be embedded at all. In
+serve mode, the operation page asks the server for the operations inside the
+visible time and rank window every time it is zoomed or panned. The server
+slices the parsed dataset with its time and rank indexes and, when the window
+holds too many operations to draw, re-aggregates them into time bins for each
+rank. Responses are kept in an LRU cache.
+
+The page draws the whole view as raster tiles (see explorer.tiles) and only
+asks for the exact operations once the window is small enough to hover them,
+with aggregate=0, which answers without reading the dataset when the indexes
+tell the window holds more than EXACT_LIMIT operations.
+
+Endpoints:
+    /api/files          parsed files being served, with their tile levels
+    /api/operation      operations of a file inside a window, with the
+                        file_id, start, end, from, to, bins and aggregate
+                        parameters
+    /api/cache          hits and misses of the response cache
+    /tiles/<file_id>/<time level>-<rank level>/<column>-<row>.png
+                        raster tile of the operations of a file
+
+Any other path is served from the output directory of the explorer, which
+holds the pages and the plotly.js bundle they share.
+"""
+
+import json
+import math
+import logging
+import functools
+import http.server
+import urllib.parse
+import webbrowser
+
+import numpy as np
+import pandas as pd
+
+from explorer import tiles
+from explorer import dataset
+
+
+# Windows holding up to this many operations are sent without aggregation
+EXACT_LIMIT = 50000
+
+# Maximum number of aggregated bins sent for a window, over all ranks
+POINTS = 200000
+
+# Bins requested when the page does not tell its width in pixels
+BINS = 1000
+
+MAXIMUM_BINS = 4000
+
+# Time resolution of the parsed datasets
+RESOLUTION = 0.0001
+
+
+class Service:
+    """Queries over the parsed datasets of the files being served."""
+
+    def __init__(self, directory, files, cache=256):
+        """
+        Initialize the service.
+
+        Arguments:
+            directory: output directory with the pages of the explorer
+            files: dictionary of file id as key and (file name, path of the
+                .dxt dataset) as value
+            cache: number of responses kept in memory
+        """
+        self.directory = directory
+        self.files = {}
+        self.pyramids = {}
+
+        self.logger = logging.getLogger("DXT Explorer")
+
+        for file_id, (name, path) in files.items():
+            summary = pd.read_csv(path[: -len(".dxt")] + ".summary.dxt.csv")
+
+            ranks = dataset.RankIndex.read(path)
+
+            pyramid = tiles.Pyramid.from_dataset(path)
+
+            self.pyramids[str(file_id)] = pyramid
+
+            self.files[str(file_id)] = {
+                "file_id": str(file_id),
+                "name": name,
+                "path": path,
+                "operations": int(summary["total_logs"].iloc[0]),
+                "runtime": float(summary["runtime"].iloc[0]),
+                "ranks": int(ranks.ranks[-1]) + 1 if ranks is not None and len(ranks) else 0,
+                "tiles": {
+                    "size": tiles.TILE_SIZE,
+                    "levels": list(pyramid.levels),
+                    "runtime": pyramid.runtime,
+                    "ranks": pyramid.ranks,
+                },
+            }
+
+        self.query = functools.lru_cache(maxsize=cache)(self.operations)
+
+    def list_files(self):
+        """Files being served."""
+        return list(self.files.values())
+
+    def cache_info(self):
+        """Hits, misses and size of the response cache."""
+        return self.query.cache_info()._asdict()
+
+    def get_tile(self, file_id, time_level, rank_level, column, row):
+        """
+        Get a raster tile of a file, rendered on the first request.
+
+        Returns:
+            PNG image as bytes
+        """
+        pyramid = self.pyramids[file_id]
+
+        if not pyramid.is_valid(time_level, rank_level, column, row):
+            raise ValueError("tile out of the pyramid")
+
+        return pyramid.get(time_level, rank_level, column, row)
+
+    def request(self, file_id, start=None, end=None, start_rank=None, end_rank=None, bins=BINS, aggregate=True):
+        """
+        Answer a window query, rounding its limits so close zooms share the cache.
+
+        Arguments:
+            file_id: id of the file, as a string
+            start, end: visible time limits, in seconds
+            start_rank, end_rank: visible rank limits, may be fractional
+            bins: number of time bins of the aggregated view, the page width
+            aggregate: aggregate windows with too many operations, otherwise
+                answer them without operations
+
+        Returns:
+            JSON response as bytes
+        """
+        if file_id not in self.files:
+            raise KeyError(file_id)
+
+        if start is not None:
+            start = round(max(float(start), 0.0), 4)
+
+        if end is not None:
+            end = round(float(end), 4)
+
+        if start_rank is not None:
+            start_rank = max(int(math.ceil(float(start_rank))), 0)
+
+        if end_rank is not None:
+            end_rank = int(math.floor(float(end_rank)))
+
+        bins = min(max(int(bins), 1), MAXIMUM_BINS)
+
+        if isinstance(aggregate, str):
+            aggregate = aggregate.lower() not in ("0", "false", "no")
+
+        return self.query(file_id, start, end, start_rank, end_rank, bins, bool(aggregate))
+
+    def operations(self, file_id, start, end, start_rank, end_rank, bins, aggregate=True):
+        """Operations of a file that overlap a window, aggregated if too many to draw."""
+        window = dataset.Window(start, end, start_rank, end_rank)
+
+        response = {
+            "file_id": file_id,
+            "window": [start, end, start_rank, end_rank],
+        }
+
+        if not aggregate:
+            estimate = dataset.estimate_rows(self.files[file_id]["path"], window)
+
+            # The indexes alone tell the window is too large to draw exactly
+            if estimate is not None and estimate > EXACT_LIMIT:
+                response.update({"total": None, "bin": None, "operations": {}})
+
+                return json.dumps(response).encode()
+
+        df = dataset.read(self.files[file_id]["path"], window, clip=True, truncate=False)
+
+        response["total"] = len(df)
+
+        if len(df) <= EXACT_LIMIT:
+            response["bin"] = None
+            response["operations"] = {
+                operation: {
+                    "start": group["start"].tolist(),
+                    "duration": (group["end"] - group["start"]).round(4).tolist(),
+                    "rank": group["rank"].tolist(),
+                    "size": group["size"].tolist(),
+                    "offset": group["offset"].tolist(),
+                    "osts": [
+                        None if osts is None else np.asarray(osts).tolist()
+                        for osts in group["osts"]
+                    ],
+                }
+                for operation, group in df.groupby("operation", sort=True)
+            }
+        elif aggregate:
+            response.update(self.aggregate(df, start, end, bins))
+        else:
+            response.update({"bin": None, "operations": {}})
+
+        return json.dumps(response).encode()
+
+    def aggregate(self, df, start, end, bins):
+        """
+        Aggregate the operations of each rank into time bins.
+
+        Each bin holds the span from the first start to the last end of the
+        operations that start inside it, with their count and bytes.
+        """
+        ranks = df["rank"].nunique()
+
+        bins = max(min(bins, POINTS // max(ranks, 1)), 1)
+
+        if start is None:
+            start = df["start"].min()
+
+        if end is None:
+            end = df["end"].max()
+
+        width = max(end - start, RESOLUTION) / bins
+
+        bucket = ((df["start"].clip(lower=start) - start) // width).clip(upper=bins - 1)
+
+        grouped = (
+            df.assign(bucket=bucket.astype(np.int64))
+            .groupby(["operation", "rank", "bucket"], sort=False)
+            .agg(
+                start=("start", "min"),
+                end=("end", "max"),
+                count=("size", "size"),
+                bytes=("size", "sum"),
+            )
+            .reset_index()
+        )
+
+        return {
+            "bin": width,
+            "operations": {
+                operation: {
+                    "start": group["start"].tolist(),
+                    "duration": (group["end"] - group["start"]).round(4).tolist(),
+                    "rank": group["rank"].tolist(),
+                    "count": group["count"].tolist(),
+                    "bytes": group["bytes"].tolist(),
+                }
+                for operation, group in grouped.groupby("operation", sort=True)
+            },
+        }
+
+
+class Handler(http.server.SimpleHTTPRequestHandler):
+    """Serves the pages of the explorer and answers the window queries."""
+
+    def __init__(self, *args, service=None, **kwargs):
+        self.service = service
+
+        super().__init__(*args, **kwargs)
+
+    def send_payload(self, payload, content_type="application/json", status=200):
+        """Send a response body."""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_error_message(self, status, message):
+        """Send an error as JSON, the pages show it in place of the plot."""
+        self.send_payload(json.dumps({"error": message}).encode(), status=status)
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        parameters = dict(urllib.parse.parse_qsl(url.query))
+
+        if url.path == "/api/files":
+            self.send_payload(json.dumps(self.service.list_files()).encode())
+        elif url.path == "/api/cache":
+            self.send_payload(json.dumps(self.service.cache_info()).encode())
+        elif url.path == "/api/operation":
+            try:
+                payload = self.service.request(
+                    parameters.get("file_id"),
+                    parameters.get("start"),
+                    parameters.get("end"),
+                    parameters.get("from"),
+                    parameters.get("to"),
+                    parameters.get("bins", BINS),
+                    parameters.get("aggregate", True),
+                )
+            except KeyError:
+                self.send_error_message(
+                    404, "unknown file id {}".format(parameters.get("file_id"))
+                )
+            except ValueError as error:
+                self.send_error_message(400, str(error))
+            else:
+                self.send_payload(payload)
+        elif url.path.startswith("/tiles/"):
+            try:
+                file_id, levels, tile = url.path[len("/tiles/"):].split("/")
+                time_level, rank_level = levels.split("-")
+                column, row = tile[: -len(".png")].split("-")
+
+                payload = self.service.get_tile(
+                    file_id, int(time_level), int(rank_level), int(column), int(row)
+                )
+            except KeyError:
+                self.send_error_message(404, "unknown file id {}".format(file_id))
+            except ValueError:
+                self.send_error_message(404, "unknown tile {}".format(url.path))
+            else:
+                self.send_payload(payload, "image/png")
+        else:
+            super().do_GET()
+
+    def log_message(self, format, *args):
+        self.service.logger.debug(format, *args)
+
+
+def serve(service, host="127.0.0.1", port=8000, browser=False):
+    """
+    Serve the pages and the window queries until interrupted.
+
+    Arguments:
+        service: Service with the datasets to query
+        host: address to listen on, only the local machine by default
+        port: port to listen on
+        browser: open the index page in the browser
+    """
+    handler = functools.partial(Handler, service=service, directory=service.directory)
+
+    with http.server.ThreadingHTTPServer((host, port), handler) as httpd:
+        url = "http://{}:{}/index.html".format(host, httpd.server_address[1])
+
+        service.logger.info("serving {} on {} (press CTRL+C to stop)".format(service.directory, url))
+
+        if browser:
+            webbrowser.open(url, new=2)
+
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            service.logger.info("stopping the server")
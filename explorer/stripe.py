@@ -0,0 +1,347 @@
+"""
+Replay the operations of a file under other Lustre stripe layouts.
+
+The offsets and sizes recorded by DXT are mapped to the OSTs of each candidate
+layout, as api.stripe_osts does for the layout the file had, and the load of
+each OST is measured: the bytes it receives, the requests it serves (one for
+each operation touching it), and the peak number of requests in flight on it.
+The layouts only differ in the OSTs of each operation, so the starts and ends
+of the operations are sorted in time once, and each layout only groups them by
+OST with a linear radix sort.
+
+Only the POSIX operations are replayed when the file has them, since the MPI-IO
+operations reach the OSTs through them.
+"""
+
+import html
+import numpy as np
+
+from explorer import dataset
+
+
+STRIPE_SIZES = ["1M", "4M", "16M", "64M"]
+
+STRIPE_COUNTS = [1, 2, 4, 8, 16, 32, 64]
+
+# Layouts whose peak concurrency is within this fraction of the lowest one are
+# considered as good, the one splitting the operations the least is recommended
+TOLERANCE = 0.1
+
+
+def get_operations(df):
+    """
+    Select the operations that reach the OSTs.
+
+    Returns:
+        tuple with the offset, size, start and end of each operation
+    """
+    api = "POSIX" if (df["api"] == "POSIX").any() else "MPIIO"
+
+    df = df[df["api"] == api]
+
+    return (
+        df["offset"].to_numpy(dtype=np.int64),
+        df["size"].to_numpy(dtype=np.int64),
+        df["start"].to_numpy(dtype=np.float64),
+        df["end"].to_numpy(dtype=np.float64),
+    )
+
+
+def get_stripes(offset, size, stripe_size, stripe_count):
+    """
+    Find the first stripe of each operation and how many OSTs it touches.
+
+    Returns:
+        tuple with the first stripe and the number of OSTs of each operation
+    """
+    first = offset // stripe_size
+    last = (offset + np.maximum(size, 1) - 1) // stripe_size
+
+    return first, np.minimum(last - first + 1, stripe_count)
+
+
+def expand(operations, first, counts, stripe_count):
+    """
+    Repeat each operation once for each OST it touches.
+
+    Arguments:
+        operations: numpy array of operations, in any order and possibly repeated
+        first: first stripe of each operation, see get_stripes
+        counts: number of OSTs of each operation, see get_stripes
+        stripe_count: number of OSTs of the layout
+
+    Returns:
+        tuple with the position in operations and the OST of each entry
+    """
+    counts = counts[operations]
+
+    ends = np.cumsum(counts)
+    index = np.repeat(np.arange(len(operations)), counts)
+    step = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - counts, counts)
+
+    return index, (first[operations][index] + step) % stripe_count
+
+
+def split(offset, size, stripe_size, stripe_count):
+    """
+    Split each operation into the bytes it moves on each OST of a layout.
+
+    Arguments:
+        offset: numpy array with the offset of each operation
+        size: numpy array with the size of each operation
+        stripe_size: Lustre stripe size in bytes
+        stripe_count: number of OSTs of the layout
+
+    Returns:
+        tuple with the operation, the OST (in stripe order) and the bytes of each entry
+    """
+    first, counts = get_stripes(offset, size, stripe_size, stripe_count)
+
+    operation, ost = expand(np.arange(len(offset)), first, counts, stripe_count)
+
+    def before(position):
+        # Bytes of the file before a position that are stored on each OST
+        cycle = stripe_size * stripe_count
+
+        return (position // cycle) * stripe_size + np.clip(
+            position % cycle - ost * stripe_size, 0, stripe_size
+        )
+
+    start = offset[operation]
+
+    return operation, ost, before(start + size[operation]) - before(start)
+
+
+def get_events(start, end):
+    """
+    Sort the starts and ends of the operations in time.
+
+    At the same time, ends go before starts, so back-to-back operations do not
+    overlap, except for operations without duration, which overlap themselves.
+
+    Returns:
+        tuple with the operation of each event and its change of the requests in flight
+    """
+    kind = np.concatenate(
+        (np.ones(len(start), dtype=np.int8), np.where(end > start, 0, 2).astype(np.int8))
+    )
+
+    order = np.lexsort((kind, np.concatenate((start, end))))
+
+    operation = np.concatenate((np.arange(len(start)), np.arange(len(end))))[order]
+    delta = np.where(order < len(start), 1, -1).astype(np.int32)
+
+    return operation, delta
+
+
+def peak_concurrency(events, first, counts, stripe_count):
+    """
+    Find the peak number of requests in flight on each OST.
+
+    Arguments:
+        events: operation and change of each event, as returned by get_events
+        first: first stripe of each operation, see get_stripes
+        counts: number of OSTs of each operation, see get_stripes
+        stripe_count: number of OSTs of the layout
+
+    Returns:
+        numpy array with the peak of each OST
+    """
+    operation, delta = events
+
+    _, ost = expand(operation, first, counts, stripe_count)
+
+    # The events are already in time order, a stable sort on the small OST ids
+    # groups them by OST without a comparison sort
+    order = np.argsort(ost.astype(np.min_scalar_type(stripe_count)), kind="stable")
+
+    ost = ost[order]
+
+    # Every OST ends with no request in flight, so a single running sum works across all of them
+    in_flight = np.cumsum(np.repeat(delta, counts[operation])[order])
+
+    peaks = np.zeros(stripe_count, dtype=np.int64)
+
+    if len(ost):
+        groups = np.flatnonzero(np.diff(ost)) + 1
+        groups = np.concatenate(([0], groups))
+
+        peaks[ost[groups]] = np.maximum.reduceat(in_flight, groups)
+
+    return peaks
+
+
+def simulate(offset, size, events, stripe_size, stripe_count):
+    """
+    Measure the load of each OST under a stripe layout.
+
+    Arguments:
+        offset: numpy array with the offset of each operation
+        size: numpy array with the size of each operation
+        events: events of the operations, as returned by get_events
+        stripe_size: Lustre stripe size in bytes
+        stripe_count: number of OSTs of the layout
+
+    Returns:
+        dictionary with the balance of the bytes and requests of the OSTs, the
+        peak number of requests in flight on one OST, and the requests of each
+        operation
+    """
+    operation, ost, transferred = split(offset, size, stripe_size, stripe_count)
+
+    first, counts = get_stripes(offset, size, stripe_size, stripe_count)
+
+    ost_bytes = np.bincount(ost, weights=transferred, minlength=stripe_count)
+    ost_requests = np.bincount(ost, minlength=stripe_count)
+
+    def imbalance(values):
+        # Busiest OST against the average of the layout, 1 is a perfect balance
+        mean = values.mean()
+
+        return float(values.max() / mean) if mean > 0 else 1.0
+
+    return {
+        "stripe_size": int(stripe_size),
+        "stripe_count": int(stripe_count),
+        "osts": int(np.count_nonzero(ost_requests)),
+        "bytes_imbalance": round(imbalance(ost_bytes), 4),
+        "requests_imbalance": round(imbalance(ost_requests), 4),
+        "peak_concurrency": int(peak_concurrency(events, first, counts, stripe_count).max(initial=0)),
+        "requests_per_operation": round(len(operation) / max(len(offset), 1), 4),
+    }
+
+
+def sweep(df, stripe_sizes=None, stripe_counts=None, layout=None):
+    """
+    Replay the operations of a file under each candidate stripe layout.
+
+    Arguments:
+        df: dataframe with the operations of the file
+        stripe_sizes: candidate stripe sizes, in bytes or with a K, M or G suffix
+        stripe_counts: candidate stripe counts
+        layout: current Lustre layout of the file, see api.get_lustre_layouts
+
+    Returns:
+        dictionary with the number of operations replayed, the results of each
+        layout, the current one first when known, and the recommended layout
+    """
+    stripe_sizes = [dataset.parse_size(size) for size in (stripe_sizes or STRIPE_SIZES)]
+    stripe_counts = [int(count) for count in (stripe_counts or STRIPE_COUNTS)]
+
+    offset, size, start, end = get_operations(df)
+
+    events = get_events(start, end)
+
+    candidates = [(stripe_size, count) for stripe_size in stripe_sizes for count in stripe_counts]
+
+    current = None
+    if layout is not None:
+        current = (int(layout[0]), int(layout[1]))
+
+        if current in candidates:
+            candidates.remove(current)
+
+        candidates.insert(0, current)
+
+    layouts = []
+    for stripe_size, stripe_count in candidates:
+        result = simulate(offset, size, events, stripe_size, stripe_count)
+        result["current"] = (stripe_size, stripe_count) == current
+
+        layouts.append(result)
+
+    return {
+        "operations": len(offset),
+        "layouts": layouts,
+        "recommended": recommend(layouts),
+    }
+
+
+def recommend(layouts):
+    """
+    Choose the layout with the least contention that splits the operations the least.
+
+    Returns:
+        the recommended layout, or None without layouts
+    """
+    if not layouts:
+        return None
+
+    lowest = min(layout["peak_concurrency"] for layout in layouts)
+
+    candidates = [
+        layout
+        for layout in layouts
+        if layout["peak_concurrency"] <= lowest * (1 + TOLERANCE)
+    ]
+
+    return min(
+        candidates,
+        key=lambda layout: (
+            layout["requests_per_operation"],
+            layout["bytes_imbalance"],
+            layout["stripe_count"],
+            layout["stripe_size"],
+        ),
+    )
+
+
+def to_html(reports):
+    """Render the stripe layout reports of each file as the tables shown in the index page."""
+    tables = []
+
+    for report in reports:
+        rows = []
+        for layout in report["layouts"]:
+            label = []
+            if layout["current"]:
+                label.append("current")
+            if layout == report["recommended"]:
+                label.append("recommended")
+
+            rows.append(
+                """
+                <tr>
+                    <td>{}</td>
+                    <td>{}</td>
+                    <td>{}</td>
+                    <td>{:.4f}</td>
+                    <td>{:.4f}</td>
+                    <td>{}</td>
+                    <td>{:.4f}</td>
+                    <td>{}</td>
+                </tr>
+            """.format(
+                    dataset.format_size(layout["stripe_size"]),
+                    layout["stripe_count"],
+                    layout["osts"],
+                    layout["bytes_imbalance"],
+                    layout["requests_imbalance"],
+                    layout["peak_concurrency"],
+                    layout["requests_per_operation"],
+                    ", ".join(label),
+                )
+            )
+
+        tables.append(
+            """
+        <h2>STRIPE LAYOUTS: {}</h2>
+        <table>
+            <tr>
+                <th>STRIPE SIZE</th>
+                <th>STRIPE COUNT</th>
+                <th>OSTS USED</th>
+                <th>BYTES IMBALANCE</th>
+                <th>REQUESTS IMBALANCE</th>
+                <th>PEAK CONCURRENCY</th>
+                <th>REQUESTS PER OPERATION</th>
+                <th></th>
+            </tr>
+            {}
+        </table>
+    """.format(
+                html.escape(report["name"]), "".join(rows)
+            )
+        )
+
+    return "".join(tables)
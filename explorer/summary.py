@@ -0,0 +1,410 @@
+"""
+Summary of the DXT traces of a Darshan log.
+
+The segments of each DXT record are read as a numpy view of the buffer filled
+by the Darshan library and folded right away into per-file and per-rank
+totals. No per-segment table is ever built, so the summary of a log with
+hundreds of millions of operations only costs the time to decode it.
+"""
+
+import html
+import numpy as np
+import darshan.backend.cffi_backend as backend
+
+from explorer import dataset
+
+
+SEGMENT = np.dtype(
+    [
+        ("offset", "<i8"),
+        ("length", "<i8"),
+        ("start_time", "<f8"),
+        ("end_time", "<f8"),
+    ]
+)
+
+MODULES = {"DXT_POSIX": "POSIX", "DXT_MPIIO": "MPIIO"}
+
+
+def iter_headers(log):
+    """
+    Iterate over the DXT records of an open Darshan log.
+
+    Arguments:
+        log: log handle returned by log_open, or the log of a DarshanReport
+
+    Returns:
+        generator of (api, record, buffer), the record is the header of the
+        DXT record and the buffer holds its segments, both are only valid
+        until the next record
+    """
+    modules = backend.log_get_modules(log)
+
+    buf = backend.ffi.new("void **")
+
+    for mod, api in MODULES.items():
+        if mod not in modules:
+            continue
+
+        while (
+            backend.libdutil.darshan_log_get_record(
+                log["handle"], modules[mod]["idx"], buf
+            )
+            > 0
+        ):
+            try:
+                yield api, backend.ffi.cast("struct dxt_file_record *", buf[0]), buf[0]
+            finally:
+                # The library reuses a non-NULL buffer, always ask for a new one
+                backend.libdutil.darshan_free(buf[0])
+                buf[0] = backend.ffi.NULL
+
+
+def iter_records(filename):
+    """
+    Iterate over the DXT records of a Darshan log without decoding them.
+
+    Arguments:
+        filename: path to the .darshan file
+
+    Returns:
+        generator of (api, file id, rank, write segments, read segments), the
+        segments are numpy views that are only valid until the next record
+    """
+    log = backend.log_open(filename)
+
+    try:
+        header = backend.ffi.sizeof("struct dxt_file_record")
+
+        for api, record, buf in iter_headers(log):
+            write_count = record.write_count
+            total = write_count + record.read_count
+
+            segments = np.frombuffer(
+                backend.ffi.buffer(
+                    backend.ffi.cast("char *", buf) + header,
+                    total * SEGMENT.itemsize,
+                ),
+                dtype=SEGMENT,
+            )
+
+            yield (
+                api,
+                record.base_rec.id,
+                record.base_rec.rank,
+                segments[:write_count],
+                segments[write_count:],
+            )
+    finally:
+        backend.log_close(log)
+
+
+def get_file_names(filename):
+    """Create a dictionary of file id as key and file name as value."""
+    log = backend.log_open(filename)
+
+    try:
+        return backend.log_get_name_records(log)
+    finally:
+        backend.log_close(log)
+
+
+def get_job(filename):
+    """Read the job information stored in the header of the log."""
+    log = backend.log_open(filename)
+
+    try:
+        return backend.log_get_job(log)
+    finally:
+        backend.log_close(log)
+
+
+class Summary:
+    """Running totals of the DXT operations of each file and rank."""
+
+    def __init__(self, window=None):
+        """Initialize the summary, only operations inside the window are counted."""
+        self.window = window if window is not None else dataset.Window()
+
+        self.files = {}
+
+        self.size_bins = dataset.get_size_bins()
+        self.size_labels = dataset.get_size_labels(self.size_bins)
+
+    def new_file(self):
+        return {
+            # Totals of each rank on this file, so the totals of the ranks
+            # only count the files that are reported
+            "ranks": {},
+            "api": {api: 0 for api in MODULES.values()},
+            "read": {"ops": 0, "bytes": 0},
+            "write": {"ops": 0, "bytes": 0},
+            "busy_time": 0.0,
+            "first_start": None,
+            "last_end": 0.0,
+            "size_histogram": np.zeros(len(self.size_labels), dtype=np.int64),
+        }
+
+    def new_rank(self):
+        return {"ops": 0, "bytes": 0, "busy_time": 0.0, "last_end": 0.0}
+
+    def add(self, api, file_id, rank, writes, reads):
+        """Fold the segments of one DXT record into the totals."""
+        if not self.window.contains_rank(rank):
+            return
+
+        for operation, segments in [("write", writes), ("read", reads)]:
+            start = segments["start_time"]
+            end = segments["end_time"]
+            length = segments["length"]
+
+            if self.window.has_time():
+                mask = self.window.time_mask(start, end)
+
+                start = start[mask]
+                end = end[mask]
+                length = length[mask]
+
+            ops = len(length)
+
+            if ops == 0:
+                continue
+
+            size = int(length.sum())
+            busy_time = float((end - start).sum())
+            first_start = float(start.min())
+            last_end = float(end.max())
+
+            if file_id not in self.files:
+                self.files[file_id] = self.new_file()
+
+            totals = self.files[file_id]
+
+            totals["api"][api] += ops
+            totals[operation]["ops"] += ops
+            totals[operation]["bytes"] += size
+            totals["busy_time"] += busy_time
+            totals["last_end"] = max(totals["last_end"], last_end)
+
+            if totals["first_start"] is None or first_start < totals["first_start"]:
+                totals["first_start"] = first_start
+
+            totals["size_histogram"] += np.bincount(
+                dataset.size_bins(length, self.size_bins),
+                minlength=len(self.size_labels),
+            )
+
+            if rank not in totals["ranks"]:
+                totals["ranks"][rank] = self.new_rank()
+
+            rank_totals = totals["ranks"][rank]
+
+            rank_totals["ops"] += ops
+            rank_totals["bytes"] += size
+            rank_totals["busy_time"] += busy_time
+            rank_totals["last_end"] = max(rank_totals["last_end"], last_end)
+
+    def report(self, names, file_ids=None):
+        """
+        Build the summary report.
+
+        Arguments:
+            names: dictionary of file id as key and file name as value
+            file_ids: ids of the files to report, all of them if None
+
+        Returns:
+            dictionary that can be serialized as JSON
+        """
+        if file_ids is None:
+            file_ids = list(self.files)
+
+        files = []
+        ranks = {}
+        for file_id in file_ids:
+            totals = self.files[file_id]
+
+            for rank, rank_totals in totals["ranks"].items():
+                if rank not in ranks:
+                    ranks[rank] = self.new_rank()
+
+                ranks[rank]["ops"] += rank_totals["ops"]
+                ranks[rank]["bytes"] += rank_totals["bytes"]
+                ranks[rank]["busy_time"] += rank_totals["busy_time"]
+                ranks[rank]["last_end"] = max(
+                    ranks[rank]["last_end"], rank_totals["last_end"]
+                )
+
+            files.append(
+                {
+                    "id": str(file_id),
+                    "name": names.get(file_id, str(file_id)),
+                    "ranks": len(totals["ranks"]),
+                    "ops": totals["read"]["ops"] + totals["write"]["ops"],
+                    "bytes": totals["read"]["bytes"] + totals["write"]["bytes"],
+                    "read": totals["read"],
+                    "write": totals["write"],
+                    "api": totals["api"],
+                    "busy_time": round(totals["busy_time"], 4),
+                    "first_start": round(totals["first_start"], 4),
+                    "runtime": round(totals["last_end"], 4),
+                    "size_histogram": dict(
+                        zip(self.size_labels, totals["size_histogram"].tolist())
+                    ),
+                }
+            )
+
+        rows = []
+        for rank in sorted(ranks):
+            totals = ranks[rank]
+
+            rows.append(
+                {
+                    "rank": rank,
+                    "ops": totals["ops"],
+                    "bytes": totals["bytes"],
+                    "busy_time": round(totals["busy_time"], 4),
+                    "runtime": round(totals["last_end"], 4),
+                }
+            )
+
+        return {
+            "window": {
+                "start": self.window.start,
+                "end": self.window.end,
+                "from": self.window.start_rank,
+                "to": self.window.end_rank,
+            },
+            "ops": sum(file["ops"] for file in files),
+            "bytes": sum(file["bytes"] for file in files),
+            "files": files,
+            "ranks": rows,
+        }
+
+
+def summarize(filename, window=None, file_filter=None):
+    """
+    Aggregate the DXT segments of a Darshan log in a single pass.
+
+    Arguments:
+        filename: path to the .darshan file
+        window: time and rank limits of the operations to count
+        file_filter: function that receives a file id and tells if the file
+            should be counted
+
+    Returns:
+        Summary with the totals of each file, and of each rank on each file
+    """
+    summary = Summary(window)
+
+    for api, file_id, rank, writes, reads in iter_records(filename):
+        if file_filter is not None and not file_filter(file_id):
+            continue
+
+        summary.add(api, file_id, rank, writes, reads)
+
+    return summary
+
+
+def to_html(report):
+    """Render the summary report as the tables shown in the index page."""
+    labels = dataset.get_size_labels(dataset.get_size_bins())
+
+    rows = []
+    for file in report["files"]:
+        rows.append(
+            """
+                <tr>
+                    <td class='name'>{}</td>
+                    <td>{}</td>
+                    <td>{}</td>
+                    <td>{}</td>
+                    <td>{}</td>
+                    <td>{}</td>
+                    <td>{}</td>
+                    <td>{}</td>
+                    <td>{:.4f}</td>
+                    <td>{:.4f}</td>
+                    {}
+                </tr>
+            """.format(
+                html.escape(file["name"]),
+                file["ranks"],
+                file["api"]["POSIX"],
+                file["api"]["MPIIO"],
+                file["read"]["ops"],
+                file["write"]["ops"],
+                file["read"]["bytes"],
+                file["write"]["bytes"],
+                file["busy_time"],
+                file["runtime"],
+                "".join(
+                    "<td>{}</td>".format(count)
+                    for count in file["size_histogram"].values()
+                ),
+            )
+        )
+
+    files = """
+        <table>
+            <tr>
+                <th>FILE</th>
+                <th>RANKS</th>
+                <th>POSIX OPS</th>
+                <th>MPIIO OPS</th>
+                <th>READS</th>
+                <th>WRITES</th>
+                <th>BYTES READ</th>
+                <th>BYTES WRITTEN</th>
+                <th>BUSY TIME (s)</th>
+                <th>RUNTIME (s)</th>
+                {}
+            </tr>
+            {}
+        </table>
+    """.format(
+        "".join("<th>{}</th>".format(label) for label in labels), "".join(rows)
+    )
+
+    rows = []
+    for rank in report["ranks"]:
+        rows.append(
+            """
+                <tr>
+                    <td>{}</td>
+                    <td>{}</td>
+                    <td>{}</td>
+                    <td>{:.4f}</td>
+                    <td>{:.4f}</td>
+                </tr>
+            """.format(
+                rank["rank"],
+                rank["ops"],
+                rank["bytes"],
+                rank["busy_time"],
+                rank["runtime"],
+            )
+        )
+
+    ranks = """
+        <table>
+            <tr>
+                <th>RANK</th>
+                <th>OPS</th>
+                <th>BYTES</th>
+                <th>BUSY TIME (s)</th>
+                <th>RUNTIME (s)</th>
+            </tr>
+            {}
+        </table>
+    """.format(
+        "".join(rows)
+    )
+
+    return """
+        <h2>SUMMARY: {} operations, {} bytes</h2>
+        {}
+        <h2>RANKS</h2>
+        {}
+    """.format(
+        report["ops"], report["bytes"], files, ranks
+    )
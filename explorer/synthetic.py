@@ -0,0 +1,603 @@
+"""
+Synthetic DXT traces for scale testing.
+
+A Workload describes the shape of a traced application: how many ranks and
+files, how many operations each rank issues, the distribution of the request
+sizes, the Lustre stripe layout, the I/O phases separated by compute and the
+ranks that straggle. The traces are generated offline, in chunks of bounded
+size, and every chunk draws from its own random stream derived from the seed,
+so the same workload is generated identically on every run.
+
+The chunks have the columns of the datasets converted by dxt-explorer. Small
+workloads can also be materialized as the DXT and Lustre records of a
+DarshanReport, to exercise the conversion itself.
+
+Usage:
+    python -m explorer.synthetic -p PREFIX --ranks 512 --ops 100000 --files 2
+"""
+
+import argparse
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from explorer import api
+from explorer import dataset
+from explorer import summary
+from explorer import version as dxt_version
+
+
+SCHEMA = api.SCHEMA
+
+SIZE_DISTRIBUTIONS = ["fixed", "uniform", "lognormal"]
+
+ACCESS_PATTERNS = ["sequential", "strided", "random"]
+
+# Layout of the Lustre records expected by dxt-explorer
+LUSTRE_COUNTERS = [
+    "LUSTRE_OSTS",
+    "LUSTRE_MDTS",
+    "LUSTRE_STRIPE_OFFSET",
+    "LUSTRE_STRIPE_SIZE",
+    "LUSTRE_STRIPE_WIDTH",
+]
+
+RANKS_PER_NODE = 32
+
+
+class Workload:
+    """Shape of a synthetic DXT trace."""
+
+    def __init__(
+        self,
+        ranks=8,
+        files=1,
+        ops_per_rank=1000,
+        api="POSIX",
+        read_fraction=0.5,
+        size=1024 ** 2,
+        size_distribution="fixed",
+        size_sigma=1.0,
+        pattern="sequential",
+        bandwidth=1024 ** 3,
+        latency=1e-4,
+        think_time=0.0,
+        phases=1,
+        phase_gap=1.0,
+        stragglers=0.0,
+        straggler_factor=4.0,
+        ost_count=64,
+        stripe_size=1024 ** 2,
+        stripe_count=4,
+        osts=True,
+        seed=0,
+        chunk_size=1000000,
+    ):
+        """
+        Initialize the workload.
+
+        Arguments:
+            ranks: number of MPI ranks, every rank accesses every file
+            files: number of traced files
+            ops_per_rank: operations issued by each rank on each file
+            api: POSIX or MPIIO
+            read_fraction: probability of an operation being a read
+            size: request size in bytes, the median of the lognormal
+                distribution and the mean of the uniform one
+            size_distribution: fixed, uniform or lognormal
+            size_sigma: shape of the lognormal distribution
+            pattern: sequential (each rank in its own region of the file),
+                strided (ranks interleaved) or random offsets
+            bandwidth: bytes per second of a single rank
+            latency: fixed cost in seconds of every operation
+            think_time: mean compute time in seconds between two operations
+            phases: number of I/O phases, all ranks start a phase together
+            phase_gap: compute time in seconds between two phases
+            stragglers: fraction of the ranks that are slower than the others
+            straggler_factor: how many times slower the stragglers are
+            ost_count: number of OSTs of the file system
+            stripe_size: Lustre stripe size in bytes
+            stripe_count: Lustre stripe width, 0 for a file outside Lustre
+            osts: fill the osts column of the datasets
+            seed: seed of the random streams
+            chunk_size: maximum number of operations generated at once
+        """
+        if api not in ["POSIX", "MPIIO"]:
+            raise ValueError("unknown API: {}".format(api))
+
+        if size_distribution not in SIZE_DISTRIBUTIONS:
+            raise ValueError("unknown size distribution: {}".format(size_distribution))
+
+        if pattern not in ACCESS_PATTERNS:
+            raise ValueError("unknown access pattern: {}".format(pattern))
+
+        if stripe_count > ost_count:
+            raise ValueError("the stripe count is larger than the number of OSTs")
+
+        self.ranks = int(ranks)
+        self.files = int(files)
+        self.ops_per_rank = int(ops_per_rank)
+        self.api = api
+        self.read_fraction = float(read_fraction)
+        self.size = int(size)
+        self.size_distribution = size_distribution
+        self.size_sigma = float(size_sigma)
+        self.pattern = pattern
+        self.bandwidth = float(bandwidth)
+        self.latency = float(latency)
+        self.think_time = float(think_time)
+        self.phases = max(1, min(int(phases), self.ops_per_rank))
+        self.phase_gap = float(phase_gap)
+        self.stragglers = float(stragglers)
+        self.straggler_factor = float(straggler_factor)
+        self.ost_count = int(ost_count)
+        self.stripe_size = int(stripe_size)
+        self.stripe_count = int(stripe_count)
+        self.osts = osts
+        self.seed = int(seed)
+        self.chunk_size = int(chunk_size)
+
+    def __repr__(self):
+        return "Workload(ranks={}, files={}, ops_per_rank={}, seed={})".format(
+            self.ranks, self.files, self.ops_per_rank, self.seed
+        )
+
+    @property
+    def total_ops(self):
+        """Number of operations of the whole workload."""
+        return self.ranks * self.files * self.ops_per_rank
+
+    def mean_size(self):
+        """Expected request size in bytes."""
+        if self.size_distribution == "lognormal":
+            return self.size * np.exp(self.size_sigma ** 2 / 2)
+
+        return self.size
+
+    def phase_starts(self):
+        """Time when each phase starts, long enough for its slowest rank."""
+        ops_per_phase = -(-self.ops_per_rank // self.phases)
+
+        operation = self.latency + self.mean_size() / self.bandwidth + self.think_time
+
+        if self.stragglers > 0:
+            operation *= self.straggler_factor
+
+        # Margin for the operations slower than the average
+        span = ops_per_phase * operation * 1.25
+
+        return np.arange(self.phases) * (span + self.phase_gap)
+
+    def rng(self, *stream):
+        """Random generator of one stream of the workload."""
+        return np.random.default_rng([self.seed] + list(stream))
+
+    def file_id(self, file_index):
+        """Record id of a synthetic file."""
+        return int(self.rng(file_index).integers(1, 2 ** 63, dtype=np.int64))
+
+    def file_name(self, file_index):
+        """Name of a synthetic file."""
+        return "/synthetic/file-{}.dat".format(file_index)
+
+    def names(self):
+        """Dictionary of file id as key and file name as value."""
+        return {self.file_id(index): self.file_name(index) for index in range(self.files)}
+
+    def straggler_ranks(self, file_index):
+        """Ranks that straggle while accessing a file."""
+        count = int(round(self.ranks * self.stragglers))
+
+        if count == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        rng = self.rng(file_index, 1)
+
+        return np.sort(rng.choice(self.ranks, count, replace=False))
+
+    def file_osts(self, file_index):
+        """OSTs holding the stripes of a file, in stripe order."""
+        if self.stripe_count == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        rng = self.rng(file_index, 2)
+
+        return rng.choice(self.ost_count, self.stripe_count, replace=False)
+
+    def sizes(self, rng, shape):
+        """Draw request sizes."""
+        if self.size_distribution == "fixed":
+            return np.full(shape, self.size, dtype=np.int64)
+
+        if self.size_distribution == "uniform":
+            return rng.integers(1, 2 * self.size, size=shape, dtype=np.int64)
+
+        sizes = rng.lognormal(np.log(self.size), self.size_sigma, size=shape)
+
+        return np.maximum(sizes, 1).astype(np.int64)
+
+    def osts_of(self, offset, size, file_osts):
+        """
+        OSTs touched by each operation, following the layout of the file.
+
+        Arguments:
+            offset: numpy array with the offset of each operation
+            size: numpy array with the size of each operation
+            file_osts: OSTs of the file in stripe order
+
+        Returns:
+            Arrow list array with the OST ids of each operation
+        """
+        if len(file_osts) == 0:
+            return pa.ListArray.from_arrays(
+                pa.array(np.zeros(len(offset) + 1, dtype=np.int32)),
+                pa.array([], type=pa.int64()),
+            )
+
+        return api.stripe_osts(offset, size, self.stripe_size, file_osts)
+
+    def iter_batches(self, file_index=0):
+        """
+        Generate the DXT operations of a file in chunks.
+
+        Arguments:
+            file_index: which file of the workload to generate
+
+        Returns:
+            generator of Arrow tables with the columns of a converted dataset,
+            in rank order, with at most chunk_size operations each
+        """
+        file_id = self.file_id(file_index)
+        stragglers = self.straggler_ranks(file_index)
+        file_osts = self.file_osts(file_index)
+        phase_starts = self.phase_starts()
+
+        size_bins = dataset.get_size_bins()
+        schema = api.get_schema(size_bins)
+
+        ops_per_chunk = min(self.ops_per_rank, self.chunk_size)
+        ranks_per_chunk = max(1, self.chunk_size // self.ops_per_rank)
+
+        # Bytes reserved for each rank by the sequential pattern
+        region = int(self.ops_per_rank * self.mean_size() * 2)
+
+        for first_rank in range(0, self.ranks, ranks_per_chunk):
+            ranks = np.arange(first_rank, min(first_rank + ranks_per_chunk, self.ranks))
+
+            slowdown = np.where(np.isin(ranks, stragglers), self.straggler_factor, 1.0)
+
+            # State of each rank carried from one chunk to the next
+            clock = np.zeros(len(ranks))
+            position = ranks * region
+            writes = np.zeros(len(ranks), dtype=np.int64)
+            reads = np.zeros(len(ranks), dtype=np.int64)
+
+            for first_op in range(0, self.ops_per_rank, ops_per_chunk):
+                op = np.arange(first_op, min(first_op + ops_per_chunk, self.ops_per_rank))
+
+                rng = self.rng(file_index, 3, first_rank, first_op)
+
+                shape = (len(ranks), len(op))
+
+                size = self.sizes(rng, shape)
+                is_read = rng.random(shape) < self.read_fraction
+
+                duration = (self.latency + size / self.bandwidth) * rng.lognormal(
+                    0, 0.25, size=shape
+                )
+                duration *= slowdown[:, None]
+
+                pause = np.zeros(shape)
+                if self.think_time > 0:
+                    pause = rng.exponential(self.think_time, size=shape)
+
+                # Each rank issues its operations back to back, and waits for
+                # the start of a phase before issuing its first operation
+                start = np.empty(shape)
+                phase = op * self.phases // self.ops_per_rank
+
+                for p in np.unique(phase):
+                    columns = np.flatnonzero(phase == p)
+
+                    clock = np.maximum(clock, phase_starts[p])
+
+                    elapsed = np.cumsum(duration[:, columns] + pause[:, columns], axis=1)
+                    start[:, columns] = (
+                        clock[:, None] + elapsed - duration[:, columns] - pause[:, columns]
+                    )
+
+                    clock = clock + elapsed[:, -1]
+
+                end = start + duration
+
+                if self.pattern == "sequential":
+                    offset = position[:, None] + np.cumsum(size, axis=1) - size
+                    position = offset[:, -1] + size[:, -1]
+                elif self.pattern == "strided":
+                    offset = (op[None, :] * self.ranks + ranks[:, None]) * self.size
+                else:
+                    offset = (
+                        rng.integers(0, self.ranks * self.ops_per_rank, size=shape)
+                        * self.size
+                    )
+
+                segment = np.where(
+                    is_read,
+                    np.cumsum(is_read, axis=1) - 1 + reads[:, None],
+                    np.cumsum(~is_read, axis=1) - 1 + writes[:, None],
+                )
+
+                reads += is_read.sum(axis=1)
+                writes += (~is_read).sum(axis=1)
+
+                offset = offset.ravel().astype(np.int64)
+                size = size.ravel()
+
+                if self.osts:
+                    osts = self.osts_of(offset, size, file_osts)
+                else:
+                    osts = pa.nulls(size.size, SCHEMA.field("osts").type)
+
+                yield pa.table(
+                    {
+                        "file_id": np.full(size.size, file_id, dtype=np.uint64),
+                        "api": pa.repeat(self.api, size.size),
+                        "rank": np.repeat(ranks, len(op)),
+                        "operation": np.where(is_read, "read", "write").ravel(),
+                        "segment": segment.ravel(),
+                        "offset": offset,
+                        "size": size,
+                        "size_bin": dataset.size_bins(size, size_bins),
+                        "start": start.ravel().round(4),
+                        "end": end.ravel().round(4),
+                        "osts": osts,
+                    },
+                    schema=schema,
+                )
+
+    def iter_tables(self, file_index=0):
+        """Generate the DXT operations of a file as dataframes, see iter_batches."""
+        for table in self.iter_batches(file_index):
+            yield table.to_pandas()
+
+    def generate(self, file_index=0):
+        """Generate all the DXT operations of a file into a single dataframe."""
+        return pa.concat_tables(list(self.iter_batches(file_index))).to_pandas()
+
+
+class Report:
+    """Stand-in for a DarshanReport holding the records of a synthetic workload."""
+
+    def __init__(self, workload):
+        """
+        Materialize the DXT and Lustre records of a workload.
+
+        The records have the layout dxt-explorer reads from a DarshanReport,
+        with the segments of each record as a list of dictionaries. Only meant
+        for workloads small enough to fit in memory as Python objects.
+        """
+        self.workload = workload
+
+        module = "DXT_{}".format(workload.api)
+
+        self.records = {module: [], "LUSTRE": []}
+        self.counters = {"LUSTRE": {"counters": LUSTRE_COUNTERS}}
+        self.modules = {module: {}, "LUSTRE": {}}
+        self.log = {"name_records": workload.names()}
+
+        for file_index in range(workload.files):
+            file_id = workload.file_id(file_index)
+
+            df = workload.generate(file_index).rename(
+                columns={"size": "length", "start": "start_time", "end": "end_time"}
+            )
+
+            for rank, operations in df.groupby("rank", sort=True):
+                self.records[module].append(self.record(file_id, rank, operations))
+
+            if workload.stripe_count:
+                self.records["LUSTRE"].append(
+                    {
+                        "id": file_id,
+                        "rank": -1,
+                        "counters": np.array(
+                            [
+                                workload.ost_count,
+                                1,
+                                0,
+                                workload.stripe_size,
+                                workload.stripe_count,
+                            ]
+                        ),
+                        "ost_ids": workload.file_osts(file_index),
+                    }
+                )
+
+    def record(self, file_id, rank, operations):
+        """Build the DXT record of a rank."""
+        segments = ["offset", "length", "start_time", "end_time"]
+
+        writes = operations[operations["operation"] == "write"].sort_values("segment")
+        reads = operations[operations["operation"] == "read"].sort_values("segment")
+
+        return {
+            "id": file_id,
+            "rank": int(rank),
+            "hostname": "node{}".format(int(rank) // RANKS_PER_NODE),
+            "write_count": len(writes),
+            "read_count": len(reads),
+            "write_segments": writes[segments].to_dict("records"),
+            "read_segments": reads[segments].to_dict("records"),
+        }
+
+    def read_name_records(self):
+        """The names are already known."""
+        pass
+
+    def iter_records(self):
+        """
+        Generate the DXT segments of each record, as summary.iter_records does.
+
+        Returns:
+            generator of (api, file id, rank, write segments, read segments)
+        """
+        for module, records in self.records.items():
+            if module not in summary.MODULES:
+                continue
+
+            for record in records:
+                yield (
+                    summary.MODULES[module],
+                    record["id"],
+                    record["rank"],
+                    self.segments(record["write_segments"]),
+                    self.segments(record["read_segments"]),
+                )
+
+    def segments(self, segments):
+        """Pack the segments of a record as the Darshan library buffers them."""
+        return np.array(
+            [tuple(segment[name] for name in summary.SEGMENT.names) for segment in segments],
+            dtype=summary.SEGMENT,
+        )
+
+
+def write_dataset(workload, prefix, file_index=0, sort=True):
+    """
+    Save the operations of a synthetic file as a dxt-explorer dataset.
+
+    Arguments:
+        workload: Workload to generate
+        prefix: name of the dataset, the file id and extensions are appended
+        file_index: which file of the workload to generate
+        sort: sort the dataset by start time and index it, like the explorer
+            does, which needs the whole dataset in memory. Otherwise the chunks
+            are streamed to disk as they are generated, in rank order
+
+    Returns:
+        name of the dataset without extension, as expected by the plot scripts
+    """
+    name = dataset.dataset_name(prefix, workload.file_id(file_index))
+
+    total_logs = 0
+    runtime = 0.0
+
+    if sort:
+        df = workload.generate(file_index)
+
+        dataset.write(df, name + ".dxt")
+
+        total_logs = len(df)
+        runtime = float(df["end"].max())
+    else:
+        with pa.OSFile(name + ".dxt", "wb") as sink:
+            with pa.ipc.new_file(sink, api.get_schema()) as writer:
+                for table in workload.iter_batches(file_index):
+                    writer.write_table(table)
+
+                    total_logs += table.num_rows
+                    runtime = max(runtime, pc.max(table["end"]).as_py())
+
+    pd.DataFrame({"total_logs": [total_logs], "runtime": [runtime]}).to_csv(
+        name + ".summary.dxt.csv", index=False
+    )
+
+    return name
+
+
+def main():
+    PARSER = argparse.ArgumentParser(description="DXT Explorer synthetic traces: ")
+
+    PARSER.add_argument(
+        "-p",
+        "--prefix",
+        default="synthetic.darshan",
+        help="Name of the generated datasets, the file ids are appended (default: synthetic.darshan)",
+    )
+
+    PARSER.add_argument("--ranks", type=int, default=8, help="Number of ranks")
+
+    PARSER.add_argument("--files", type=int, default=1, help="Number of files")
+
+    PARSER.add_argument(
+        "--ops", type=int, default=1000, dest="ops_per_rank", help="Operations per rank and file"
+    )
+
+    PARSER.add_argument("--api", choices=["POSIX", "MPIIO"], default="POSIX")
+
+    PARSER.add_argument(
+        "--read_fraction", type=float, default=0.5, help="Fraction of reads (default: 0.5)"
+    )
+
+    PARSER.add_argument(
+        "--size", type=int, default=1024 ** 2, help="Request size in bytes (default: 1 MiB)"
+    )
+
+    PARSER.add_argument(
+        "--size_distribution", choices=SIZE_DISTRIBUTIONS, default="fixed"
+    )
+
+    PARSER.add_argument("--pattern", choices=ACCESS_PATTERNS, default="sequential")
+
+    PARSER.add_argument("--phases", type=int, default=1, help="Number of I/O phases")
+
+    PARSER.add_argument(
+        "--stragglers", type=float, default=0.0, help="Fraction of straggler ranks"
+    )
+
+    PARSER.add_argument(
+        "--stripe_count", type=int, default=4, help="Lustre stripe width, 0 to disable"
+    )
+
+    PARSER.add_argument(
+        "--stripe_size", type=int, default=1024 ** 2, help="Lustre stripe size in bytes"
+    )
+
+    PARSER.add_argument("--seed", type=int, default=0)
+
+    PARSER.add_argument(
+        "--stream",
+        default=False,
+        action="store_true",
+        dest="stream",
+        help="Write the chunks as they are generated, without sorting or indexing",
+    )
+
+    PARSER.add_argument(
+        "-v",
+        "--version",
+        action="version",
+        version="%(prog)s "
+        + dxt_version.__version__
+        + " ("
+        + dxt_version.__release_date__
+        + ")",
+    )
+
+    ARGS = PARSER.parse_args()
+
+    WORKLOAD = Workload(
+        ranks=ARGS.ranks,
+        files=ARGS.files,
+        ops_per_rank=ARGS.ops_per_rank,
+        api=ARGS.api,
+        read_fraction=ARGS.read_fraction,
+        size=ARGS.size,
+        size_distribution=ARGS.size_distribution,
+        pattern=ARGS.pattern,
+        phases=ARGS.phases,
+        stragglers=ARGS.stragglers,
+        stripe_count=ARGS.stripe_count,
+        stripe_size=ARGS.stripe_size,
+        seed=ARGS.seed,
+    )
+
+    for file_index in range(WORKLOAD.files):
+        name = write_dataset(WORKLOAD, ARGS.prefix, file_index, sort=not ARGS.stream)
+
+        print("{}.dxt ({})".format(name, WORKLOAD.file_name(file_index)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+Raster tiles of the rank by time operation view.
+
+Traces with billions of operations are too heavy to draw even as aggregated
+vector traces, so the operation page of the local web server draws them as a
+pyramid of PNG tiles: time on the x axis, rank on the y axis, colored by
+operation and shaded by the number of operations covering each pixel.
+
+The time and the rank axes have independent zoom levels. At level z an axis is
+split into 2^z tiles of TILE_SIZE pixels, so a tile is addressed by the levels
+of both axes and its column and row, the row 0 holding the lowest ranks. Every
+tile is a crop of the canvas of its levels, so it renders the same whether it
+is cut from a full canvas or rendered on its own.
+
+The coarsest levels are rendered in a single pass over the dataset when the
+page is generated. Deeper tiles only hold a small window of the trace, they
+are rendered on demand with the dataset indexes. Both are cached on disk next
+to the dataset, and kept until the dataset changes.
+"""
+
+import io
+import os
+import json
+import shutil
+
+import numpy as np
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+from PIL import Image
+
+from explorer import dataset
+
+
+TILE_SIZE = 256
+
+# Levels of each axis rendered in a single pass when the page is generated
+PRERENDER_LEVEL = 2
+
+MAXIMUM_LEVEL = 20
+
+# Operations covering a pixel at which its color is fully opaque
+SATURATION = 64
+
+OPERATIONS = ["write", "read"]
+
+# Same colors as the operation plot
+COLORS = np.array([[0x3C, 0x93, 0xC2], [0xF0, 0x74, 0x6E]], dtype=np.float64)
+
+# Time resolution of the parsed datasets
+RESOLUTION = 0.0001
+
+# Rows read at once when rendering the coarsest levels
+BATCH_SIZE = 1 << 20
+
+# File of the cache recording the dataset its tiles were rendered from
+STAMP = "dataset.json"
+
+
+def rasterize(start, end, rank, operation, canvas, left, bottom, width, height):
+    """
+    Count the operations covering each pixel of a region of a level canvas.
+
+    Arguments:
+        start, end: numpy arrays with the time limits of each operation
+        rank: numpy array with the rank of each operation
+        operation: numpy array with the index of each operation in OPERATIONS
+        canvas: (seconds per pixel, ranks per pixel) of the level
+        left, bottom: first column and row of the region in the level canvas
+        width, height: size of the region in pixels
+
+    Returns:
+        numpy array of shape (operations, height, width) with the row 0
+        holding the lowest ranks
+    """
+    seconds, ranks = canvas
+
+    first_column = np.floor(start / seconds).astype(np.int64) - left
+    last_column = np.floor(end / seconds).astype(np.int64) - left
+
+    # The rank r spans [r, r + 1) of the rank axis, drawn from r - 0.5 to
+    # r + 0.5, and covers every row it touches, at least one
+    first_row = np.floor(rank / ranks).astype(np.int64)
+    last_row = np.maximum(first_row, np.ceil((rank + 1) / ranks).astype(np.int64) - 1)
+
+    first_row -= bottom
+    last_row -= bottom
+
+    inside = (
+        (last_column >= 0)
+        & (first_column < width)
+        & (last_row >= 0)
+        & (first_row < height)
+    )
+
+    first_column = np.clip(first_column[inside], 0, width - 1)
+    last_column = np.clip(last_column[inside], 0, width - 1) + 1
+    first_row = np.clip(first_row[inside], 0, height - 1)
+    last_row = np.clip(last_row[inside], 0, height - 1) + 1
+    operation = operation[inside]
+
+    # Each operation adds one to a rectangle of a 2D difference array
+    shape = (len(OPERATIONS), height + 1, width + 1)
+    difference = np.zeros(shape, dtype=np.int64)
+
+    for row, column, sign in [
+        (first_row, first_column, 1),
+        (first_row, last_column, -1),
+        (last_row, first_column, -1),
+        (last_row, last_column, 1),
+    ]:
+        np.add.at(
+            difference,
+            (operation, row, column),
+            sign,
+        )
+
+    return difference.cumsum(axis=1).cumsum(axis=2)[:, :height, :width]
+
+
+def to_png(counts):
+    """
+    Encode the operation counts of a tile as a PNG image.
+
+    The color of a pixel mixes the operations covering it, its opacity grows
+    with the logarithm of their number.
+    """
+    total = counts.sum(axis=0)
+
+    color = np.einsum("ohw,oc->hwc", counts, COLORS) / np.maximum(total, 1)[:, :, None]
+
+    alpha = np.where(
+        total > 0,
+        0.35 + 0.65 * np.minimum(np.log1p(total) / np.log1p(SATURATION), 1.0),
+        0.0,
+    )
+
+    rgba = np.concatenate([color, 255 * alpha[:, :, None]], axis=2)
+
+    # The first row of an image is its top, where the highest ranks are
+    image = Image.fromarray(np.flipud(rgba).round().astype(np.uint8), "RGBA")
+
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+
+    return output.getvalue()
+
+
+class Pyramid:
+    """Tiles of the operation view of a parsed dataset, cached on disk."""
+
+    def __init__(self, path, runtime, ranks):
+        """
+        Initialize the pyramid.
+
+        Arguments:
+            path: path of the .dxt dataset
+            runtime: latest end time of the operations
+            ranks: number of ranks, the highest rank plus one
+        """
+        self.path = path
+        self.runtime = max(float(runtime), RESOLUTION)
+        self.ranks = max(int(ranks), 1)
+
+        self.directory = path + ".tiles"
+
+        # Deeper levels would only split the time resolution or a rank further
+        self.levels = (
+            min(max(int(np.ceil(np.log2(self.runtime / RESOLUTION / TILE_SIZE))), 0), MAXIMUM_LEVEL),
+            min(max(int(np.ceil(np.log2(self.ranks / TILE_SIZE))) + 3, 0), MAXIMUM_LEVEL),
+        )
+
+    @classmethod
+    def from_dataset(cls, path):
+        """Create the pyramid of a dataset written by dxt-explorer, with its summary and rank index."""
+        import pandas as pd
+
+        summary = pd.read_csv(path[: -len(".dxt")] + ".summary.dxt.csv")
+
+        ranks = dataset.RankIndex.read(path)
+
+        return cls(
+            path,
+            float(summary["runtime"].iloc[0]),
+            int(ranks.ranks[-1]) + 1 if ranks is not None and len(ranks) else 0,
+        )
+
+    def canvas(self, time_level, rank_level):
+        """Seconds and ranks covered by a pixel of a level."""
+        return (
+            self.runtime / (TILE_SIZE << time_level),
+            self.ranks / (TILE_SIZE << rank_level),
+        )
+
+    def tile_file(self, time_level, rank_level, column, row):
+        """Path of a cached tile."""
+        return os.path.join(
+            self.directory,
+            "{}-{}".format(time_level, rank_level),
+            "{}-{}.png".format(column, row),
+        )
+
+    def is_valid(self, time_level, rank_level, column, row):
+        """Check if a tile exists in the pyramid."""
+        return (
+            0 <= time_level <= self.levels[0]
+            and 0 <= rank_level <= self.levels[1]
+            and 0 <= column < (1 << time_level)
+            and 0 <= row < (1 << rank_level)
+        )
+
+    def get_stamp(self):
+        """Identify the dataset and the canvas the tiles are rendered from."""
+        stat = os.stat(self.path)
+
+        return {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "runtime": self.runtime,
+            "ranks": self.ranks,
+            "tile_size": TILE_SIZE,
+        }
+
+    def is_current(self):
+        """Check if the cached tiles were rendered from the dataset as it is now."""
+        try:
+            with open(os.path.join(self.directory, STAMP)) as f:
+                return json.load(f) == self.get_stamp()
+        except (OSError, ValueError):
+            return False
+
+    def save(self, time_level, rank_level, column, row, png):
+        """Write a tile to the cache, atomically so readers never see a partial file."""
+        tile_file = self.tile_file(time_level, rank_level, column, row)
+
+        os.makedirs(os.path.dirname(tile_file), exist_ok=True)
+
+        temporary = "{}.{}".format(tile_file, os.getpid())
+
+        with open(temporary, "wb") as f:
+            f.write(png)
+
+        os.replace(temporary, tile_file)
+
+    def get(self, time_level, rank_level, column, row):
+        """
+        Get a tile, rendering it if it is not cached yet.
+
+        Returns:
+            PNG image as bytes
+        """
+        tile_file = self.tile_file(time_level, rank_level, column, row)
+
+        if not os.path.exists(tile_file):
+            png = self.render(time_level, rank_level, column, row)
+
+            self.save(time_level, rank_level, column, row, png)
+
+            return png
+
+        with open(tile_file, "rb") as f:
+            return f.read()
+
+    def render(self, time_level, rank_level, column, row):
+        """Render a single tile from the operations inside it."""
+        seconds, ranks = self.canvas(time_level, rank_level)
+
+        # One more pixel on each side, rasterize drops what falls outside
+        window = dataset.Window(
+            max((column * TILE_SIZE - 1) * seconds, 0.0),
+            ((column + 1) * TILE_SIZE + 1) * seconds,
+            max(int(np.floor((row * TILE_SIZE - 1) * ranks)), 0),
+            int(np.ceil(((row + 1) * TILE_SIZE + 1) * ranks)),
+        )
+
+        df = dataset.read(self.path, window, clip=True, truncate=False)
+
+        counts = rasterize(
+            df["start"].to_numpy(),
+            df["end"].to_numpy(),
+            df["rank"].to_numpy(),
+            (df["operation"] == "read").to_numpy().astype(np.int64),
+            (seconds, ranks),
+            column * TILE_SIZE,
+            row * TILE_SIZE,
+            TILE_SIZE,
+            TILE_SIZE,
+        )
+
+        return to_png(counts)
+
+    def prerender(self, level=PRERENDER_LEVEL):
+        """
+        Render every tile of the coarsest levels in a single pass over the dataset.
+
+        The tiles cached for the same dataset are kept, including the deeper
+        ones rendered on demand. They are only discarded when the dataset was
+        written again since.
+
+        Arguments:
+            level: deepest level of each axis to render
+
+        Returns:
+            number of tiles rendered
+        """
+        if self.is_current():
+            return 0
+
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
+
+        levels = [
+            (time_level, rank_level)
+            for time_level in range(min(level, self.levels[0]) + 1)
+            for rank_level in range(min(level, self.levels[1]) + 1)
+        ]
+
+        counts = {
+            (time_level, rank_level): np.zeros(
+                (len(OPERATIONS), TILE_SIZE << rank_level, TILE_SIZE << time_level),
+                dtype=np.int64,
+            )
+            for time_level, rank_level in levels
+        }
+
+        table = feather.read_table(self.path, memory_map=True)
+
+        for batch in table.to_batches(max_chunksize=BATCH_SIZE):
+            start = batch.column("start").to_numpy()
+            end = batch.column("end").to_numpy()
+            rank = batch.column("rank").to_numpy()
+            operation = pc.equal(batch.column("operation"), "read").to_numpy(
+                zero_copy_only=False
+            ).astype(np.int64)
+
+            for (time_level, rank_level), canvas in counts.items():
+                canvas += rasterize(
+                    start,
+                    end,
+                    rank,
+                    operation,
+                    self.canvas(time_level, rank_level),
+                    0,
+                    0,
+                    canvas.shape[2],
+                    canvas.shape[1],
+                )
+
+        for (time_level, rank_level), canvas in counts.items():
+            for column in range(1 << time_level):
+                for row in range(1 << rank_level):
+                    tile = canvas[
+                        :,
+                        row * TILE_SIZE:(row + 1) * TILE_SIZE,
+                        column * TILE_SIZE:(column + 1) * TILE_SIZE,
+                    ]
+
+                    self.save(time_level, rank_level, column, row, to_png(tile))
+
+        # Written last, an interrupted rendering is started over
+        with open(os.path.join(self.directory, STAMP), "w") as f:
+            json.dump(self.get_stamp(), f)
+
+        return sum((1 << time_level) * (1 << rank_level) for time_level, rank_level in levels)
@@ -19,7 +19,7 @@ setuptools.setup(
     install_requires=[
         "numpy>=1.23",
         "Pillow>=9.4.0",
-        "plotly>=5.13.0",
+        "plotly>=5.19.0",
         "argparse>=1.4.0",
         "pandas>=1.4.3",
         "pyranges>=0.0.120",
@@ -29,7 +29,12 @@ setuptools.setup(
         "drishti-io>=0.5",
     ],
     include_package_data=True,
-    entry_points={"console_scripts": ["dxt-explorer=explorer.dxt:main"]},
+    entry_points={
+        "console_scripts": [
+            "dxt-explorer=explorer.dxt:main",
+            "dxt-explorer-batch=explorer.batch:main",
+        ]
+    },
     packages=["explorer"],
     package_data={
         "explorer": ["explorer/*.*", "explorer/plots/*.*"],